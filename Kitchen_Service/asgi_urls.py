@@ -0,0 +1,14 @@
+"""
+URL configuration used under ASGI: the same as Kitchen_Service.urls, with
+the kitchen pages that have async views served by them.
+"""
+from django.urls import include, path
+
+from Kitchen_Service.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path("", include("kitchen.async_urls", namespace="kitchen"))
+    if getattr(pattern, "namespace", None) == "kitchen"
+    else pattern
+    for pattern in sync_urlpatterns
+]
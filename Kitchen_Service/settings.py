@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -33,6 +34,11 @@ if RENDER_EXTERNAL_HOSTNAME:
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Gunicorn concurrency, read by gunicorn.conf.py as well, so that each
+# worker process gets a connection pool sized to its threads.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 2))
+GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", 4))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -41,9 +47,47 @@ DATABASES = {
         'PASSWORD': os.environ["POSTGRES_PASSWORD"],
         'HOST': os.environ["POSTGRES_HOST"],
         'PORT':int(os.environ["POSTGRES_DB_PORT"]),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
 }
 
+# psycopg_pool connection pool (kitchen/dbpool.py). Set POSTGRES_POOL=0 to
+# fall back to a connection per request, e.g. behind PgBouncer.
+if os.environ.get("POSTGRES_POOL", "1") != "0":
+    from kitchen.dbpool import pool_options
+
+    DATABASES["default"]["OPTIONS"]["pool"] = pool_options(
+        WEB_CONCURRENCY,
+        GUNICORN_THREADS,
+        max_connections=int(os.environ.get("POSTGRES_MAX_CONNECTIONS", 0)),
+        timeout=float(os.environ.get("POSTGRES_POOL_TIMEOUT", 10)),
+    )
+
+# Read replicas: a comma-separated list of host[:port] sharing the primary's
+# database and credentials. kitchen.routers sends reads to them.
+KITCHEN_DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(",")),
+    start=1,
+):
+    replica_host, _, replica_port = replica.strip().partition(":")
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        'HOST': replica_host,
+        'PORT': int(replica_port or DATABASES["default"]["PORT"]),
+        'TEST': {'MIRROR': 'default'},
+    }
+    KITCHEN_DATABASE_REPLICAS.append(f"replica{number}")
+
+# Seconds a client keeps reading from the primary after a write.
+KITCHEN_PRIMARY_STICKY_SECONDS = int(
+    os.environ.get("KITCHEN_PRIMARY_STICKY_SECONDS", 5)
+)
+
+if KITCHEN_DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ["kitchen.routers.ReplicaRouter"]
+
 
 
 # Quick-start development settings - unsuitable for production
@@ -78,7 +122,27 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'Kitchen_Service.urls'
+# Per-view SQL query budgets (kitchen/querybudget.py): "warn" logs requests
+# over budget, "strict" raises. Leave unset in production.
+KITCHEN_QUERY_BUDGETS = os.environ.get("KITCHEN_QUERY_BUDGETS")
+if KITCHEN_QUERY_BUDGETS:
+    MIDDLEWARE.insert(0, "kitchen.querybudget.QueryBudgetMiddleware")
+
+# Pins clients to the primary after a write; placed ahead of the session
+# middleware so that session reads are routed too.
+if KITCHEN_DATABASE_REPLICAS:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware'),
+        "kitchen.routers.ReplicaStickinessMiddleware",
+    )
+
+# Set by asgi.py: serve the pages that have async views with them.
+KITCHEN_ASYNC_VIEWS = os.environ.get("KITCHEN_ASYNC_VIEWS") == "1"
+
+ROOT_URLCONF = (
+    'Kitchen_Service.asgi_urls' if KITCHEN_ASYNC_VIEWS
+    else 'Kitchen_Service.urls'
+)
 
 TEMPLATES = [
     {
@@ -121,6 +185,9 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'kitchen.Cook'
 
+# Loads request.user from a cached snapshot instead of the full row.
+AUTHENTICATION_BACKENDS = ["kitchen.auth.CachedModelBackend"]
+
 LOGIN_REDIRECT_URL = '/'
 
 # Internationalization
@@ -145,11 +212,95 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "kitchen.storage.StaticFilesStorage",
+    },
+}
+
 ASSETS_ROOT = '/static/assets'
 
+# Manifest of the AVIF/WebP variants written by optimize_images, next to the
+# variants themselves.
+KITCHEN_IMAGE_VARIANTS = (
+    BASE_DIR / "static" / "assets" / "img" / "responsive" / "variants.json"
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CRISPY_TEMPLATE_PACK="bootstrap5"
+
+# Dotted path to a kitchen.search backend; picked from the database vendor
+# when unset.
+KITCHEN_SEARCH_BACKEND = os.environ.get("KITCHEN_SEARCH_BACKEND")
+
+# "shared" is seen by all workers: the rendered fragments and their versions
+# live there, so that a save in one worker invalidates them in every other.
+# "kitchen" puts a per-process LRU in front of it. The file cache stands in
+# for Redis or Memcached, which KITCHEN_SHARED_CACHE_BACKEND and
+# KITCHEN_SHARED_CACHE_LOCATION select.
+KITCHEN_SHARED_CACHE = {
+    "BACKEND": (
+        os.environ.get("KITCHEN_SHARED_CACHE_BACKEND")
+        or "django.core.cache.backends.filebased.FileBasedCache"
+    ),
+    "LOCATION": (
+        os.environ.get("KITCHEN_SHARED_CACHE_LOCATION")
+        or os.path.join(tempfile.gettempdir(), "kitchen-cache")
+    ),
+}
+if KITCHEN_SHARED_CACHE["BACKEND"].endswith(".FileBasedCache"):
+    # The file cache culls a third of its entries past MAX_ENTRIES (300 by
+    # default), versions and sessions included, so it is sized for every
+    # fragment, version key and session at once. Redis and Memcached evict
+    # by their own memory limits and pass OPTIONS on to their clients.
+    KITCHEN_SHARED_CACHE["OPTIONS"] = {"MAX_ENTRIES": 200_000}
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": KITCHEN_SHARED_CACHE,
+    "kitchen": {
+        "BACKEND": "kitchen.cache.TieredCache",
+        "LOCATION": "shared",
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "LOCAL_MAX_ENTRIES": 1000,
+            # Longest a worker serves its copy after another invalidated it.
+            "LOCAL_TIMEOUT": 5,
+            "JITTER": 0.1,
+        },
+    },
+    # Sessions and the cook snapshots of kitchen.auth. A session ended in one
+    # worker is still honoured by another for at most LOCAL_TIMEOUT.
+    "auth": {
+        "BACKEND": "kitchen.cache.TieredCache",
+        "LOCATION": "shared",
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "LOCAL_MAX_ENTRIES": 10_000,
+            "LOCAL_TIMEOUT": 1,
+            "JITTER": 0.1,
+        },
+    },
+}
+KITCHEN_CACHE = "kitchen"
+
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+SESSION_CACHE_ALIAS = "auth"
+
+# Cache alias and timeout (seconds) for {% fragmentcache %} blocks; the alias
+# must be shared by all workers, or a version bumped by one worker's save
+# leaves the others serving stale fragments.
+KITCHEN_FRAGMENT_CACHE = "shared"
+KITCHEN_FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Names the deployed build in every ETag; by default a digest of the
+# templates and the static files manifest, computed once per process.
+KITCHEN_BUILD_VERSION = os.environ.get("KITCHEN_BUILD_VERSION")
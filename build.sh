@@ -7,7 +7,12 @@ set -o errexit
 pip install -r requirements.txt
 
 
-# Convert static asset files
+# Encode AVIF/WebP variants of the static images for {% picture %}
+python manage.py optimize_images
+
+
+# Collect static files under content-hashed names, with .gz and .br
+# variants, so WhiteNoise can serve them compressed and cache them forever
 python manage.py collectstatic --no-input
 
 
@@ -0,0 +1,25 @@
+import os
+
+# Keep in step with WEB_CONCURRENCY and GUNICORN_THREADS in settings.py,
+# which size each worker's database connection pool.
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# KITCHEN_ASGI=1 serves Kitchen_Service.asgi, and with it the async views,
+# from uvicorn workers; each runs one event loop, so threads is unused.
+if os.environ.get("KITCHEN_ASGI") == "1":
+    wsgi_app = "Kitchen_Service.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "Kitchen_Service.wsgi:application"
+    worker_class = "gthread"
+
+
+def post_worker_init(worker):
+    # Runs in each worker once the application is loaded, before it accepts
+    # connections: compile the templates, build the URL resolver and open
+    # the database pool so the first requests don't pay for them.
+    from kitchen.warmup import warm_up
+
+    for step, (count, ms) in warm_up().items():
+        worker.log.info("Warm-up %s: %d in %.1f ms", step, count, ms)
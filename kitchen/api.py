@@ -0,0 +1,154 @@
+"""
+Read-only JSON API for the kiosk and POS clients.
+
+Responses are built from ``.values()`` rows, so no model instance is ever
+created. Lists are keyset paginated by ``cursor`` and ``limit``, every
+endpoint takes a sparse ``fields`` list and answers with an ETag.
+"""
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views import generic
+
+from kitchen.conditional import ConditionalListMixin, latest
+from kitchen.models import Cook, DishCard, DishType
+from kitchen.pagination import KeysetPaginator
+from kitchen.search import search
+
+
+def error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+class ApiView(LoginRequiredMixin, ConditionalListMixin, generic.View):
+    queryset = None
+    # Output name -> values() lookup; "id" is always sent.
+    fields = {}
+    search_field = None
+    page_size = 50
+    max_page_size = 500
+    cursor_kwarg = "cursor"
+
+    def handle_no_permission(self):
+        return error("Authentication required.", status=403)
+
+    def get_queryset(self):
+        queryset = self.queryset.all()
+        term = self.request.GET.get(self.search_field)
+        if term:
+            queryset = search(queryset, self.search_field, term)
+        return queryset
+
+    def get_fields(self):
+        requested = self.request.GET.get("fields")
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(",")]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return ["id", *(name for name in names if name != "id")]
+
+    def get_page_size(self):
+        try:
+            size = int(self.request.GET.get("limit", self.page_size))
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        return max(1, min(size, self.max_page_size))
+
+    def serialize(self, rows, fields):
+        lookups = [(name, self.fields[name]) for name in fields]
+        return [{name: row[lookup] for name, lookup in lookups}
+                for row in rows]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            fields = self.get_fields()
+            page_size = self.get_page_size()
+        except ValueError as e:
+            return error(str(e))
+        if "pk" in kwargs:
+            return self.get_object(kwargs["pk"], fields)
+
+        conditions = self.check_conditions(request, self.get_validators())
+        if conditions.response is not None:
+            return conditions.finish(conditions.response)
+        lookups = {self.fields[name] for name in fields}
+        queryset = self.get_queryset()
+        paginator = KeysetPaginator(queryset, page_size)
+        paginator.queryset = queryset.values(*lookups, *paginator.lookups)
+        try:
+            page = paginator.page(request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            return error(str(e))
+        items = self.serialize(page.object_list, fields)
+        return conditions.finish(JsonResponse({
+            "results": items,
+            "next": self._page_url(page.next_cursor),
+            "previous": self._page_url(page.previous_cursor),
+        }, encoder=DjangoJSONEncoder))
+
+    def get_object(self, pk, fields):
+        lookups = {self.fields[name] for name in fields}
+        row = (
+            self.queryset.filter(pk=pk)
+            .values(*lookups, *self.validator_fields)
+            .first()
+        )
+        if row is None:
+            return error("Not found.", status=404)
+        values = [row[field] for field in self.validator_fields]
+        conditions = self.check_conditions(
+            self.request, (latest(*values), *values)
+        )
+        if conditions.response is not None:
+            return conditions.finish(conditions.response)
+        items = self.serialize([row], fields)
+        return conditions.finish(
+            JsonResponse(items[0], encoder=DjangoJSONEncoder)
+        )
+
+    def _page_url(self, cursor):
+        if cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query[self.cursor_kwarg] = cursor
+        return f"{self.request.path}?{query.urlencode()}"
+
+
+class DishTypeApiView(ApiView):
+    queryset = DishType.objects.all()
+    fields = {"id": "id", "name": "name"}
+    search_field = "name"
+    validator_models = ("dish_type",)
+
+
+class CookApiView(ApiView):
+    queryset = Cook.objects.all()
+    fields = {
+        "id": "id",
+        "username": "username",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "years_of_experience": "years_of_experience",
+    }
+    search_field = "username"
+    validator_models = ("cook",)
+
+
+class DishApiView(ApiView):
+    # The cards hold the type name and the cooks: one table, no joins.
+    queryset = DishCard.objects.all()
+    fields = {
+        "id": "id",
+        "name": "name",
+        "description": "description",
+        "price": "price",
+        "dish_type": "dish_type_id",
+        "dish_type_name": "dish_type_name",
+        "cooks": "cook_ids",
+        "cook_names": "cook_names",
+    }
+    search_field = "name"
+    validator_models = ("dish", "dish_type", "cook", "assignment")
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class KitchenConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kitchen'
+
+    def ready(self):
+        from kitchen import signals  # noqa: F401
+        from kitchen.search import install_sqlite_fts_handler
+
+        post_migrate.connect(install_sqlite_fts_handler, sender=self)
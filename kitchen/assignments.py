@@ -0,0 +1,109 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed
+
+from kitchen import cards, counters
+from kitchen.conditional import touch
+from kitchen.models import Cook, Dish
+
+Assignment = Dish.cooks.through
+
+
+def _columns():
+    qn = connection.ops.quote_name
+    return (
+        qn(Assignment._meta.db_table),
+        qn(Assignment._meta.get_field("dish").column),
+        qn(Assignment._meta.get_field("cook").column),
+    )
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def assign(dish_ids, cook_ids):
+    """
+    Assign every cook to every dish with a single INSERT ... SELECT that
+    skips existing pairs. Return the (dish_id, cook_id) pairs created.
+    """
+    dish_ids, cook_ids = list(dish_ids), list(cook_ids)
+    if not dish_ids or not cook_ids:
+        return []
+    qn = connection.ops.quote_name
+    table, dish_column, cook_column = _columns()
+    sql = (
+        f"INSERT INTO {table} ({dish_column}, {cook_column}) "
+        f"SELECT d.{qn('id')}, c.{qn('id')} "
+        f"FROM {qn(Dish._meta.db_table)} d "
+        f"CROSS JOIN {qn(Cook._meta.db_table)} c "
+        f"WHERE d.{qn('id')} IN ({_placeholders(dish_ids)}) "
+        f"AND c.{qn('id')} IN ({_placeholders(cook_ids)}) "
+        f"ON CONFLICT DO NOTHING "
+        f"RETURNING {dish_column}, {cook_column}"
+    )
+    return _write(sql, dish_ids + cook_ids, "post_add")
+
+
+def unassign(dish_ids, cook_ids):
+    """
+    Remove every cook from every dish with a single DELETE. Return the
+    (dish_id, cook_id) pairs removed.
+    """
+    dish_ids, cook_ids = list(dish_ids), list(cook_ids)
+    if not dish_ids or not cook_ids:
+        return []
+    table, dish_column, cook_column = _columns()
+    sql = (
+        f"DELETE FROM {table} "
+        f"WHERE {dish_column} IN ({_placeholders(dish_ids)}) "
+        f"AND {cook_column} IN ({_placeholders(cook_ids)}) "
+        f"RETURNING {dish_column}, {cook_column}"
+    )
+    return _write(sql, dish_ids + cook_ids, "post_remove")
+
+
+def _write(sql, params, action):
+    # RETURNING names only the rows this statement inserted or deleted,
+    # so the counts move by exactly those.
+    sign = 1 if action == "post_add" else -1
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            pairs = [tuple(row) for row in cursor.fetchall()]
+        if pairs:
+            touch(Dish.objects.filter(pk__in={dish for dish, _ in pairs}))
+            counters.shift_dish_counts(Cook, {
+                cook: sign * count for cook, count
+                in Counter(cook for _, cook in pairs).items()
+            })
+            cards.refresh_cards({dish for dish, _ in pairs})
+        _send_m2m_changed(pairs, action)
+    return pairs
+
+
+def _send_m2m_changed(pairs, action):
+    # The raw statements bypass the related manager, so receivers of
+    # m2m_changed get the post_* signal per dish, as from dish.cooks.add().
+    # updated_at, the cooks' dish_count and the dish cards were already
+    # updated in bulk, hence touched=True, counted=True and carded=True.
+    if not pairs or not m2m_changed.has_listeners(Assignment):
+        return
+    cooks_by_dish = {}
+    for dish_id, cook_id in pairs:
+        cooks_by_dish.setdefault(dish_id, set()).add(cook_id)
+    dishes = Dish.objects.in_bulk(cooks_by_dish)
+    for dish_id, cook_ids in cooks_by_dish.items():
+        m2m_changed.send(
+            sender=Assignment,
+            instance=dishes[dish_id],
+            action=action,
+            reverse=False,
+            model=Cook,
+            pk_set=cook_ids,
+            using=connection.alias,
+            touched=True,
+            counted=True,
+            carded=True,
+        )
@@ -0,0 +1,24 @@
+from django.urls import path
+
+from kitchen import async_views
+from kitchen.urls import urlpatterns as sync_urlpatterns
+
+app_name = "kitchen"
+
+ASYNC_VIEWS = {
+    "index": async_views.index,
+    "dish-list": async_views.AsyncDishListView.as_view(),
+    "dish-detail": async_views.AsyncDishDetailView.as_view(),
+    "cook-list": async_views.AsyncCookListView.as_view(),
+    "cook-detail": async_views.AsyncCookDetailView.as_view(),
+}
+
+# The kitchen URLs, with the async views swapped in for the pages above.
+urlpatterns = [
+    path(
+        str(pattern.pattern),
+        ASYNC_VIEWS.get(pattern.name, pattern.callback),
+        name=pattern.name,
+    )
+    for pattern in sync_urlpatterns
+]
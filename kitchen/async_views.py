@@ -0,0 +1,115 @@
+"""
+Async counterparts of the read-only views, served under ASGI (see
+Kitchen_Service/asgi_urls.py). They reuse the sync views' querysets,
+validators and context, and only move the queries to the async ORM;
+templates are still rendered in a worker thread by Django's handler.
+"""
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, HttpRequest, HttpResponse
+from django.template.response import TemplateResponse
+
+from kitchen.conditional import latest
+from kitchen.counters import aget_counts
+from kitchen.views import (
+    CookDetailView,
+    CookListView,
+    DishDetailView,
+    DishListView,
+)
+
+
+@login_required
+async def index(request: HttpRequest) -> HttpResponse:
+    # Already fetched by login_required; spares the auth context processor
+    # a second, sync user lookup.
+    request.user = await request.auser()
+    counts = await aget_counts()
+
+    context = {
+        "num_cooks": counts["cooks"],
+        "num_dish_types": counts["dish_types"],
+        "num_dishes": counts["dishes"],
+    }
+
+    return TemplateResponse(request, "kitchen/index.html", context=context)
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(
+            request, *args, **kwargs
+        )
+
+
+class AsyncListMixin(AsyncLoginRequiredMixin):
+    async def aprepare_context(self):
+        """Run the queries get_context_data() would otherwise run."""
+
+    async def get(self, request, *args, **kwargs):
+        conditions = self.check_conditions(
+            request, await self.aget_validators()
+        )
+        if conditions.response is not None:
+            return conditions.finish(conditions.response)
+        self.object_list = self.get_queryset()
+        await self.apaginate_queryset(
+            self.object_list, self.get_paginate_by(self.object_list)
+        )
+        await self.aprepare_context()
+        context = self.get_context_data()
+        return conditions.finish(self.render_to_response(context))
+
+
+class AsyncDetailMixin(AsyncLoginRequiredMixin):
+    async def aget_validators(self):
+        row = await self.get_validators_queryset().afirst()
+        return row and (latest(*row), *row)
+
+    async def aget_object(self):
+        try:
+            return await self.get_queryset().aget(pk=self.kwargs["pk"])
+        except self.model.DoesNotExist:
+            raise Http404(
+                "No %(verbose_name)s found matching the query"
+                % {"verbose_name": self.model._meta.verbose_name}
+            )
+
+    async def aprepare_context(self):
+        """Run the queries get_context_data() would otherwise run."""
+
+    async def get(self, request, *args, **kwargs):
+        conditions = self.check_conditions(
+            request, await self.aget_validators()
+        )
+        if conditions.response is not None:
+            return conditions.finish(conditions.response)
+        self.object = await self.aget_object()
+        await self.aprepare_context()
+        context = self.get_context_data(object=self.object)
+        return conditions.finish(self.render_to_response(context))
+
+
+class AsyncDishListView(AsyncListMixin, DishListView):
+    async def aprepare_context(self):
+        await self.facets.acounts()
+
+
+class AsyncCookListView(AsyncListMixin, CookListView):
+    pass
+
+
+class AsyncDishDetailView(AsyncDetailMixin, DishDetailView):
+    async def aprepare_context(self):
+        await self.apaginate_queryset(
+            self.get_cooks_queryset(), self.cooks_paginate_by
+        )
+
+
+class AsyncCookDetailView(AsyncDetailMixin, CookDetailView):
+    # The dishes stay lazy: they are only read when the cached fragment
+    # misses, from the thread rendering the template.
+    pass
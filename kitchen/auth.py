@@ -0,0 +1,79 @@
+"""
+Resolve ``request.user`` from a cached snapshot of the Cook row.
+
+The snapshot holds the columns the pages and the session check read; the
+others are deferred and load on access. It lives in the cache that also
+holds the sessions (SESSION_CACHE_ALIAS), tagged with the cook, and is
+invalidated by kitchen.signals whenever the cook is saved or deleted, which
+covers password changes and CookUpdateView, and on logout.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from kitchen.models import Cook
+
+# In the model's field order, as Model.from_db() expects. "password" is
+# needed to check the session's auth hash.
+SNAPSHOT_FIELDS = (
+    "id",
+    "password",
+    "is_superuser",
+    "username",
+    "first_name",
+    "last_name",
+    "is_staff",
+    "is_active",
+    "years_of_experience",
+)
+SNAPSHOT_KEY = "kitchen:cook-snapshot:%s"
+# Tag keys are shared with the "kitchen" cache, whose "cook" tag moves on
+# every Cook save, logins included, so the snapshots have tags of their own.
+SNAPSHOTS_TAG = "cook-snapshots"
+
+
+def get_auth_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def snapshot_tags(pk):
+    return [SNAPSHOTS_TAG, f"cook-snapshot:{pk}"]
+
+
+def load_snapshot(pk):
+    rows = Cook.objects.filter(pk=pk).values_list(*SNAPSHOT_FIELDS)
+    return next(iter(rows), None)
+
+
+def invalidate_snapshot(pk):
+    get_auth_cache().invalidate_tags(f"cook-snapshot:{pk}")
+
+
+def invalidate_snapshots():
+    """Drop every snapshot, for writes that bypass the signals."""
+    get_auth_cache().invalidate_tags(SNAPSHOTS_TAG)
+
+
+class CachedModelBackend(ModelBackend):
+    def _from_snapshot(self, values):
+        if values is None:
+            return None
+        user = Cook.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, values)
+        return user if self.user_can_authenticate(user) else None
+
+    def get_user(self, user_id):
+        values = get_auth_cache().get_or_set(
+            SNAPSHOT_KEY % user_id,
+            lambda: load_snapshot(user_id),
+            tags=snapshot_tags(user_id),
+        )
+        return self._from_snapshot(values)
+
+    async def aget_user(self, user_id):
+        values = await get_auth_cache().aget_or_set(
+            SNAPSHOT_KEY % user_id,
+            lambda: load_snapshot(user_id),
+            tags=snapshot_tags(user_id),
+        )
+        return self._from_snapshot(values)
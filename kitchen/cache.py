@@ -0,0 +1,325 @@
+"""
+A cache backend that keeps a bounded LRU in each process in front of a
+shared store, such as the file or database cache, Redis or Memcached.
+
+    CACHES = {
+        "shared": {...},
+        "kitchen": {
+            "BACKEND": "kitchen.cache.TieredCache",
+            "LOCATION": "shared",
+            "OPTIONS": {"LOCAL_MAX_ENTRIES": 1000, "LOCAL_TIMEOUT": 5},
+        },
+    }
+
+Values are stored with the versions of their tags; ``invalidate_tags()``
+replaces those versions, which turns every entry stored with the old ones
+into a miss. Another process may keep serving its local copy for up to
+``LOCAL_TIMEOUT`` seconds.
+
+Inside a transaction the cache is bypassed: a value computed there may be
+rolled back, and must not be kept for other requests.
+"""
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import transaction
+
+TAG_KEY = "kitchen:tag:%s"
+LOCK_KEY = "kitchen:lock:%s"
+
+_MISSING = object()
+
+
+def get_cache():
+    return caches[settings.KITCHEN_CACHE]
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._shared_alias = location
+        self.local_max_entries = options.get("LOCAL_MAX_ENTRIES", 1000)
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self.jitter = options.get("JITTER", 0.1)
+        # How long a miss waits for another thread or process to compute
+        # the value before computing it itself.
+        self.lock_timeout = options.get("LOCK_TIMEOUT", 10)
+        self.poll_interval = options.get("POLL_INTERVAL", 0.05)
+        # key -> [value, tag versions, expiry], least recently used first.
+        self._local = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _bypass(self):
+        return transaction.get_connection().in_atomic_block
+
+    def _count(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def get_stats(self):
+        """Return the counters of this process and its hit ratio."""
+        with self._lock:
+            stats = {
+                outcome: self._stats[outcome]
+                for outcome in ("local_hits", "shared_hits", "misses",
+                                "stale", "computes", "waits")
+            }
+            stats["local_entries"] = len(self._local)
+        lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_ratio"] = (
+            (stats["local_hits"] + stats["shared_hits"]) / lookups
+            if lookups else None
+        )
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    # Timeouts
+
+    def _ttl(self, timeout):
+        """Return the timeout in seconds, shortened by up to ``jitter``."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None or timeout <= 0:
+            return timeout
+        return timeout * random.uniform(1 - self.jitter, 1)
+
+    # Local tier
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[2] <= time.monotonic():
+                del self._local[key]
+                return _MISSING
+            self._local.move_to_end(key)
+            return entry[0]
+
+    def _local_set(self, key, value, tags, ttl):
+        expires = time.monotonic() + (
+            self.local_timeout if ttl is None
+            else min(ttl, self.local_timeout)
+        )
+        with self._lock:
+            self._local[key] = [value, tags, expires]
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    # Tags
+
+    def _tag_versions(self, tags, create=False):
+        if not tags:
+            return {}
+        keys = {tag: TAG_KEY % tag for tag in tags}
+        found = self.shared.get_many(keys.values())
+        versions = {}
+        for tag, key in keys.items():
+            if key not in found and create:
+                found[key] = time.time_ns()
+                if not self.shared.add(key, found[key], None):
+                    found[key] = self.shared.get(key)
+            versions[tag] = found.get(key)
+        return versions
+
+    def _invalidate(self, tags):
+        self.shared.set_many(
+            {TAG_KEY % tag: time.time_ns() for tag in tags}, None
+        )
+        with self._lock:
+            for key in [key for key, entry in self._local.items()
+                        if tags & set(entry[1])]:
+                del self._local[key]
+
+    def invalidate_tags(self, *tags):
+        """
+        Turn every value stored with one of ``tags`` into a miss, once the
+        current transaction commits: until then, the cached values still
+        match the committed rows other requests read.
+        """
+        tags = set(tags)
+        transaction.on_commit(lambda: self._invalidate(tags))
+
+    # Cache API
+
+    def _shared_get(self, key, version):
+        entry = self.shared.get(key, _MISSING, version=version)
+        if entry is _MISSING:
+            return _MISSING, {}
+        value, tags = entry
+        if tags and self._tag_versions(tags) != tags:
+            self._count("stale")
+            return _MISSING, {}
+        return value, tags
+
+    def _get(self, key, version):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self._local_get(local_key)
+        if value is not _MISSING:
+            self._count("local_hits")
+            return value
+        value, tags = self._shared_get(key, version)
+        if value is _MISSING:
+            self._count("misses")
+            return value
+        self._count("shared_hits")
+        self._local_set(local_key, value, tags, None)
+        return value
+
+    def get(self, key, default=None, version=None):
+        if self._bypass():
+            return default
+        value = self._get(key, version)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None,
+            tags=()):
+        if self._bypass():
+            return
+        self._store(key, value, timeout, version,
+                    self._tag_versions(tags, create=True))
+
+    def _store(self, key, value, timeout, version, versions):
+        ttl = self._ttl(timeout)
+        self.shared.set(key, (value, versions), ttl, version=version)
+        self._local_set(self.make_and_validate_key(key, version=version),
+                        value, versions, ttl)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None,
+            tags=()):
+        if self._bypass():
+            return False
+        ttl = self._ttl(timeout)
+        versions = self._tag_versions(tags, create=True)
+        added = self.shared.add(key, (value, versions), ttl, version=version)
+        if added:
+            self._local_set(
+                self.make_and_validate_key(key, version=version),
+                value, versions, ttl,
+            )
+        return added
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None,
+                   tags=()):
+        """
+        Return the cached value or compute it from ``default`` once: other
+        threads of this process wait for the one computing it, and other
+        processes for the one holding the lock in the shared store.
+        """
+        if self._bypass():
+            return default() if callable(default) else default
+        value = self._get(key, version)
+        if value is not _MISSING:
+            return value
+        local_key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            flight = self._flights.get(local_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[local_key] = threading.Event()
+        if not leader:
+            self._count("waits")
+            flight.wait(self.lock_timeout)
+            value = self._local_get(local_key)
+            if value is not _MISSING:
+                return value
+            return self._compute(key, default, timeout, version, tags)
+        try:
+            lock = LOCK_KEY % local_key
+            if not self.shared.add(lock, 1, self.lock_timeout):
+                value = self._wait_for_shared(key, version)
+                if value is not _MISSING:
+                    return value
+                lock = None
+            try:
+                return self._compute(key, default, timeout, version, tags)
+            finally:
+                if lock:
+                    self.shared.delete(lock)
+        finally:
+            with self._lock:
+                del self._flights[local_key]
+            flight.set()
+
+    def _wait_for_shared(self, key, version):
+        self._count("waits")
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value, tags = self._shared_get(key, version)
+            if value is not _MISSING:
+                self._local_set(
+                    self.make_and_validate_key(key, version=version),
+                    value, tags, None,
+                )
+                return value
+        return _MISSING
+
+    def _compute(self, key, default, timeout, version, tags):
+        # The tag versions are read first: an invalidation while the value
+        # is computed leaves it stale rather than cached as current.
+        versions = self._tag_versions(tags, create=True)
+        self._count("computes")
+        value = default() if callable(default) else default
+        self._store(key, value, timeout, version, versions)
+        return value
+
+    # A local hit needs no thread; anything else may do I/O.
+
+    def _local_hit(self, key, version):
+        if self._bypass():
+            return _MISSING
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self._local_get(local_key)
+        if value is not _MISSING:
+            self._count("local_hits")
+        return value
+
+    async def aget(self, key, default=None, version=None):
+        value = self._local_hit(key, version)
+        if value is not _MISSING:
+            return value
+        return await super().aget(key, default, version=version)
+
+    async def aget_or_set(self, key, default, timeout=DEFAULT_TIMEOUT,
+                          version=None, tags=()):
+        value = self._local_hit(key, version)
+        if value is not _MISSING:
+            return value
+        return await sync_to_async(self.get_or_set)(
+            key, default, timeout, version=version, tags=tags
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, self._ttl(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
@@ -0,0 +1,156 @@
+"""
+Dish cards: one row per dish holding what the dish list, the exports and
+the API show of it, so that a page is read from one index of one table,
+without joining the dish type or prefetching the cooks.
+
+kitchen.signals refreshes the cards a save, deletion or assignment
+change affects; bulk writes that send no signals refresh them themselves,
+and repair_dish_cards fixes any drift.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from kitchen.models import Dish, DishCard
+
+BATCH_SIZE = 500
+# Written by refresh_cards(); all but updated_at are compared for drift.
+CARD_FIELDS = (
+    "name",
+    "description",
+    "price",
+    "dish_type",
+    "dish_type_name",
+    "cook_count",
+    "cook_ids",
+    "cook_names",
+    "updated_at",
+)
+
+
+def build_cards(dishes):
+    """
+    Return the cards of a Dish queryset, read in one query that repeats a
+    dish's columns on the row of each of its cooks.
+    """
+    rows = {}
+    cooks = {}
+    for pk, *dish, cook_id, username in (
+        dishes.order_by("pk", "cooks__username", "cooks__id").values_list(
+            "pk", "name", "description", "price", "dish_type_id",
+            "dish_type__name", "cooks__id", "cooks__username",
+        )
+    ):
+        rows.setdefault(pk, dish)
+        cooks.setdefault(pk, [])
+        if cook_id is not None:
+            cooks[pk].append((cook_id, username))
+    now = timezone.now()
+    return [
+        DishCard(
+            id=pk,
+            name=name,
+            description=description,
+            price=price,
+            dish_type_id=dish_type_id,
+            dish_type_name=dish_type_name,
+            cook_count=len(cooks[pk]),
+            cook_ids=[cook_id for cook_id, _ in cooks[pk]],
+            cook_names=[username for _, username in cooks[pk]],
+            updated_at=now,
+        )
+        for pk, (name, description, price, dish_type_id, dish_type_name)
+        in rows.items()
+    ]
+
+
+def new_card(dish):
+    """Return the card of a dish just created, which has no cooks yet."""
+    return DishCard(
+        id=dish.pk,
+        name=dish.name,
+        description=dish.description,
+        price=dish.price,
+        dish_type_id=dish.dish_type_id,
+        dish_type_name=dish.dish_type.name if dish.dish_type_id else None,
+        updated_at=timezone.now(),
+    )
+
+
+def save_cards(cards):
+    DishCard.objects.bulk_create(
+        cards,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["id"],
+        update_fields=CARD_FIELDS,
+    )
+
+
+def refresh_cards(dish_pks):
+    """
+    Rewrite the cards of the given dishes, and delete those of the dishes
+    that no longer exist.
+
+    The cards are locked, in pk order, before they are built: a concurrent
+    refresh of the same card, e.g. for another cook's assignment, waits
+    for this transaction, then builds from a snapshot that includes it
+    instead of overwriting it with a card that misses its cook.
+    """
+    dish_pks = sorted(set(dish_pks))
+    for start in range(0, len(dish_pks), BATCH_SIZE):
+        batch = dish_pks[start:start + BATCH_SIZE]
+        with transaction.atomic(savepoint=False):
+            list(
+                DishCard.objects.select_for_update().filter(pk__in=batch)
+                .order_by("pk").values_list("pk", flat=True)
+            )
+            cards = build_cards(Dish.objects.filter(pk__in=batch))
+            if cards:
+                save_cards(cards)
+            missing = set(batch) - {card.pk for card in cards}
+            if missing:
+                DishCard.objects.filter(pk__in=missing).delete()
+
+
+def _compared(card):
+    return tuple(
+        getattr(card, card._meta.get_field(field).attname)
+        for field in CARD_FIELDS if field != "updated_at"
+    )
+
+
+def find_card_drift():
+    """
+    Return the pks of the dishes whose card is missing or differs from
+    the dish, and of the cards left by deleted dishes.
+    """
+    drift = []
+    last = 0
+    while True:
+        pks = list(
+            Dish.objects.filter(pk__gt=last).order_by("pk")
+            .values_list("pk", flat=True)[:BATCH_SIZE]
+        )
+        if not pks:
+            break
+        stored = DishCard.objects.in_bulk(pks)
+        drift.extend(
+            card.pk
+            for card in build_cards(Dish.objects.filter(pk__in=pks))
+            if card.pk not in stored
+            or _compared(stored[card.pk]) != _compared(card)
+        )
+        last = pks[-1]
+    drift.extend(
+        DishCard.objects.exclude(pk__in=Dish.objects.values("pk"))
+        .values_list("pk", flat=True)
+    )
+    return sorted(drift)
+
+
+def repair_cards():
+    """Refresh the cards that drifted, and return their pks."""
+    with transaction.atomic():
+        drift = find_card_drift()
+        refresh_cards(drift)
+    return drift
@@ -0,0 +1,160 @@
+import functools
+import hashlib
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.middleware.csrf import get_token
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from kitchen import fragments
+
+
+def touch(queryset):
+    """
+    Bump ``updated_at`` on the given rows with a single UPDATE, for changes
+    that do not go through save(): m2m edits and SET_NULL/CASCADE updates.
+    """
+    return queryset.update(updated_at=timezone.now())
+
+
+def latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(
+        ":".join(str(part) for part in parts).encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return quote_etag(digest)
+
+
+def _build_files():
+    for directory in (*engines["django"].engine.dirs,
+                      *get_app_template_dirs("templates")):
+        yield from sorted(
+            path for path in Path(directory).rglob("*") if path.is_file()
+        )
+    manifest_name = getattr(staticfiles_storage, "manifest_name", None)
+    if manifest_name and staticfiles_storage.exists(manifest_name):
+        yield Path(staticfiles_storage.path(manifest_name))
+
+
+@functools.cache
+def build_version():
+    """
+    Name the deployed build, so that a deploy that changes the markup or
+    the hashed static URLs changes every ETag: KITCHEN_BUILD_VERSION if
+    set, otherwise a digest of the templates and the static files manifest.
+    """
+    if settings.KITCHEN_BUILD_VERSION:
+        return settings.KITCHEN_BUILD_VERSION
+    digest = hashlib.md5(usedforsecurity=False)
+    for path in _build_files():
+        digest.update(str(path).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class Conditions:
+    """The outcome of checking a request against the page's validators."""
+
+    def __init__(self, response=None, etag=None, timestamp=None):
+        self.response = response
+        self.etag = etag
+        self.timestamp = timestamp
+
+    def finish(self, response):
+        if self.etag and response.status_code in (200, 304):
+            response["ETag"] = self.etag
+            if self.timestamp is not None:
+                response["Last-Modified"] = http_date(self.timestamp)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests carrying If-None-Match or If-Modified-Since with a
+    304 before the view touches its template, using validators computed
+    by ``get_validators()`` in at most one query.
+
+    The ETag includes the user's pk since pages show user-specific bits,
+    the CSRF secret since forms embed a token derived from it, and the
+    build version since a deploy changes the markup around the same rows.
+    Responses are marked private so that only the browser keeps them.
+    """
+    # A list has no Last-Modified: it loses rows without any remaining
+    # updated_at moving, so only its ETag can be trusted.
+    last_modified_validates = True
+
+    def get_validators(self):
+        """
+        Return (last_modified, *etag_parts), or None to skip the check;
+        last_modified may be None when only the ETag validates.
+        """
+        raise NotImplementedError
+
+    async def aget_validators(self):
+        raise NotImplementedError
+
+    def check_conditions(self, request, validators):
+        if not validators:
+            return Conditions()
+        last_modified, *parts = validators
+        timestamp = None
+        if last_modified is not None:
+            parts.insert(0, last_modified.isoformat())
+            timestamp = int(last_modified.timestamp())
+        # Issue the CSRF secret now if the request has none, or the page
+        # would embed one that its ETag does not account for.
+        get_token(request)
+        etag = make_etag(
+            request.user.pk,
+            request.META["CSRF_COOKIE"],
+            build_version(),
+            *parts,
+        )
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp if self.last_modified_validates else None,
+        )
+        return Conditions(response, etag, timestamp)
+
+    def get(self, request, *args, **kwargs):
+        conditions = self.check_conditions(request, self.get_validators())
+        response = conditions.response
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return conditions.finish(response)
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """
+    Validate a list page by the fragment versions of ``validator_models``,
+    which must cover everything the page shows. Every save, delete and
+    assignment bumps them, so a GET runs no query over the listed rows.
+    """
+    last_modified_validates = False
+    # Used by the API's detail endpoints, which read them with the row.
+    validator_fields = ("updated_at",)
+    validator_models = ()
+
+    def get_validators(self):
+        versions = fragments.get_versions(self.validator_models)
+        return (
+            None,
+            self.request.get_full_path(),
+            *(versions[model] for model in sorted(versions)),
+        )
+
+    async def aget_validators(self):
+        return await sync_to_async(self.get_validators)()
@@ -0,0 +1,143 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from kitchen.cache import get_cache
+from kitchen.models import Cook, Counter, Dish, DishType
+
+COUNTED_MODELS = {
+    "cooks": Cook,
+    "dish_types": DishType,
+    "dishes": Dish,
+}
+
+COUNTS_KEY = "kitchen:counts"
+COUNTS_TAG = "counts"
+
+
+def get_counts():
+    return get_cache().get_or_set(COUNTS_KEY, read_counts, tags=[COUNTS_TAG])
+
+
+async def aget_counts():
+    return await get_cache().aget_or_set(
+        COUNTS_KEY, read_counts, tags=[COUNTS_TAG]
+    )
+
+
+def read_counts():
+    counts = dict(
+        Counter.objects.filter(name__in=COUNTED_MODELS)
+        .values_list("name", "value")
+    )
+    missing = set(COUNTED_MODELS) - set(counts)
+    if missing:
+        counts.update(reconcile(names=missing))
+    return counts
+
+
+def adjust(name, delta):
+    updated = Counter.objects.filter(name=name).update(
+        value=F("value") + delta
+    )
+    if not updated:
+        transaction.on_commit(lambda: reconcile(names=[name]))
+    get_cache().invalidate_tags(COUNTS_TAG)
+
+
+def reconcile(names=None):
+    counts = {}
+    # In a transaction, so that the counts are read from the primary.
+    with transaction.atomic():
+        for name in names or COUNTED_MODELS:
+            counts[name] = COUNTED_MODELS[name].objects.count()
+            Counter.objects.update_or_create(
+                name=name, defaults={"value": counts[name]}
+            )
+    get_cache().invalidate_tags(COUNTS_TAG)
+    return counts
+
+
+# Dish.cooks rows per cook and Dish rows per dish type, denormalized into
+# dish_count and kept by kitchen.signals.
+DISH_COUNT_SOURCES = {
+    Cook: (Dish.cooks.through.objects, "cook"),
+    DishType: (Dish.objects, "dish_type"),
+}
+
+
+def actual_dish_count(model):
+    rows, column = DISH_COUNT_SOURCES[model]
+    counts = (
+        rows.filter(**{column: OuterRef("pk")}).order_by()
+        .values(column).annotate(count=Count("*")).values("count")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def shift_dish_counts(model, deltas):
+    """
+    Add each delta of a {pk: delta} mapping to dish_count in one UPDATE.
+    updated_at moves too, as the lists show the count.
+
+    Writers keep the counts with deltas rather than recount_dishes(): a
+    recount waiting on another transaction's row lock re-runs its COUNT
+    with a snapshot that misses that transaction's rows, while a delta is
+    applied to the value it committed.
+    """
+    pks_by_delta = {}
+    for pk, delta in deltas.items():
+        if delta:
+            pks_by_delta.setdefault(delta, []).append(pk)
+    if not pks_by_delta:
+        return 0
+    if len(pks_by_delta) == 1:
+        delta, = pks_by_delta
+        shift = Value(delta)
+    else:
+        shift = Case(
+            *(When(pk__in=pks, then=Value(delta))
+              for delta, pks in pks_by_delta.items()),
+            default=Value(0),
+        )
+    return model.objects.filter(
+        pk__in=[pk for pks in pks_by_delta.values() for pk in pks]
+    ).update(dish_count=F("dish_count") + shift, updated_at=timezone.now())
+
+
+def recount_dishes(model, pks=None):
+    """
+    Recompute dish_count on the given rows of ``model``, or on all of them,
+    in one UPDATE. updated_at moves too, as the lists show the count.
+    Only safe without concurrent writers; see shift_dish_counts().
+    """
+    queryset = model.objects.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    return queryset.update(
+        dish_count=actual_dish_count(model), updated_at=timezone.now()
+    )
+
+
+def find_dish_count_drift(model):
+    """Map the pks whose dish_count is wrong to (stored, actual)."""
+    return {
+        pk: (stored, actual)
+        for pk, stored, actual in (
+            model.objects.annotate(actual=actual_dish_count(model))
+            .exclude(dish_count=F("actual"))
+            .values_list("pk", "dish_count", "actual")
+        )
+    }
+
+
+def repair_dish_counts():
+    """Recount the rows whose dish_count drifted, and return the drift."""
+    drift = {}
+    with transaction.atomic():
+        for model in DISH_COUNT_SOURCES:
+            drift[model] = find_dish_count_drift(model)
+            if drift[model]:
+                recount_dishes(model, drift[model])
+    return drift
@@ -0,0 +1,327 @@
+"""
+Generate realistic-looking cooks, dish types, dishes and assignments for a
+development or benchmark database. The names, prices and assignments come
+from a seeded generator, so the same options give the same data; dish
+types follow a Zipf-like popularity, a few of them holding most dishes.
+
+Rows get ids past the largest existing one and are written with COPY on
+PostgreSQL and executemany() elsewhere. As neither sends signals, the
+dish cards are written alongside the dishes and the dish counts, counters
+and fragment versions are refreshed at the end, in the same transaction.
+The database should not be written to by anything else meanwhile.
+"""
+import json
+import time
+from bisect import bisect
+from decimal import Decimal
+from functools import lru_cache, partial
+from itertools import accumulate, count, islice, product
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import DateTimeField, JSONField, Max
+from django.utils import timezone
+
+from kitchen import counters, fragments
+from kitchen.cache import get_cache
+from kitchen.models import Cook, Dish, DishCard, DishType
+
+Assignment = Dish.cooks.through
+
+BATCH_SIZE = 10_000
+# Exponent of the dish type popularity: the n-th type gets 1 / n ** SKEW.
+SKEW = 1.1
+FRAGMENT_MODELS = ("cook", "dish_type", "dish", "assignment")
+
+FIRST_NAMES = (
+    "Anna", "Bohdan", "Daria", "Dmytro", "Emma", "Giulia", "Hana", "Ivan",
+    "James", "Julia", "Kateryna", "Lars", "Lucas", "Maria", "Marco",
+    "Mykola", "Nina", "Oksana", "Olena", "Oliver", "Pablo", "Petro",
+    "Sofia", "Taras", "Yuki", "Zoe",
+)
+LAST_NAMES = (
+    "Bondarenko", "Rossi", "Garcia", "Kovalenko", "Muller", "Tanaka",
+    "Shevchenko", "Smith", "Dubois", "Melnyk", "Novak", "Lindqvist",
+    "Moreau", "Tkachenko", "Silva", "Kowalski", "Brown", "Ricci",
+)
+# In order of popularity.
+DISH_TYPE_NAMES = (
+    "Main course", "Soup", "Salad", "Dessert", "Appetizer", "Pasta",
+    "Pizza", "Sandwich", "Breakfast", "Grill", "Seafood", "Side dish",
+    "Dumplings", "Pastry", "Curry", "Stew", "Sushi", "Drink",
+)
+REGIONS = (
+    "Ukrainian", "Italian", "French", "Japanese", "Mexican", "Georgian",
+    "Indian", "Greek", "Spanish", "Thai",
+)
+ADJECTIVES = (
+    "Smoked", "Roasted", "Grilled", "Spicy", "Creamy", "Crispy", "Braised",
+    "Fresh", "Baked", "Sweet", "Pickled", "Homemade", "Garlic", "Honey",
+)
+INGREDIENTS = (
+    "beet", "chicken", "salmon", "mushroom", "pork", "beef", "potato",
+    "cabbage", "tomato", "cheese", "cherry", "apple", "duck", "shrimp",
+    "lamb", "pumpkin", "spinach", "tuna", "lentil", "eggplant",
+)
+FORMS = (
+    "soup", "salad", "pie", "dumplings", "pancakes", "stew", "risotto",
+    "tart", "skewers", "rolls", "burger", "casserole", "borsch", "curry",
+)
+SIDES = (
+    "sour cream", "rye bread", "fresh herbs", "garlic butter", "rice",
+    "pickles", "a green salad", "roasted vegetables", "lemon", "chili oil",
+)
+METHODS = (
+    "slow-cooked", "served warm", "baked in a clay pot", "served chilled",
+    "finished on the grill", "made to order",
+)
+
+DISH_TYPE_COLUMNS = ("id", "name", "dish_count", "updated_at")
+COOK_COLUMNS = (
+    "id", "password", "is_superuser", "username", "first_name",
+    "last_name", "email", "is_staff", "is_active", "date_joined",
+    "years_of_experience", "dish_count", "updated_at",
+)
+DISH_COLUMNS = (
+    "id", "name", "description", "price", "dish_type_id", "updated_at",
+)
+ASSIGNMENT_COLUMNS = ("dish_id", "cook_id")
+CARD_COLUMNS = (
+    "id", "name", "description", "price", "dish_type_id", "dish_type_name",
+    "cook_count", "cook_ids", "cook_names", "updated_at",
+)
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+def use_copy():
+    if connection.vendor != "postgresql":
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    # psycopg2 has copy_expert() instead, on a file.
+    return is_psycopg3
+
+
+def _columns_sql(model, columns):
+    qn = connection.ops.quote_name
+    return (f"{qn(model._meta.db_table)} "
+            f"({', '.join(qn(column) for column in columns)})")
+
+
+def _preparers(model, columns, datetimes=True):
+    """Return, per column, how to prepare its values, or None to pass them."""
+    preparers = []
+    for column in columns:
+        field = model._meta.get_field(column)
+        if isinstance(field, JSONField):
+            preparers.append(json.dumps)
+        elif datetimes and isinstance(field, DateTimeField):
+            # The rows share a few timestamps.
+            preparers.append(lru_cache(partial(field.get_db_prep_save,
+                                               connection=connection)))
+        else:
+            preparers.append(None)
+    return preparers
+
+
+def _prepare(rows, preparers):
+    if not any(preparers):
+        return rows
+    return (
+        [prepare(value) if prepare else value
+         for value, prepare in zip(row, preparers)]
+        for row in rows
+    )
+
+
+def copy_rows(model, columns, rows):
+    """Write ``rows`` of ``columns`` values with one COPY ... FROM STDIN."""
+    # psycopg writes the other types itself, but a list as an array.
+    preparers = _preparers(model, columns, datetimes=False)
+    with connection.cursor() as cursor:
+        with cursor.copy(
+            f"COPY {_columns_sql(model, columns)} FROM STDIN"
+        ) as copy:
+            for row in _prepare(rows, preparers):
+                copy.write_row(row)
+
+
+def insert_rows(model, columns, rows, batch_size=BATCH_SIZE):
+    """
+    Write ``rows`` with executemany(): bulk_create() would spend most of
+    the time building and preparing a model instance per row.
+    """
+    preparers = _preparers(model, columns)
+    sql = (f"INSERT INTO {_columns_sql(model, columns)} "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+    rows = iter(_prepare(rows, preparers))
+    with connection.cursor() as cursor:
+        while batch := list(islice(rows, batch_size)):
+            cursor.executemany(sql, batch)
+
+
+def write_rows(model, columns, rows, batch_size=BATCH_SIZE):
+    if use_copy():
+        copy_rows(model, columns, rows)
+    else:
+        insert_rows(model, columns, rows, batch_size)
+
+
+def reset_sequences(models):
+    # Rows written with explicit ids do not advance the pk sequences.
+    sql = connection.ops.sequence_reset_sql(no_style(), models)
+    if sql:
+        with connection.cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
+
+
+class KitchenDataGenerator:
+    """Generate the rows of dish types, cooks, dishes and assignments."""
+
+    def __init__(self, rng, cooks, dishes, assignments_per_dish,
+                 dish_types=len(DISH_TYPE_NAMES), password=None):
+        self.rng = rng
+        self.cook_count = cooks
+        self.dish_count = dishes
+        self.assignments_per_dish = min(assignments_per_dish, cooks)
+        self.dish_type_count = dish_types
+        self.password = password
+        self.now = timezone.now()
+
+    def dish_type_names(self, taken=()):
+        """Return the names of the new types, skipping those ``taken``."""
+        names = [*DISH_TYPE_NAMES,
+                 *(f"{region} {name.lower()}"
+                   for name, region in product(DISH_TYPE_NAMES, REGIONS))]
+        numbered = (f"{name} {number}" if number > 1 else name
+                    for number in count(1) for name in names)
+        return list(islice((name for name in numbered if name not in taken),
+                           self.dish_type_count))
+
+    def dish_type_rows(self, first_id, taken=()):
+        return [
+            (first_id + i, name, 0, self.now)
+            for i, name in enumerate(self.dish_type_names(taken))
+        ]
+
+    def cook_rows(self, first_id):
+        rng = self.rng
+        # Hashed once: PBKDF2 per cook would take longer than the rest.
+        password = make_password(self.password)
+        rows = []
+        for pk in range(first_id, first_id + self.cook_count):
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            # Letters and digits only, so that the database collation
+            # orders the usernames as Python does.
+            username = f"{first_name}{last_name}{pk}".lower()
+            rows.append((
+                pk, password, False, username, first_name, last_name,
+                f"{username}@example.com", False, True, self.now,
+                min(int(rng.expovariate(1 / 8)), 40), 0, self.now,
+            ))
+        return rows
+
+    def price(self):
+        # Log-normal around 12, rounded to a half and ending in .49/.99.
+        value = min(max(self.rng.lognormvariate(2.5, 0.6), 1), 500)
+        return Decimal(round(value * 2)) / 2 - Decimal("0.01")
+
+    def dish(self):
+        rng = self.rng
+        name = (f"{rng.choice(ADJECTIVES)} {rng.choice(INGREDIENTS)} "
+                f"{rng.choice(FORMS)}")
+        description = (f"{name} with {rng.choice(SIDES)}, "
+                       f"{rng.choice(METHODS)}.")
+        return name, description, self.price()
+
+    def dish_batches(self, first_id, dish_types, cooks,
+                     batch_size=BATCH_SIZE):
+        """
+        Yield the (dish, assignment, card) rows of up to ``batch_size``
+        dishes at a time. ``dish_types`` and ``cooks`` are the rows written
+        before.
+        """
+        rng = self.rng
+        type_weights = list(accumulate(
+            1 / rank ** SKEW for rank in range(1, len(dish_types) + 1)
+        ))
+        # Sampled by index into the cooks in username order, as the cards
+        # list them.
+        cooks = sorted((row[3], row[0]) for row in cooks)
+        pks = range(first_id, first_id + self.dish_count)
+        for start in range(0, len(pks), batch_size):
+            dishes, assignments, cards = [], [], []
+            for pk in pks[start:start + batch_size]:
+                name, description, price = self.dish()
+                dish_type_id = dish_type_name = None
+                if dish_types:
+                    dish_type_id, dish_type_name = dish_types[bisect(
+                        type_weights, rng.random() * type_weights[-1]
+                    )][:2]
+                assigned = [cooks[i] for i in sorted(rng.sample(
+                    range(len(cooks)), self.assignments_per_dish
+                ))]
+                dishes.append((pk, name, description, price, dish_type_id,
+                               self.now))
+                assignments.extend((pk, cook_id) for _, cook_id in assigned)
+                cards.append((
+                    pk, name, description, price, dish_type_id,
+                    dish_type_name, len(assigned),
+                    [cook_id for _, cook_id in assigned],
+                    [username for username, _ in assigned], self.now,
+                ))
+            yield dishes, assignments, cards
+
+    def write(self, batch_size=BATCH_SIZE, progress=None):
+        """
+        Write every row in one transaction, refresh what the signals would
+        have, and return the number of rows written per table.
+        """
+        started = time.perf_counter()
+        written = dict.fromkeys(("dish types", "cooks", "dishes",
+                                 "assignments"), 0)
+        with transaction.atomic():
+            dish_types = self.dish_type_rows(
+                next_id(DishType),
+                set(DishType.objects.values_list("name", flat=True)),
+            )
+            write_rows(DishType, DISH_TYPE_COLUMNS, dish_types, batch_size)
+            written["dish types"] = len(dish_types)
+            cooks = self.cook_rows(next_id(Cook))
+            write_rows(Cook, COOK_COLUMNS, cooks, batch_size)
+            written["cooks"] = len(cooks)
+            # The cards share the dishes' ids, and may outlive a dish
+            # deleted without its signals.
+            first_dish = max(next_id(Dish), next_id(DishCard))
+            for dishes, assignments, cards in self.dish_batches(
+                first_dish, dish_types, cooks, batch_size
+            ):
+                write_rows(Dish, DISH_COLUMNS, dishes, batch_size)
+                write_rows(Assignment, ASSIGNMENT_COLUMNS, assignments,
+                           batch_size)
+                write_rows(DishCard, CARD_COLUMNS, cards, batch_size)
+                written["dishes"] += len(dishes)
+                written["assignments"] += len(assignments)
+                if progress:
+                    progress(written["dishes"],
+                             time.perf_counter() - started)
+            reset_sequences([DishType, Cook, Dish])
+            for model, rows in ((DishType, dish_types), (Cook, cooks)):
+                if rows:
+                    model.objects.filter(
+                        pk__gte=rows[0][0], pk__lte=rows[-1][0]
+                    ).update(
+                        dish_count=counters.actual_dish_count(model),
+                        updated_at=self.now,
+                    )
+            counters.reconcile()
+        for model in FRAGMENT_MODELS:
+            fragments.bump_version(model)
+        get_cache().invalidate_tags(*FRAGMENT_MODELS)
+        return written
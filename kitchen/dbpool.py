@@ -0,0 +1,45 @@
+from django.db import connections
+
+# psycopg_pool counters reported by get_pool_stats(), under shorter names.
+POOL_STATS = {
+    "checkouts": "requests_num",
+    "waits": "requests_queued",
+    "wait_ms": "requests_wait_ms",
+    "timeouts": "requests_errors",
+    "connections_opened": "connections_num",
+    "connections_lost": "connections_lost",
+    "size": "pool_size",
+    "available": "pool_available",
+}
+
+
+def pool_options(workers, threads, max_connections=None, timeout=10.0):
+    """
+    Return the psycopg_pool options for one gunicorn worker process.
+
+    Every thread holds at most one connection, so a pool of ``threads``
+    never makes a request wait; ``max_connections`` caps the pools of all
+    workers together below the server's limit.
+    """
+    max_size = threads
+    if max_connections:
+        max_size = max(1, min(max_size, max_connections // workers))
+    return {
+        "min_size": max(1, max_size // 2),
+        "max_size": max_size,
+        "timeout": timeout,
+    }
+
+
+def get_pool_stats():
+    """Return the counters of the connection pools of this process."""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        raw = pool.get_stats()
+        stats[alias] = {
+            name: raw.get(key, 0) for name, key in POOL_STATS.items()
+        }
+    return stats
@@ -0,0 +1,224 @@
+"""
+Faceted filtering of the dish list by dish type, price range and cook.
+
+The selection lives in the query string (``?type=1&type=2&price=5-10``):
+options of one facet are ORed, facets are ANDed. Each facet counts its
+options under the other facets' selection, so that an option shows how
+many dishes selecting it would add. The counts of all three facets come
+from one UNION ALL of grouped queries and are cached per selection.
+"""
+import hashlib
+from typing import NamedTuple
+
+from django.db.models import Case, Count, Exists, OuterRef, Q, Value, When
+
+from kitchen.cache import get_cache
+from kitchen.models import Cook, Dish, DishType
+from kitchen.search import search
+
+# Key, label, lower bound (inclusive), upper bound (exclusive).
+PRICE_RANGES = (
+    ("under-5", "Under 5", None, 5),
+    ("5-10", "5 to 10", 5, 10),
+    ("10-20", "10 to 20", 10, 20),
+    ("20-up", "20 and up", 20, None),
+)
+FACETS = ("type", "price", "cook")
+FACET_KEY = "kitchen:facets:%s"
+# Saves and deletes of these invalidate the cached counts.
+FACET_TAGS = ["dish", "dish_type", "cook", "assignment"]
+MAX_COOK_OPTIONS = 10
+
+
+class FacetOption(NamedTuple):
+    value: str
+    label: str
+    count: int
+    selected: bool
+    query: str
+
+
+def _ids(values):
+    return sorted({int(value) for value in values if value.isdigit()})
+
+
+def _price_q(key):
+    _, _, low, high = next(r for r in PRICE_RANGES if r[0] == key)
+    q = Q()
+    if low is not None:
+        q &= Q(price__gte=low)
+    if high is not None:
+        q &= Q(price__lt=high)
+    return q
+
+
+class DishFacets:
+    def __init__(self, params):
+        self.params = params
+        self.term = params.get("name") or ""
+        prices = {key for key, *_ in PRICE_RANGES}
+        self.selected = {
+            "type": _ids(params.getlist("type")),
+            "price": sorted(set(params.getlist("price")) & prices),
+            "cook": _ids(params.getlist("cook")),
+        }
+        self._counts = None
+
+    @property
+    def active(self):
+        return any(self.selected.values())
+
+    def _facet_q(self, facet):
+        values = self.selected[facet]
+        if not values:
+            return Q()
+        if facet == "type":
+            return Q(dish_type__in=values)
+        if facet == "price":
+            q = Q()
+            for key in values:
+                q |= _price_q(key)
+            return q
+        # Exists rather than a join, which would repeat dishes with several
+        # of the selected cooks.
+        return Q(Exists(Dish.cooks.through.objects.filter(
+            dish=OuterRef("pk"), cook__in=values
+        )))
+
+    def _filters(self, exclude=None):
+        q = Q()
+        for facet in FACETS:
+            if facet != exclude:
+                q &= self._facet_q(facet)
+        return q
+
+    def filter(self, queryset):
+        """Apply the selection to a dish queryset, e.g. the list's."""
+        return queryset.filter(self._filters())
+
+    def _base(self):
+        queryset = Dish.objects.order_by()
+        if self.term:
+            matches = search(Dish.objects.all(), "name", self.term)
+            queryset = queryset.filter(pk__in=matches.order_by().values("pk"))
+        return queryset
+
+    def count_queryset(self):
+        """
+        Return (facet, key, label, count) rows of every facet, from one
+        statement.
+        """
+        base = self._base()
+        types = (
+            base.filter(self._filters("type"), dish_type__isnull=False)
+            .values("dish_type", "dish_type__name")
+            .annotate(facet=Value("type"), count=Count("pk"))
+            .values_list("facet", "dish_type", "dish_type__name", "count")
+        )
+        prices = (
+            base.filter(self._filters("price"))
+            .annotate(bucket=Case(*[
+                When(_price_q(key), then=Value(index))
+                for index, (key, *_) in enumerate(PRICE_RANGES)
+            ]))
+            .values("bucket")
+            .annotate(facet=Value("price"), label=Value(""),
+                      count=Count("pk"))
+            .values_list("facet", "bucket", "label", "count")
+        )
+        cooks = (
+            base.filter(self._filters("cook"), cooks__isnull=False)
+            .values("cooks", "cooks__username")
+            .annotate(facet=Value("cook"), count=Count("pk"))
+            .values_list("facet", "cooks", "cooks__username", "count")
+        )
+        return types.union(prices, cooks, all=True)
+
+    def _read_counts(self):
+        counts = {facet: {} for facet in FACETS}
+        for facet, key, label, count in self.count_queryset():
+            if key is None:
+                continue
+            if facet == "price":
+                key, label = PRICE_RANGES[key][:2]
+            counts[facet][str(key)] = (label, count)
+        return counts
+
+    def cache_key(self):
+        state = repr((self.term, sorted(self.selected.items())))
+        return FACET_KEY % hashlib.md5(
+            state.encode(), usedforsecurity=False
+        ).hexdigest()
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = get_cache().get_or_set(
+                self.cache_key(), self._read_counts, tags=FACET_TAGS
+            )
+        return self._counts
+
+    async def acounts(self):
+        if self._counts is None:
+            self._counts = await get_cache().aget_or_set(
+                self.cache_key(), self._read_counts, tags=FACET_TAGS
+            )
+        return self._counts
+
+    def hidden_fields(self):
+        """Return (name, value) of the selection, for the search form."""
+        return [(facet, str(value)) for facet in FACETS
+                for value in self.selected[facet]]
+
+    def _query(self, facet, value):
+        """Return the query string toggling ``value`` of ``facet``."""
+        params = self.params.copy()
+        values = params.getlist(facet)
+        if value in values:
+            values.remove(value)
+        else:
+            values.append(value)
+        params.setlist(facet, values)
+        params.pop("cursor", None)
+        return "?" + params.urlencode()
+
+    def _option(self, facet, value, label, count):
+        selected = [str(v) for v in self.selected[facet]]
+        return FacetOption(value, label, count, value in selected,
+                           self._query(facet, value))
+
+    def _with_selected(self, facet, counts):
+        """
+        Add the selected values that have no count, with a count of 0, so
+        that they can still be unselected. A stale id keeps the id as label.
+        """
+        missing = [pk for pk in self.selected[facet] if str(pk) not in counts]
+        if not missing:
+            return counts
+        model, field = (DishType, "name") if facet == "type" else (
+            Cook, "username")
+        labels = dict(model.objects.filter(pk__in=missing)
+                      .values_list("pk", field))
+        return {**counts, **{str(pk): (labels.get(pk, str(pk)), 0)
+                             for pk in missing}}
+
+    def options(self):
+        """Map each facet to the options to show, with their counts."""
+        counts = self.counts()
+        types = sorted(self._with_selected("type", counts["type"]).items(),
+                       key=lambda item: item[1][0])
+        cooks = sorted(self._with_selected("cook", counts["cook"]).items(),
+                       key=lambda item: (-item[1][1], item[1][0]))
+        selected_cooks = {str(pk) for pk in self.selected["cook"]}
+        cooks = [item for i, item in enumerate(cooks)
+                 if i < MAX_COOK_OPTIONS or item[0] in selected_cooks]
+        return {
+            "type": [self._option("type", key, label, count)
+                     for key, (label, count) in types],
+            "price": [
+                self._option("price", key, label,
+                             counts["price"].get(key, (label, 0))[1])
+                for key, label, *_ in PRICE_RANGES
+            ],
+            "cook": [self._option("cook", key, label, count)
+                     for key, (label, count) in cooks],
+        }
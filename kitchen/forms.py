@@ -1,8 +1,12 @@
+import functools
+
 from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 
+from kitchen.lookups import get_dish_type_choices
 from kitchen.models import Dish, Cook
+from kitchen.search import search
 
 
 class DishForm(forms.ModelForm):
@@ -15,6 +19,14 @@ class DishForm(forms.ModelForm):
         model = Dish
         fields = "__all__"
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        dish_type = self.fields["dish_type"]
+        # Only read when the select is rendered, and then once.
+        dish_type.choices = functools.cache(
+            lambda: [("", dish_type.empty_label), *get_dish_type_choices()]
+        )
+
 
 class CookCreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
@@ -72,4 +84,124 @@ class DishTypeSearchForm(forms.Form):
                 "placeholder": "Search by name"
             }
         )
-    )
\ No newline at end of file
+    )
+
+
+class IdListInput(forms.TextInput):
+    """A text input of ids, also reading them from repeated parameters."""
+
+    def value_from_datadict(self, data, files, name):
+        if hasattr(data, "getlist"):
+            return data.getlist(name)
+        return data.get(name)
+
+    def format_value(self, value):
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(item) for item in value)
+        return super().format_value(value)
+
+
+class IdListField(forms.Field):
+    """
+    Primary keys of ``model`` as "1, 2 3", checked in one query for the
+    submitted ids only, so that no choice list of the table is built.
+    """
+    widget = IdListInput
+    default_error_messages = {
+        "invalid": "Enter ids separated by commas or spaces.",
+        "too_many": "Select at most %(limit)d at a time.",
+        "missing": "Unknown ids: %(ids)s.",
+    }
+
+    def __init__(self, model, max_ids=1000, **kwargs):
+        self.model = model
+        self.max_ids = max_ids
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            value = [value]
+        ids = []
+        for item in value or ():
+            for part in item.replace(",", " ").split():
+                if not part.isdigit():
+                    raise forms.ValidationError(
+                        self.error_messages["invalid"], code="invalid"
+                    )
+                ids.append(int(part))
+        return list(dict.fromkeys(ids))
+
+    def validate(self, value):
+        super().validate(value)
+        if len(value) > self.max_ids:
+            raise forms.ValidationError(
+                self.error_messages["too_many"], code="too_many",
+                params={"limit": self.max_ids},
+            )
+        found = set(
+            self.model._default_manager.filter(pk__in=value)
+            .values_list("pk", flat=True)
+        ) if value else set()
+        missing = [pk for pk in value if pk not in found]
+        if missing:
+            raise forms.ValidationError(
+                self.error_messages["missing"], code="missing",
+                params={"ids": ", ".join(map(str, missing))},
+            )
+
+
+class BulkAssignmentForm(forms.Form):
+    """
+    Pick dishes by id or by a name search, and cooks by id. Only the
+    submitted ids are read, however large the tables are.
+    """
+    ASSIGN = "assign"
+    UNASSIGN = "unassign"
+    MAX_DISHES = 1000
+
+    dishes = IdListField(
+        Dish,
+        max_ids=MAX_DISHES,
+        required=False,
+        help_text="Dish ids, separated by commas or spaces.",
+    )
+    dish_search = forms.CharField(
+        max_length=255,
+        required=False,
+        label="Dishes named",
+        help_text=f"Also select the dishes whose name matches, up to "
+                  f"{MAX_DISHES}.",
+    )
+    cooks = IdListField(
+        get_user_model(),
+        help_text="Cook ids, separated by commas or spaces.",
+    )
+    action = forms.ChoiceField(
+        choices=(
+            (ASSIGN, "Assign cooks to dishes"),
+            (UNASSIGN, "Remove cooks from dishes"),
+        ),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        dish_ids = cleaned_data.get("dishes") or []
+        term = cleaned_data.get("dish_search")
+        if term:
+            matches = list(
+                search(Dish.objects.order_by(), "name", term)
+                .values_list("pk", flat=True)[:self.MAX_DISHES + 1]
+            )
+            dish_ids = list(dict.fromkeys([*dish_ids, *matches]))
+            if len(dish_ids) > self.MAX_DISHES:
+                self.add_error("dish_search", forms.ValidationError(
+                    "More than %(limit)d dishes selected; narrow the "
+                    "search.",
+                    code="too_many", params={"limit": self.MAX_DISHES},
+                ))
+        if "dishes" in cleaned_data and not dish_ids and not self.errors:
+            raise forms.ValidationError(
+                "Select dishes by id or by name.", code="required"
+            )
+        cleaned_data["dishes"] = dish_ids
+        return cleaned_data
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = "kitchen:fragment-version:%s"
+FRAGMENT_KEY = "kitchen:fragment:%s:%s:%s"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.KITCHEN_FRAGMENT_CACHE]
+
+
+def _new_version():
+    # Start from the clock rather than 1, so a version evicted from the
+    # cache never comes back with a value that old fragments used.
+    return time.time_ns() // 1000
+
+
+def get_versions(models):
+    cache = get_cache()
+    keys = {model: VERSION_KEY % model for model in models}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for model, key in keys.items():
+        if key not in found:
+            found[key] = _new_version()
+            cache.add(key, found[key], None)
+        versions[model] = found[key]
+    return versions
+
+
+def _bump(model):
+    cache = get_cache()
+    key = VERSION_KEY % model
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def bump_version(model):
+    """
+    Invalidate every fragment depending on ``model``. The version is bumped
+    again on commit so that a fragment rendered by a concurrent request
+    from not yet committed data is not kept.
+    """
+    _bump(model)
+    transaction.on_commit(lambda: _bump(model))
+
+
+def make_key(name, vary_on, versions):
+    return FRAGMENT_KEY % (
+        name,
+        ":".join(str(value) for value in vary_on),
+        ".".join(str(versions[model]) for model in sorted(versions)),
+    )
+
+
+def get_fragment(key):
+    return get_cache().get(key)
+
+
+def set_fragment(key, value):
+    get_cache().set(key, value, settings.KITCHEN_FRAGMENT_CACHE_TIMEOUT)
+
+
+def record(name, hit):
+    with _stats_lock:
+        _stats[(name, "hits" if hit else "misses")] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        stats = {}
+        for (name, outcome), count in _stats.items():
+            stats.setdefault(name, {"hits": 0, "misses": 0})[outcome] = count
+        return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,68 @@
+"""
+Responsive variants of the static images.
+
+``optimize_images``, run by build.sh before collectstatic, encodes each
+source image as AVIF and WebP at the widths below and records them in a
+JSON manifest; ``{% picture %}`` reads it to emit ``srcset`` candidates.
+"""
+import functools
+import json
+import os
+
+from django.conf import settings
+
+# Format -> encoder quality, in the order browsers should try them.
+FORMATS = {"avif": 50, "webp": 75}
+WIDTHS = (480, 960, 1440, 1920)
+
+
+def variant_widths(width, widths=WIDTHS):
+    """Return the widths to encode an image ``width`` pixels wide at."""
+    chosen = [w for w in widths if w < width]
+    if width <= max(widths):
+        chosen.append(width)
+    return chosen
+
+
+def encode(source, image_format, widths, output_dir, force=False):
+    """
+    Write ``source`` as ``image_format`` at each of ``widths`` and return
+    ``(width, path, bytes)`` for every variant. Variants newer than the
+    source are kept as they are unless ``force`` is set.
+    """
+    from PIL import Image
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    source_mtime = os.path.getmtime(source)
+    written = []
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        for width in widths:
+            path = os.path.join(output_dir, f"{stem}-{width}.{image_format}")
+            if force or not os.path.exists(path) or (
+                os.path.getmtime(path) < source_mtime
+            ):
+                height = round(image.height * width / image.width)
+                image.resize((width, height), Image.LANCZOS).save(
+                    path, image_format.upper(),
+                    quality=FORMATS[image_format],
+                )
+            written.append((width, path, os.path.getsize(path)))
+    return written
+
+
+@functools.lru_cache
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def get_variants(name):
+    """
+    Return the manifest entry of a static image, or None when it has no
+    variants, e.g. before optimize_images has run.
+    """
+    return load_manifest(str(settings.KITCHEN_IMAGE_VARIANTS)).get(name)
@@ -0,0 +1,349 @@
+"""
+Replay a weighted mix of kitchen traffic from logged-in cooks, through the
+Django test client in this process or over HTTP against a running server,
+and measure throughput and latency percentiles per URL name.
+
+The cooks, dish types and dishes the requests use are seeded with a
+unique prefix and deleted afterwards; against a server they must be
+written to the database the server reads.
+"""
+import http.client
+import math
+import random
+import secrets
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from importlib import import_module
+from typing import NamedTuple
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.test import Client
+from django.urls import reverse
+
+from kitchen.models import Cook, Dish, DishType
+
+# Scenario -> weight.
+DEFAULT_MIX = {
+    "dashboard": 10,
+    "dish-list": 15,
+    "search": 20,
+    "dish-detail": 30,
+    "toggle-assign": 15,
+    "create": 5,
+    "update": 5,
+}
+PERCENTILES = (50, 95, 99)
+SEARCH_WORDS = ("borsch", "soup", "salad", "dumplings", "pancakes", "pie")
+
+
+class LoadRequest(NamedTuple):
+    url_name: str
+    method: str
+    path: str
+    data: dict
+
+
+def parse_mix(spec):
+    """Parse ``dashboard=10,search=30`` into a scenario -> weight dict."""
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(
+                f"Unknown scenario {name!r}; pick from {', '.join(SCENARIOS)}."
+            )
+        try:
+            mix[name] = int(weight or 1)
+        except ValueError:
+            raise ValueError(f"The weight of {name!r} must be an integer.")
+        if mix[name] < 0:
+            raise ValueError(f"The weight of {name!r} cannot be negative.")
+    if not any(mix.values()):
+        raise ValueError("The mix needs a positive weight.")
+    return mix
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return None
+    return values[max(math.ceil(len(values) * pct / 100) - 1, 0)]
+
+
+class TrafficFixture:
+    """The seeded rows and sessions the scenarios request."""
+
+    def __init__(self, cooks, dishes):
+        self.prefix = f"loadtest-{uuid.uuid4().hex[:8]}"
+        self.cook_count = cooks
+        self.dish_count = dishes
+        self.cooks = []
+        self.dish_pks = []
+        self.dish_type_pk = None
+        self.session_keys = []
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def seed(self, rng):
+        # Through the ORM, so that the signals keep the counters, dish
+        # counts and dish cards the pages read.
+        with transaction.atomic():
+            dish_type = DishType.objects.create(name=f"{self.prefix} type")
+            self.dish_type_pk = dish_type.pk
+            self.cooks = [
+                Cook.objects.create(username=f"{self.prefix}-cook-{i}")
+                for i in range(self.cook_count)
+            ]
+            for i in range(self.dish_count):
+                dish = Dish.objects.create(
+                    name=f"{self.prefix} {rng.choice(SEARCH_WORDS)} {i}",
+                    description="Load test dish",
+                    price=rng.randint(100, 5000) / 100,
+                    dish_type=dish_type,
+                )
+                dish.cooks.add(*rng.sample(self.cooks,
+                                           min(2, len(self.cooks))))
+                self.dish_pks.append(dish.pk)
+        for cook in self.cooks:
+            client = Client()
+            client.force_login(cook)
+            self.session_keys.append(
+                client.cookies[settings.SESSION_COOKIE_NAME].value
+            )
+
+    def cleanup(self):
+        engine = import_module(settings.SESSION_ENGINE)
+        for session_key in self.session_keys:
+            engine.SessionStore(session_key).delete()
+        Dish.objects.filter(name__startswith=self.prefix).delete()
+        Cook.objects.filter(username__startswith=self.prefix).delete()
+        DishType.objects.filter(name__startswith=self.prefix).delete()
+
+    def next_name(self):
+        with self._lock:
+            self._created += 1
+            return f"{self.prefix} created {self._created}"
+
+    def dish_form(self, rng, cook, name):
+        return {
+            "name": name,
+            "description": "Load test dish",
+            "price": f"{rng.randint(100, 5000) / 100:.2f}",
+            "dish_type": self.dish_type_pk,
+            "cooks": [cook.pk],
+        }
+
+
+def _get(url_name, *args, **query):
+    path = reverse(url_name, args=args)
+    return LoadRequest(url_name, "GET",
+                       f"{path}?{urlencode(query)}" if query else path, {})
+
+
+def _post(url_name, data, *args):
+    return LoadRequest(url_name, "POST", reverse(url_name, args=args), data)
+
+
+# Scenario -> function(fixture, rng, cook) returning the request to send.
+SCENARIOS = {
+    "dashboard": lambda fixture, rng, cook: _get("kitchen:index"),
+    "dish-list": lambda fixture, rng, cook: _get("kitchen:dish-list"),
+    "search": lambda fixture, rng, cook: _get(
+        "kitchen:dish-list", name=rng.choice(SEARCH_WORDS)
+    ),
+    "dish-detail": lambda fixture, rng, cook: _get(
+        "kitchen:dish-detail", rng.choice(fixture.dish_pks)
+    ),
+    "toggle-assign": lambda fixture, rng, cook: _post(
+        "kitchen:toggle-dish-assign", {}, rng.choice(fixture.dish_pks)
+    ),
+    "create": lambda fixture, rng, cook: _post(
+        "kitchen:dish-create",
+        fixture.dish_form(rng, cook, fixture.next_name()),
+    ),
+    "update": lambda fixture, rng, cook: _post(
+        "kitchen:dish-update",
+        fixture.dish_form(
+            rng, cook, f"{fixture.prefix} {rng.choice(SEARCH_WORDS)} updated"
+        ),
+        rng.choice(fixture.dish_pks),
+    ),
+}
+
+
+class ClientTransport:
+    """Send requests through the Django test client, in this process."""
+
+    def __init__(self, session_key):
+        # Errors of the views are answered with a 500, as by a server.
+        self.client = Client(raise_request_exception=False)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+
+    def send(self, request):
+        if request.method == "POST":
+            response = self.client.post(request.path, request.data)
+        else:
+            response = self.client.get(request.path)
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HttpTransport:
+    """Send requests over one keep-alive HTTP connection to ``base_url``."""
+
+    def __init__(self, base_url, session_key):
+        url = urlsplit(base_url)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"Cannot load test {base_url!r}.")
+        self.connection_class = (
+            http.client.HTTPSConnection if url.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.netloc = url.netloc
+        self.root = url.path.rstrip("/")
+        # Checked by the CSRF middleware over HTTPS.
+        self.referer = f"{url.scheme}://{url.netloc}/"
+        # An unmasked secret is a valid token for its own cookie.
+        self.csrf_token = secrets.token_hex(16)
+        self.cookie = (
+            f"{settings.SESSION_COOKIE_NAME}={session_key}; "
+            f"{settings.CSRF_COOKIE_NAME}={self.csrf_token}"
+        )
+        self.connection = None
+
+    def send(self, request):
+        headers = {"Cookie": self.cookie}
+        body = None
+        if request.method == "POST":
+            body = urlencode(request.data, doseq=True)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            headers["X-CSRFToken"] = self.csrf_token
+            headers["Referer"] = self.referer
+        if self.connection is None:
+            self.connection = self.connection_class(self.netloc, timeout=30)
+        try:
+            self.connection.request(request.method, self.root + request.path,
+                                    body, headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            # The server closed the connection: report it and reconnect.
+            self.close()
+            raise
+        if response.getheader("Connection", "").lower() == "close":
+            self.close()
+        return response.status
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class LoadRun:
+    """Drive the requests from ``concurrency`` threads and collect timings."""
+
+    def __init__(self, fixture, mix, make_transport, concurrency=8,
+                 seed=None):
+        self.fixture = fixture
+        self.scenarios = list(mix)
+        self.weights = [mix[name] for name in self.scenarios]
+        self.make_transport = make_transport
+        self.concurrency = concurrency
+        self.seed = seed
+        self._remaining = 0
+        self._lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def _take(self):
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+    def _record(self, request, elapsed, status):
+        # A redirect answering a GET is the login page: the session is gone.
+        error = (not isinstance(status, int) or status >= 400
+                 or (request.method == "GET" and status >= 300))
+        with self._lock:
+            self.timings[request.url_name].append(elapsed)
+            self.statuses[request.url_name][status] += 1
+            self.errors[request.url_name] += error
+
+    def _worker(self, index, record):
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        cooks = self.fixture.cooks
+        cook = cooks[index % len(cooks)]
+        transport = self.make_transport(
+            self.fixture.session_keys[index % len(cooks)]
+        )
+        try:
+            while self._take():
+                scenario = rng.choices(self.scenarios, self.weights)[0]
+                request = SCENARIOS[scenario](self.fixture, rng, cook)
+                started = time.perf_counter()
+                try:
+                    status = transport.send(request)
+                except (OSError, http.client.HTTPException) as e:
+                    status = type(e).__name__
+                if record:
+                    self._record(
+                        request, (time.perf_counter() - started) * 1000,
+                        status,
+                    )
+        finally:
+            transport.close()
+            connections.close_all()
+
+    def _run(self, requests, record):
+        self._remaining = requests
+        threads = [
+            threading.Thread(target=self._worker, args=(index, record))
+            for index in range(self.concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def run(self, requests, warmup=0):
+        """Send ``warmup`` unmeasured requests, then ``requests``."""
+        if warmup:
+            self._run(warmup, record=False)
+        return self.summarize(self._run(requests, record=True))
+
+    def summarize(self, elapsed):
+        urls = {}
+        for url_name in sorted(self.timings):
+            timings = sorted(self.timings[url_name])
+            statuses = self.statuses[url_name]
+            urls[url_name] = {
+                "requests": len(timings),
+                "throughput": len(timings) / elapsed,
+                "errors": self.errors[url_name],
+                "statuses": {str(status): count
+                             for status, count in sorted(
+                                 statuses.items(), key=lambda item: str(item[0])
+                             )},
+                **{f"p{pct}": percentile(timings, pct) for pct in PERCENTILES},
+                "max": timings[-1],
+            }
+        total = sum(url["requests"] for url in urls.values())
+        return {
+            "elapsed": elapsed,
+            "requests": total,
+            "throughput": total / elapsed if elapsed else None,
+            "errors": sum(url["errors"] for url in urls.values()),
+            "urls": urls,
+        }
@@ -0,0 +1,13 @@
+from kitchen.cache import get_cache
+from kitchen.models import DishType
+
+DISH_TYPES_KEY = "kitchen:dish-types"
+
+
+def get_dish_type_choices():
+    """Return ``(pk, name)`` of every dish type, for the dish forms."""
+    return get_cache().get_or_set(
+        DISH_TYPES_KEY,
+        lambda: list(DishType.objects.values_list("pk", "name")),
+        tags=["dish_type"],
+    )
@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from kitchen import cards
+from kitchen.models import Cook, Dish, DishType
+from kitchen.views import DishListView
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the CPU time per dish of the JSON API with rendering "
+        "dish_list.html, on throwaway rows that are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000)
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        # The test client sends "Host: testserver".
+        allowed_hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        with override_settings(ALLOWED_HOSTS=allowed_hosts), \
+                transaction.atomic():
+            client = self._seed(options)
+            # Both at the list's page size, so that the per-request cost
+            # is spread over as many dishes.
+            page_size = DishListView.paginate_by
+            html = self._measure(
+                client, reverse("kitchen:dish-list"), {}, page_size, options,
+            )
+            api = self._measure(
+                client, reverse("kitchen:api-dishes"),
+                {"limit": page_size}, page_size, options,
+            )
+            self.stdout.write(
+                f"dish_list.html {html * 1000:8.1f} us CPU per dish\n"
+                f"api            {api * 1000:8.1f} us CPU per dish\n"
+                f"ratio          {html / api:8.1f}x"
+            )
+            transaction.set_rollback(True)
+
+    def _seed(self, options):
+        dish_type = DishType.objects.create(name="Benchmark")
+        cooks = Cook.objects.bulk_create(
+            Cook(username=f"benchmark-cook-{i}") for i in range(5)
+        )
+        dishes = Dish.objects.bulk_create(
+            Dish(name=f"Dish {i}", description="Benchmark dish",
+                 price=i % 100 + 1, dish_type=dish_type)
+            for i in range(options["rows"])
+        )
+        Dish.cooks.through.objects.bulk_create(
+            Dish.cooks.through(dish_id=dish.pk, cook_id=cook.pk)
+            for dish in dishes for cook in cooks[:2]
+        )
+        cards.refresh_cards(dish.pk for dish in dishes)
+        client = Client()
+        client.force_login(cooks[0])
+        return client
+
+    def _measure(self, client, url, data, items, options):
+        """Return the CPU milliseconds spent per item of the page."""
+        client.get(url, data)
+        started = time.process_time()
+        for _ in range(options["requests"]):
+            client.get(url, data)
+        elapsed = time.process_time() - started
+        return elapsed * 1000 / (options["requests"] * items)
@@ -0,0 +1,93 @@
+import asyncio
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from kitchen.models import Cook
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a page to many concurrent connections in process, through "
+        "the async views under ASGI and the sync views on a WSGI thread pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url-name", default="kitchen:dish-list")
+        parser.add_argument("--connections", type=int, default=500)
+        parser.add_argument("--requests", type=int, default=5_000)
+        parser.add_argument(
+            "--wsgi-threads",
+            type=int,
+            default=8,
+            help="Threads serving the WSGI path, as gunicorn's gthread.",
+        )
+
+    def handle(self, *args, **options):
+        cook = Cook.objects.create_user(username=f"benchmark-{uuid.uuid4()}")
+        # The test clients send "Host: testserver", as under manage.py test.
+        allowed_hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        try:
+            with override_settings(ALLOWED_HOSTS=allowed_hosts):
+                self._run(cook, options)
+        finally:
+            cook.delete()
+
+    def _run(self, cook, options):
+        for label, run in (("wsgi", self._wsgi), ("asgi", self._asgi)):
+            timings, statuses, elapsed = asyncio.run(run(cook, options))
+            timings.sort()
+            self.stdout.write(
+                f"{label}  {len(timings) / elapsed:8.0f} requests/s   "
+                f"p50 {statistics.median(timings):8.2f} ms   "
+                f"p99 {timings[int(len(timings) * 0.99) - 1]:8.2f} ms   "
+                f"statuses {dict(statuses)}"
+            )
+
+    async def _drive(self, get, options):
+        """Issue the requests with at most --connections in flight."""
+        slots = asyncio.Semaphore(options["connections"])
+        timings = []
+        statuses = Counter()
+
+        async def one():
+            async with slots:
+                started = time.perf_counter()
+                response = await get()
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(options["requests"])))
+        return timings, statuses, time.perf_counter() - started
+
+    async def _wsgi(self, cook, options):
+        url = reverse(options["url_name"])
+        local = threading.local()
+
+        def get():
+            if not hasattr(local, "client"):
+                local.client = Client()
+                local.client.force_login(cook)
+            return local.client.get(url)
+
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(options["wsgi_threads"]) as executor:
+            return await self._drive(
+                lambda: loop.run_in_executor(executor, get), options
+            )
+
+    async def _asgi(self, cook, options):
+        with override_settings(ROOT_URLCONF="Kitchen_Service.asgi_urls"):
+            url = reverse(options["url_name"])
+            client = AsyncClient()
+            await client.aforce_login(cook)
+            return await self._drive(lambda: client.get(url), options)
@@ -0,0 +1,81 @@
+import time
+import uuid
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from kitchen.models import Cook
+
+MODES = {
+    "db": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "AUTHENTICATION_BACKENDS": [
+            "django.contrib.auth.backends.ModelBackend",
+        ],
+    },
+    "cached": {
+        "SESSION_ENGINE": settings.SESSION_ENGINE,
+        "AUTHENTICATION_BACKENDS": settings.AUTHENTICATION_BACKENDS,
+    },
+}
+
+
+def trivial_view(request):
+    return HttpResponse(request.user.get_username())
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what loading the session and request.user adds to a "
+        "trivial authenticated page, with database sessions and the full "
+        "Cook row against the cached sessions and snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2_000)
+
+    def handle(self, *args, **options):
+        # Outside a transaction, where the kitchen caches are bypassed; the
+        # cook and its sessions are deleted afterwards.
+        cook = Cook.objects.create(
+            username=f"benchmark-auth-{uuid.uuid4().hex[:8]}"
+        )
+        try:
+            for mode, overrides in MODES.items():
+                with override_settings(**overrides):
+                    us, queries = self._measure(cook, options["requests"])
+                self.stdout.write(
+                    f"{mode:8} {us:8.1f} us per request "
+                    f"{queries:5.2f} queries per request"
+                )
+        finally:
+            cook.delete()
+
+    def _measure(self, cook, requests):
+        """Return the microseconds and queries spent per request."""
+        client = Client()
+        client.force_login(cook)
+        session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+        handler = SessionMiddleware(AuthenticationMiddleware(trivial_view))
+        factory = RequestFactory()
+        factory.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        try:
+            handler(factory.get("/"))
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(requests):
+                    response = handler(factory.get("/"))
+                elapsed = time.perf_counter() - started
+            if response.content != cook.username.encode():
+                raise CommandError("The session did not authenticate.")
+        finally:
+            engine = import_module(settings.SESSION_ENGINE)
+            engine.SessionStore(session_key).delete()
+        return elapsed * 1_000_000 / requests, len(queries) / requests
@@ -0,0 +1,91 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from kitchen.dbpool import get_pool_stats, pool_options
+from kitchen.models import Cook
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests per second of a page served by concurrent threads, "
+        "opening a connection per request and then through the pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url-name", default="kitchen:dish-list")
+        parser.add_argument("--requests", type=int, default=2_000)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--pool-size",
+            type=int,
+            help="Pool max_size; defaults to one connection per thread.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Connection pooling needs PostgreSQL.")
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        original = dict(settings_dict["OPTIONS"])
+        pool = pool_options(1, options["pool_size"] or options["threads"])
+        cook = Cook.objects.create_user(username=f"benchmark-{uuid.uuid4()}")
+        try:
+            for label, pool_setting in (("no pool", None), ("pool", pool)):
+                self._configure(settings_dict, original, pool_setting)
+                rps, latency = self._run(cook, options)
+                self.stdout.write(
+                    f"{label:8} {rps:8.0f} requests/s   "
+                    f"median {latency:6.2f} ms"
+                )
+                for alias, stats in get_pool_stats().items():
+                    self.stdout.write(f"         {alias}: {stats}")
+        finally:
+            self._configure(settings_dict, original, original.get("pool"))
+            cook.delete()
+
+    def _configure(self, settings_dict, original, pool):
+        connections[DEFAULT_DB_ALIAS].close_pool()
+        connections.close_all()
+        settings_dict["OPTIONS"] = dict(original)
+        settings_dict["OPTIONS"].pop("pool", None)
+        if pool:
+            settings_dict["OPTIONS"]["pool"] = pool
+            settings_dict["CONN_MAX_AGE"] = 0
+
+    def _run(self, cook, options):
+        url = reverse(options["url_name"])
+        per_thread = options["requests"] // options["threads"]
+        timings = []
+        lock = threading.Lock()
+        ready = threading.Barrier(options["threads"] + 1)
+
+        def worker():
+            client = Client(SERVER_NAME="localhost")
+            client.force_login(cook)
+            connection.close()
+            ready.wait()
+            local = []
+            for _ in range(per_thread):
+                started = time.perf_counter()
+                client.get(url)
+                local.append((time.perf_counter() - started) * 1000)
+            with lock:
+                timings.extend(local)
+            connection.close()
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        ready.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return len(timings) / elapsed, statistics.median(timings)
@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from kitchen.models import Dish, DishType
+from kitchen.search import IContainsSearchBackend, get_search_backend
+
+WORDS = (
+    "borsch", "varenyky", "holubtsi", "deruny", "salo", "kasha", "syrnyky",
+    "banosh", "uzvar", "kyiv", "chicken", "tomato", "soup", "salad",
+    "mushroom", "cabbage", "potato", "cherry", "honey", "garlic", "pampushky",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the configured search backend with the plain icontains "
+        "filter on a throwaway table of generated dishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "terms",
+            nargs="*",
+            default=["borsch", "mushroom soup", "honey", "zzz"],
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options)
+            backends = (
+                ("icontains", IContainsSearchBackend()),
+                (type(get_search_backend()).__name__, get_search_backend()),
+            )
+            for term in options["terms"]:
+                for label, backend in backends:
+                    page = self._time(
+                        lambda: list(backend.search(
+                            Dish.objects.all(), "name", term
+                        )[:5]),
+                        options["repeat"],
+                    )
+                    matches = self._time(
+                        lambda: backend.search(
+                            Dish.objects.all(), "name", term
+                        ).count(),
+                        options["repeat"],
+                    )
+                    self.stdout.write(
+                        f"{term!r:18} {label:24} "
+                        f"first page {page:8.2f} ms   "
+                        f"all matches {matches:8.2f} ms"
+                    )
+            transaction.set_rollback(True)
+
+    def _seed(self, options):
+        rng = random.Random(options["seed"])
+        dish_type = DishType.objects.create(name="Benchmark")
+        started = time.perf_counter()
+        for offset in range(0, options["rows"], options["batch_size"]):
+            size = min(options["batch_size"], options["rows"] - offset)
+            Dish.objects.bulk_create(
+                Dish(
+                    name=" ".join(rng.sample(WORDS, 3)).capitalize(),
+                    description="",
+                    price=rng.randint(100, 10_000) / 100,
+                    dish_type=dish_type,
+                )
+                for _ in range(size)
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE kitchen_dish")
+        self.stdout.write(
+            f"Seeded {options['rows']} dishes in "
+            f"{time.perf_counter() - started:.1f} s"
+        )
+
+    def _time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,156 @@
+import json
+import random
+import subprocess
+from datetime import datetime, timezone
+from functools import partial
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from kitchen.loadtest import (
+    DEFAULT_MIX,
+    PERCENTILES,
+    ClientTransport,
+    HttpTransport,
+    LoadRun,
+    TrafficFixture,
+    parse_mix,
+)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of dashboard, dish list, search, detail, assignment "
+        "and create/update requests from seeded cooks, in process or "
+        "against a running server, and report throughput and p50/p95/p99 "
+        "per URL name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--base-url",
+            help="A running server, e.g. http://127.0.0.1:8000, sharing "
+                 "this database; by default the test client is used.",
+        )
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{name}={weight}"
+                             for name, weight in DEFAULT_MIX.items()),
+            help="Comma-separated scenario=weight pairs.",
+        )
+        parser.add_argument("--requests", type=int, default=2_000)
+        parser.add_argument("--warmup", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--cooks", type=int, default=20)
+        parser.add_argument("--dishes", type=int, default=200)
+        parser.add_argument("--seed", type=int,
+                            help="Seed the data and the request order.")
+        parser.add_argument("--output", help="Write the results as JSON.")
+        parser.add_argument(
+            "--compare",
+            help="A previous --output file to print the changes against.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as e:
+            raise CommandError(e)
+        if options["cooks"] < 1 or options["dishes"] < 1:
+            raise CommandError("Seed at least one cook and one dish.")
+        base_url = options["base_url"]
+        if base_url and urlsplit(base_url).scheme not in ("http", "https"):
+            raise CommandError(f"Cannot load test {base_url!r}.")
+        previous = self._load(options["compare"])
+
+        fixture = TrafficFixture(options["cooks"], options["dishes"])
+        # The test client sends "Host: testserver".
+        allowed_hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        try:
+            fixture.seed(random.Random(options["seed"]))
+            if base_url:
+                make_transport = partial(HttpTransport, base_url)
+            else:
+                make_transport = ClientTransport
+            run = LoadRun(fixture, mix, make_transport,
+                          concurrency=options["concurrency"],
+                          seed=options["seed"])
+            with override_settings(ALLOWED_HOSTS=allowed_hosts):
+                summary = run.run(options["requests"], options["warmup"])
+        finally:
+            fixture.cleanup()
+
+        results = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "commit": current_commit(),
+            "target": base_url or "test client",
+            "database": connection.vendor,
+            "mix": mix,
+            "options": {
+                name: options[name]
+                for name in ("requests", "warmup", "concurrency", "cooks",
+                             "dishes", "seed")
+            },
+            **summary,
+        }
+        self._report(results, previous)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+
+    def _load(self, path):
+        if not path:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+    def _report(self, results, previous):
+        before = (previous or {}).get("urls", {})
+        self.stdout.write(
+            f"{'url name':28} {'requests':>8} {'req/s':>8} "
+            + " ".join(f"{f'p{pct} ms':>9}" for pct in PERCENTILES)
+            + f" {'errors':>7}"
+        )
+        for url_name, url in results["urls"].items():
+            line = (
+                f"{url_name:28} {url['requests']:8} {url['throughput']:8.1f} "
+                + " ".join(f"{url[f'p{pct}']:9.2f}" for pct in PERCENTILES)
+                + f" {url['errors']:7}"
+            )
+            if url_name in before:
+                change = self._change(before[url_name]["p95"], url["p95"])
+                line += f"   p95 {change}"
+            self.stdout.write(line)
+        line = (
+            f"{results['requests']} requests in {results['elapsed']:.1f} s, "
+            f"{results['throughput']:.1f} requests/s, "
+            f"{results['errors']} errors"
+        )
+        if previous:
+            line += (
+                f" (throughput "
+                f"{self._change(previous['throughput'], results['throughput'])}"
+                f" against {previous.get('commit') or 'the previous run'})"
+            )
+        self.stdout.write(line)
+
+    def _change(self, before, after):
+        if not before:
+            return "n/a"
+        return f"{(after - before) / before:+.0%}"
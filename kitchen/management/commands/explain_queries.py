@@ -0,0 +1,147 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from kitchen import cards, counters
+from kitchen.models import Cook, Dish, DishCard, DishType
+from kitchen.pagination import KeysetPaginator
+from kitchen.views import (
+    DISH_COUNT_ORDERINGS,
+    CookListView,
+    DishListView,
+    DishTypeListView,
+)
+
+# Per vendor: a full scan of a table, a sort the index should have saved,
+# and the names of the indexes a plan reads.
+PLAN_PATTERNS = {
+    "sqlite": (
+        r"\bSCAN {table}\b(?!.*\bUSING\b)",
+        r"USE TEMP B-TREE FOR (?:LAST TERM OF )?ORDER BY",
+        r"USING (?:COVERING )?INDEX (\w+)",
+    ),
+    "postgresql": (
+        r"Seq Scan on {table}\b",
+        r"(?m)^\s*(?:->\s*)?Sort\b",
+        r"(?:Index Scan|Index Only Scan|Bitmap Index Scan)"
+        r"(?: Backward)?(?: using| on) (\w+)",
+    ),
+}
+
+
+def page(queryset, per_page, cursor=None):
+    return KeysetPaginator(queryset, per_page).page(cursor)
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the queries of the list, detail and assignment views on "
+        "throwaway rows that are rolled back, and fail when one reads a "
+        "table without an index or sorts what an index should order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20_000)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--verbose-plans", action="store_true",
+                            help="Print every plan in full.")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in PLAN_PATTERNS:
+            raise CommandError(f"Cannot read {connection.vendor} plans.")
+        with transaction.atomic():
+            failures = [
+                label
+                for label, queryset, table, ordered in self._checks(
+                    *self._seed(options)
+                )
+                if not self._check(label, queryset, table, ordered, options)
+            ]
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(
+                f"Not served by an index: {', '.join(failures)}."
+            )
+
+    def _checks(self, dish_type, cook, dish):
+        dishes = DishListView.queryset
+        first = page(dishes, DishListView.paginate_by)
+        dish_types = DishType.objects.all()
+        return [
+            ("dish list", first.object_list, DishCard, True),
+            ("dish list, next page",
+             page(dishes, DishListView.paginate_by,
+                  first.next_cursor).object_list, DishCard, True),
+            ("dishes of a type",
+             page(dishes.filter(dish_type=dish_type),
+                  DishListView.paginate_by).object_list, DishCard, True),
+            ("dish type list",
+             page(dish_types, DishTypeListView.paginate_by).object_list,
+             DishType, True),
+            ("dish types by dishes",
+             page(dish_types.order_by(*DISH_COUNT_ORDERINGS["-dishes"]),
+                  DishTypeListView.paginate_by).object_list,
+             DishType, True),
+            ("cooks by dishes",
+             page(Cook.objects.order_by(*DISH_COUNT_ORDERINGS["-dishes"]),
+                  CookListView.paginate_by).object_list,
+             Cook, True),
+            # CookDetailView sorts the few dishes of one cook.
+            ("dishes of a cook",
+             cook.dishes.select_related("dish_type"),
+             Dish.cooks.through, False),
+            # ToggleAssignToDishView.
+            ("assignment check", cook.dishes.filter(pk=dish.pk),
+             Dish.cooks.through, False),
+        ]
+
+    def _check(self, label, queryset, model, ordered, options):
+        full_scan, sort, index = PLAN_PATTERNS[connection.vendor]
+        plan = queryset.explain()
+        table = re.escape(model._meta.db_table)
+        problems = []
+        if re.search(full_scan.format(table=table), plan):
+            problems.append("full scan")
+        if ordered and re.search(sort, plan):
+            problems.append("sort")
+        indexes = sorted(set(re.findall(index, plan)))
+        self.stdout.write(
+            f"{label:24} {'FAIL' if problems else 'ok':4} "
+            f"{', '.join(problems or indexes)}"
+        )
+        if options["verbose_plans"] or problems:
+            self.stdout.write(plan)
+        return not problems
+
+    def _seed(self, options):
+        rows, batch_size = options["rows"], options["batch_size"]
+        dish_types = DishType.objects.bulk_create(
+            DishType(name=f"Explain type {i}")
+            for i in range(max(rows // 100, 50))
+        )
+        cooks = Cook.objects.bulk_create(
+            (Cook(username=f"explain-cook-{i}")
+             for i in range(max(rows // 50, 50))),
+            batch_size=batch_size,
+        )
+        dishes = Dish.objects.bulk_create(
+            (Dish(name=f"Dish {i}", description="Explain dish",
+                  price=i % 1000 + 1,
+                  dish_type=dish_types[i % len(dish_types)])
+             for i in range(rows)),
+            batch_size=batch_size,
+        )
+        Dish.cooks.through.objects.bulk_create(
+            (Dish.cooks.through(dish_id=dish.pk,
+                                cook_id=cooks[(i + j) % len(cooks)].pk)
+             for i, dish in enumerate(dishes) for j in range(2)),
+            batch_size=batch_size,
+        )
+        counters.recount_dishes(Cook)
+        counters.recount_dishes(DishType)
+        cards.refresh_cards(dish.pk for dish in dishes)
+        # Give the planner row counts to choose the indexes by.
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        return dish_types[0], cooks[0], dishes[0]
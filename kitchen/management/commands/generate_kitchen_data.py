@@ -0,0 +1,65 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from kitchen.datagen import (
+    BATCH_SIZE,
+    DISH_TYPE_NAMES,
+    KitchenDataGenerator,
+    use_copy,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with generated cooks, dish types, dishes and "
+        "assignments, written with COPY on PostgreSQL, together with the "
+        "dish cards and dish counts the signals would keep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cooks", type=int, default=1_000)
+        parser.add_argument("--dishes", type=int, default=100_000)
+        parser.add_argument("--assignments-per-dish", type=int, default=2)
+        parser.add_argument("--dish-types", type=int,
+                            default=len(DISH_TYPE_NAMES))
+        parser.add_argument("--seed", type=int, default=0,
+                            help="The same seed generates the same data.")
+        parser.add_argument(
+            "--password",
+            help="Give every cook this password; by default they cannot "
+                 "log in.",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        for name in ("cooks", "dishes", "assignments_per_dish", "dish_types"):
+            if options[name] < 0:
+                raise CommandError(
+                    f"--{name.replace('_', '-')} cannot be negative."
+                )
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        generator = KitchenDataGenerator(
+            random.Random(options["seed"]),
+            cooks=options["cooks"],
+            dishes=options["dishes"],
+            assignments_per_dish=options["assignments_per_dish"],
+            dish_types=options["dish_types"],
+            password=options["password"],
+        )
+        method = "COPY" if use_copy() else "executemany()"
+        self.stdout.write(f"Writing to {connection.vendor} with {method}.")
+        written = generator.write(options["batch_size"], self._progress)
+        self.stdout.write(self.style.SUCCESS(
+            "Generated " + ", ".join(
+                f"{count} {name}" for name, count in written.items()
+            ) + "."
+        ))
+
+    def _progress(self, dishes, elapsed):
+        self.stdout.write(
+            f"{dishes} dishes written "
+            f"({dishes / elapsed if elapsed else 0:,.0f} dishes/s)"
+        )
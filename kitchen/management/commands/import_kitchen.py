@@ -0,0 +1,321 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from kitchen import auth, cards, counters, fragments
+from kitchen.cache import get_cache
+from kitchen.models import Cook, Dish, DishCard, DishType
+
+
+class RowError(Exception):
+    pass
+
+
+def unique_by(objs, attr):
+    # An upsert cannot touch the same row twice; the last row wins.
+    return list({getattr(obj, attr): obj for obj in objs}.values())
+
+
+def reset_sequence(model):
+    """
+    Move the pk sequence past the largest id. Rows written with explicit
+    ids do not advance it, so this runs before any row of the batch, or of
+    a later one, takes an id from it.
+    """
+    sql = connection.ops.sequence_reset_sql(no_style(), [model])
+    if sql:
+        with connection.cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
+
+
+class DishTypeImporter:
+    model = DishType
+    fragment_models = ("dish_type",)
+
+    def build(self, row):
+        dish_type = DishType(id=row.get("id") or None,
+                             name=row.get("name", ""))
+        dish_type.clean_fields(exclude=["id"])
+        return dish_type
+
+    def write(self, rows):
+        with_id = unique_by(
+            (dish_type for dish_type, _ in rows if dish_type.pk), "pk"
+        )
+        DishType.objects.bulk_create(
+            with_id,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=["name", "updated_at"],
+        )
+        if with_id:
+            reset_sequence(DishType)
+            # The upsert may have renamed types that cards show.
+            DishCard.objects.filter(
+                dish_type__in=[dish_type.pk for dish_type in with_id]
+            ).update(
+                dish_type_name=Subquery(
+                    DishType.objects.filter(pk=OuterRef("dish_type_id"))
+                    .values("name")
+                ),
+                updated_at=timezone.now(),
+            )
+        names = {dish_type.name for dish_type, _ in rows
+                 if not dish_type.pk}
+        existing = set(
+            DishType.objects.filter(name__in=names)
+            .values_list("name", flat=True)
+        )
+        DishType.objects.bulk_create(
+            DishType(name=name) for name in names - existing
+        )
+
+
+class CookImporter:
+    model = Cook
+    fragment_models = ("cook",)
+    fields = ("first_name", "last_name", "email", "years_of_experience")
+
+    def build(self, row):
+        cook = Cook(
+            username=row.get("username", ""),
+            password=make_password(None),
+            **{field: row[field] for field in self.fields if field in row},
+        )
+        cook.clean_fields(exclude=["id", "password"])
+        return cook
+
+    def write(self, rows):
+        # Upserted by username, which is all the dish cards show of a
+        # cook, and with dish_count left alone: nothing else to refresh.
+        Cook.objects.bulk_create(
+            unique_by((cook for cook, _ in rows), "username"),
+            update_conflicts=True,
+            unique_fields=["username"],
+            update_fields=[*self.fields, "updated_at"],
+        )
+
+
+class DishImporter:
+    model = Dish
+    fragment_models = ("dish", "dish_type", "assignment")
+    fields = ("name", "description", "price", "dish_type")
+
+    def build(self, row):
+        dish = Dish(
+            id=row.get("id") or None,
+            name=row.get("name", ""),
+            description=row.get("description", ""),
+            price=row.get("price"),
+        )
+        # Cleaning the id also turns a CSV string into an int.
+        dish.clean_fields(exclude=["dish_type"])
+        # None when the input has no cooks column, as the dish export: the
+        # dish keeps its assignments then.
+        cooks = None
+        if "cooks" in row:
+            cooks = row["cooks"] or []
+            if isinstance(cooks, str):
+                cooks = [name for name in cooks.split(";") if name]
+        return dish, row.get("dish_type") or None, cooks
+
+    def resolve(self, rows):
+        """Replace dish type names and cook usernames with ids in bulk."""
+        type_names = {type_name for (_, type_name, _), _ in rows
+                      if type_name}
+        dish_types = {}
+        for pk, name in (
+            DishType.objects.filter(name__in=type_names)
+            .order_by("pk").values_list("pk", "name")
+        ):
+            dish_types.setdefault(name, pk)
+        missing = type_names - set(dish_types)
+        if missing:
+            for dish_type in DishType.objects.bulk_create(
+                DishType(name=name) for name in missing
+            ):
+                dish_types[dish_type.name] = dish_type.pk
+
+        usernames = {username for (_, _, cooks), _ in rows
+                     for username in cooks or ()}
+        cooks = dict(
+            Cook.objects.filter(username__in=usernames)
+            .values_list("username", "pk")
+        )
+        resolved, errors = [], []
+        for (dish, type_name, usernames), line in rows:
+            dish.dish_type_id = dish_types.get(type_name)
+            if usernames is None:
+                resolved.append((dish, None, line))
+                continue
+            unknown = [name for name in usernames if name not in cooks]
+            if unknown:
+                errors.append((line, f"unknown cooks: {', '.join(unknown)}"))
+                continue
+            resolved.append(
+                (dish, [cooks[name] for name in usernames], line)
+            )
+        return resolved, errors
+
+    def write(self, rows):
+        resolved, errors = self.resolve(rows)
+        with_id = unique_by((dish for dish, _, _ in resolved if dish.pk),
+                            "pk")
+        # Only reassigned dishes lose cooks, and only existing dishes can
+        # leave a type.
+        reassigned = unique_by(
+            (dish for dish, cook_ids, _ in resolved
+             if dish.pk and cook_ids is not None),
+            "pk",
+        )
+        through = Dish.cooks.through
+        cook_pks = set(
+            through.objects.filter(dish__in=reassigned)
+            .values_list("cook_id", flat=True)
+        )
+        cook_pks.update(cook_id for _, cook_ids, _ in resolved
+                        for cook_id in cook_ids or ())
+        dish_type_pks = set(
+            Dish.objects.filter(pk__in=[dish.pk for dish in with_id])
+            .values_list("dish_type_id", flat=True)
+        )
+        dish_type_pks.update(dish.dish_type_id for dish, _, _ in resolved)
+        dish_type_pks.discard(None)
+        Dish.objects.bulk_create(
+            with_id,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=[*self.fields, "updated_at"],
+        )
+        if with_id:
+            reset_sequence(Dish)
+        Dish.objects.bulk_create(
+            [dish for dish, _, _ in resolved if not dish.pk]
+        )
+        through.objects.filter(
+            dish_id__in=[dish.pk for dish in reassigned]
+        ).delete()
+        through.objects.bulk_create(
+            (
+                through(dish_id=dish.pk, cook_id=cook_id)
+                for dish, cook_ids, _ in resolved
+                for cook_id in cook_ids or ()
+            ),
+            ignore_conflicts=True,
+        )
+        # bulk_create() sends no signals: refresh what they keep for the
+        # rows of this batch alone. The recounts also move updated_at of
+        # the cooks, whose detail page lists their dishes.
+        counters.recount_dishes(Cook, cook_pks)
+        counters.recount_dishes(DishType, dish_type_pks)
+        cards.refresh_cards([dish.pk for dish, _, _ in resolved])
+        return errors
+
+
+IMPORTERS = {
+    "dish_types": DishTypeImporter,
+    "cooks": CookImporter,
+    "dishes": DishImporter,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream dish types, cooks or dishes from a CSV or JSON Lines file "
+        "and upsert them in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(IMPORTERS))
+        parser.add_argument("path", help='Input file, or "-" for stdin.')
+        parser.add_argument("--format", choices=("csv", "jsonl"))
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--encoding", default="utf-8")
+
+    def handle(self, *args, **options):
+        importer = IMPORTERS[options["model"]]()
+        file_format = options["format"] or (
+            "jsonl" if options["path"].endswith((".jsonl", ".ndjson"))
+            else "csv"
+        )
+        if options["path"] == "-":
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(options["path"], encoding=options["encoding"],
+                              newline="")
+            except OSError as e:
+                raise CommandError(e)
+        with stream:
+            self._import(importer, self._read(stream, file_format), options)
+
+    def _read(self, stream, file_format):
+        if file_format == "csv":
+            yield from enumerate(csv.DictReader(stream), start=2)
+            return
+        for line, text in enumerate(stream, start=1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except json.JSONDecodeError as e:
+                    yield line, RowError(f"invalid JSON: {e}")
+
+    def _import(self, importer, rows, options):
+        started = time.perf_counter()
+        read = failed = 0
+        while True:
+            chunk = list(islice(rows, options["batch_size"]))
+            if not chunk:
+                break
+            read += len(chunk)
+            batch = []
+            for line, row in chunk:
+                try:
+                    if isinstance(row, RowError):
+                        raise row
+                    batch.append((importer.build(row), line))
+                except (RowError, ValidationError) as e:
+                    failed += 1
+                    self._report(line, e)
+            with transaction.atomic():
+                errors = importer.write(batch) or []
+            for line, error in errors:
+                failed += 1
+                self._report(line, error)
+            self.stdout.write(
+                f"{read} rows read, {failed} rejected "
+                f"({read / (time.perf_counter() - started):,.0f} rows/s)"
+            )
+        # bulk_create() sends no signals; the batches refreshed their own
+        # counts and cards.
+        counters.reconcile(names=[options["model"]])
+        for model in importer.fragment_models:
+            fragments.bump_version(model)
+        get_cache().invalidate_tags(*importer.fragment_models)
+        if importer.model is Cook:
+            auth.invalidate_snapshots()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {read - failed} {options['model']} in {elapsed:.1f} s "
+            f"({read / elapsed if elapsed else 0:,.0f} rows/s), "
+            f"{failed} rejected."
+        ))
+
+    def _report(self, line, error):
+        if isinstance(error, ValidationError):
+            error = "; ".join(
+                f"{field}: {' '.join(messages)}"
+                for field, messages in error.message_dict.items()
+            )
+        self.stderr.write(f"line {line}: {error}")
@@ -0,0 +1,114 @@
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from kitchen.images import FORMATS, encode, load_manifest, variant_widths
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode the static JPEGs as AVIF and WebP at several widths in a "
+        "process pool, write the manifest {% picture %} reads, and report "
+        "the sizes before and after."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--static-dir",
+            default=str(settings.STATICFILES_DIRS[0]),
+            help="Static files directory the names below are relative to.",
+        )
+        parser.add_argument("--source", default="assets/img")
+        parser.add_argument("--pattern", default="*.jpg")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Encoding processes; defaults to one per CPU.",
+        )
+        parser.add_argument("--force", action="store_true",
+                            help="Encode variants that are up to date too.")
+
+    def handle(self, *args, **options):
+        from PIL import Image
+
+        static_dir = Path(options["static_dir"])
+        manifest_path = Path(settings.KITCHEN_IMAGE_VARIANTS)
+        output_dir = manifest_path.parent
+        output_dir.mkdir(parents=True, exist_ok=True)
+        sources = sorted((static_dir / options["source"]).glob(
+            options["pattern"]
+        ))
+        if not sources:
+            raise CommandError(
+                f"No {options['pattern']} files in {options['source']}."
+            )
+
+        def name(path):
+            return Path(os.path.relpath(path, static_dir)).as_posix()
+
+        manifest = {}
+        for source in sources:
+            with Image.open(source) as image:
+                width, height = image.size
+            manifest[name(source)] = {
+                "width": width,
+                "height": height,
+                "bytes": source.stat().st_size,
+                "variants": defaultdict(list),
+            }
+
+        # One task per image and format: AVIF encodes far slower than WebP,
+        # so finer tasks keep every process busy until the end.
+        with ProcessPoolExecutor(options["workers"]) as executor:
+            futures = {
+                executor.submit(
+                    encode, str(source), image_format,
+                    variant_widths(manifest[name(source)]["width"]),
+                    str(output_dir), options["force"],
+                ): (name(source), image_format)
+                for source in sources for image_format in FORMATS
+            }
+            for future, (source, image_format) in futures.items():
+                manifest[source]["variants"][image_format] = [
+                    [width, name(path), size]
+                    for width, path, size in future.result()
+                ]
+
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        load_manifest.cache_clear()
+        self._report(manifest)
+
+    def _report(self, manifest):
+        """
+        Compare each source with its widest variant of every format, which
+        is what a full-width desktop downloads.
+        """
+        self.stdout.write(f"{'image':32} {'original':>10} " + " ".join(
+            f"{image_format:>10}" for image_format in FORMATS
+        ))
+        totals = defaultdict(int)
+        for source, entry in manifest.items():
+            totals["original"] += entry["bytes"]
+            sizes = []
+            for image_format in FORMATS:
+                size = entry["variants"][image_format][-1][2]
+                totals[image_format] += size
+                sizes.append(size)
+            self.stdout.write(
+                f"{source:32} {entry['bytes'] / 1024:9.0f}K " + " ".join(
+                    f"{size / 1024:9.0f}K" for size in sizes
+                )
+            )
+        self.stdout.write(
+            f"{'total':32} {totals['original'] / 1024:9.0f}K " + " ".join(
+                f"{totals[image_format] / 1024:9.0f}K "
+                f"({1 - totals[image_format] / totals['original']:.0%} less)"
+                for image_format in FORMATS
+            )
+        )
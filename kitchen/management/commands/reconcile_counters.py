@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from kitchen import counters
+from kitchen.models import Counter
+
+
+class Command(BaseCommand):
+    help = "Compare the dashboard counters with the real row counts and fix drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift and exit with an error if any is found.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stored = dict(
+                Counter.objects.select_for_update()
+                .filter(name__in=counters.COUNTED_MODELS)
+                .values_list("name", "value")
+            )
+            drifted = []
+            for name, model in counters.COUNTED_MODELS.items():
+                actual = model.objects.count()
+                if stored.get(name) != actual:
+                    drifted.append(name)
+                    self.stdout.write(
+                        f"{name}: stored {stored.get(name)}, actual {actual}"
+                    )
+            if not drifted:
+                self.stdout.write(self.style.SUCCESS("Counters are exact."))
+                return
+            if options["check"]:
+                raise CommandError(f"{len(drifted)} counter(s) drifted.")
+            counters.reconcile(names=drifted)
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {len(drifted)} counter(s).")
+        )
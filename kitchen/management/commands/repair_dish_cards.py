@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from kitchen import cards, fragments
+from kitchen.cache import get_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the dish cards with their dishes, dish types and cooks, "
+        "and rewrite those that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift and exit with an error if any is found.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = cards.find_card_drift()
+            for pk in drift:
+                self.stdout.write(f"dish card {pk}")
+            if not drift:
+                self.stdout.write(self.style.SUCCESS("Dish cards are exact."))
+                return
+            if options["check"]:
+                raise CommandError(f"{len(drift)} dish card(s) drifted.")
+            cards.refresh_cards(drift)
+            # The cards are the rows of the dish lists.
+            fragments.bump_version("dish")
+            get_cache().invalidate_tags("dish")
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired {len(drift)} dish card(s).")
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from kitchen import counters, fragments
+from kitchen.cache import get_cache
+from kitchen.signals import FRAGMENT_MODELS
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare dish_count on cooks and dish types with their assignments "
+        "and dishes, and fix drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift and exit with an error if any is found.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = 0
+            for model in counters.DISH_COUNT_SOURCES:
+                drift = counters.find_dish_count_drift(model)
+                for pk, (stored, actual) in sorted(drift.items()):
+                    self.stdout.write(
+                        f"{model._meta.verbose_name} {pk}: "
+                        f"stored {stored}, actual {actual}"
+                    )
+                drifted += len(drift)
+                if drift and not options["check"]:
+                    counters.recount_dishes(model, drift)
+                    fragments.bump_version(FRAGMENT_MODELS[model])
+                    get_cache().invalidate_tags(FRAGMENT_MODELS[model])
+            if not drifted:
+                self.stdout.write(self.style.SUCCESS("Dish counts are exact."))
+                return
+            if options["check"]:
+                raise CommandError(f"{drifted} dish count(s) drifted.")
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired {drifted} dish count(s).")
+        )
@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter under -X importtime: time each AppConfig.ready()
+# and the warm-up, and print them as JSON for the parent to read.
+PROFILE_SCRIPT = """
+import json, sys, time
+from django.apps.config import AppConfig
+
+ready = {}
+create = AppConfig.create.__func__
+
+def timed_create(cls, entry):
+    app_config = create(cls, entry)
+    original = app_config.ready
+
+    def timed_ready():
+        started = time.perf_counter()
+        original()
+        ready[app_config.label] = (time.perf_counter() - started) * 1000
+
+    app_config.ready = timed_ready
+    return app_config
+
+AppConfig.create = classmethod(timed_create)
+
+import django
+started = time.perf_counter()
+django.setup()
+setup = (time.perf_counter() - started) * 1000
+
+from django.apps import apps
+from kitchen.warmup import warm_up
+skip = sys.argv[1:]
+print(json.dumps({
+    "setup": setup,
+    "apps": [[c.label, c.name, ready[c.label]] for c in apps.get_app_configs()],
+    "warm_up": warm_up(skip=skip),
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """Map module names to their own import time in milliseconds."""
+    own = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        spent, _, name = line[len("import time:"):].split("|")
+        if spent.strip().isdigit():
+            own[name.strip()] = int(spent) / 1000
+    return own
+
+
+def package_time(imports, package):
+    """Sum the import time of a package and of its submodules."""
+    return sum(ms for name, ms in imports.items()
+               if name == package or name.startswith(f"{package}."))
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the project in a fresh interpreter and report the import time "
+        "of each app's modules and of the slowest top-level packages, each "
+        "AppConfig.ready() and the warm-up steps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--skip",
+            action="append",
+            default=[],
+            choices=["templates", "urls", "caches", "database"],
+            help="Leave a warm-up step out; may be repeated.",
+        )
+        parser.add_argument("--top", type=int, default=10,
+                            help="Top-level packages to list.")
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT,
+             *options["skip"]],
+            cwd=settings.BASE_DIR,
+            env=os.environ,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        profile = json.loads(result.stdout.strip().splitlines()[-1])
+        imports = parse_importtime(result.stderr)
+
+        self.stdout.write(f"{'app':24} {'import ms':>10} {'ready ms':>10}")
+        for label, name, ready in profile["apps"]:
+            self.stdout.write(
+                f"{label:24} {package_time(imports, name):10.1f} "
+                f"{ready:10.1f}"
+            )
+        packages = {name.partition(".")[0] for name in imports}
+        slowest = sorted(
+            ((package_time(imports, name), name) for name in packages),
+            reverse=True,
+        )
+        self.stdout.write(f"\n{'package':24} {'import ms':>10}")
+        for ms, name in slowest[:options["top"]]:
+            self.stdout.write(f"{name:24} {ms:10.1f}")
+        self.stdout.write("")
+        self.stdout.write(f"django.setup() {profile['setup']:.1f} ms")
+        for step, (count, ms) in profile["warm_up"].items():
+            self.stdout.write(f"warm-up {step:10} {count:4} in {ms:8.1f} ms")
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-17 22:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0003_alter_cook_years_of_experience'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='cook',
+            options={'ordering': ('username',), 'verbose_name': 'cook', 'verbose_name_plural': 'cooks'},
+        ),
+    ]
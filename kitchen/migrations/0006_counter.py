@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-17 22:35
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    Counter = apps.get_model("kitchen", "Counter")
+    for name, model in (
+        ("cooks", "Cook"),
+        ("dish_types", "DishType"),
+        ("dishes", "Dish"),
+    ):
+        Counter.objects.create(
+            name=name,
+            value=apps.get_model("kitchen", model).objects.count(),
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0005_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
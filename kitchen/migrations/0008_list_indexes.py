@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-17 23:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# The auto-created through table only has its (dish_id, cook_id) unique
+# constraint and one index per column; a cook's dishes are looked up by
+# cook_id first.
+THROUGH_INDEX_SQL = (
+    'CREATE UNIQUE INDEX "kitchen_dish_cooks_cook_dish_uniq" '
+    'ON "kitchen_dish_cooks" ("cook_id", "dish_id")'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['-price', 'id'], name='kitchen_dish_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['dish_type', '-price', 'id'], name='kitchen_dish_type_price_idx'),
+        ),
+        # Only once the index above covers it.
+        migrations.AlterField(
+            model_name='dish',
+            name='dish_type',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='kitchen.dishtype'),
+        ),
+        migrations.AddIndex(
+            model_name='dishtype',
+            index=models.Index(fields=['name', 'id'], name='kitchen_dishtype_name_id_idx'),
+        ),
+        migrations.RunSQL(
+            THROUGH_INDEX_SQL,
+            'DROP INDEX "kitchen_dish_cooks_cook_dish_uniq"',
+        ),
+    ]
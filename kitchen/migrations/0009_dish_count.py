@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-17 23:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_dish_counts(apps, schema_editor):
+    Cook = apps.get_model("kitchen", "Cook")
+    Dish = apps.get_model("kitchen", "Dish")
+    DishType = apps.get_model("kitchen", "DishType")
+    for model, rows, column in (
+        (Cook, Dish.cooks.through.objects, "cook"),
+        (DishType, Dish.objects, "dish_type"),
+    ):
+        counts = (
+            rows.filter(**{column: OuterRef("pk")}).order_by()
+            .values(column).annotate(count=Count("*")).values("count")
+        )
+        model.objects.update(dish_count=Coalesce(Subquery(counts), 0))
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('kitchen', '0008_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cook',
+            name='dish_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Dishes'),
+        ),
+        migrations.AddField(
+            model_name='dishtype',
+            name='dish_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Dishes'),
+        ),
+        migrations.AddIndex(
+            model_name='cook',
+            index=models.Index(fields=['dish_count', 'id'], name='kitchen_cook_dish_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dishtype',
+            index=models.Index(fields=['dish_count', 'id'], name='kitchen_dishtype_count_idx'),
+        ),
+        migrations.RunPython(fill_dish_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.9 on 2026-10-17 23:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def fill_dish_cards(apps, schema_editor):
+    Dish = apps.get_model("kitchen", "Dish")
+    DishCard = apps.get_model("kitchen", "DishCard")
+    Assignment = Dish.cooks.through
+    last = 0
+    while True:
+        rows = list(
+            Dish.objects.filter(pk__gt=last).order_by("pk")
+            .values_list("pk", "name", "description", "price",
+                         "dish_type_id", "dish_type__name")[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        cooks = {row[0]: [] for row in rows}
+        for dish_id, cook_id, username in (
+            Assignment.objects.filter(dish_id__in=cooks)
+            .order_by("cook__username", "cook_id")
+            .values_list("dish_id", "cook_id", "cook__username")
+        ):
+            cooks[dish_id].append((cook_id, username))
+        now = timezone.now()
+        DishCard.objects.bulk_create(
+            DishCard(
+                id=pk, name=name, description=description, price=price,
+                dish_type_id=dish_type_id, dish_type_name=dish_type_name,
+                cook_count=len(cooks[pk]),
+                cook_ids=[cook_id for cook_id, _ in cooks[pk]],
+                cook_names=[username for _, username in cooks[pk]],
+                updated_at=now,
+            )
+            for pk, name, description, price, dish_type_id, dish_type_name
+            in rows
+        )
+        last = rows[-1][0]
+
+
+def create_trigram_index(apps, schema_editor):
+    # As migration 0005 does for the other searched columns.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS "kitchen_dishcard_name_trgm" '
+        'ON "kitchen_dishcard" USING gin (UPPER("name") gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "kitchen_dishcard_name_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0009_dish_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DishCard',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('description', models.TextField(max_length=500)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('dish_type_name', models.CharField(max_length=100, null=True)),
+                ('cook_count', models.PositiveIntegerField(default=0)),
+                ('cook_ids', models.JSONField(default=list)),
+                ('cook_names', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('dish_type', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='kitchen.dishtype')),
+            ],
+            options={
+                'verbose_name': 'dish card',
+                'verbose_name_plural': 'dish cards',
+                'ordering': ('-price',),
+                'indexes': [models.Index(fields=['-price', 'id'], name='kitchen_card_price_id_idx'), models.Index(fields=['dish_type', '-price', 'id'], name='kitchen_card_type_price_idx')],
+            },
+        ),
+        migrations.RunPython(fill_dish_cards, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models import DEFERRED
 from django.urls import reverse
 
 
@@ -11,15 +12,34 @@ class DishType(models.Model):
         verbose_name="Dish type name",
         help_text="Enter the name of the dish type (e.g. Soup, Dessert)."
     )
+    # Kept by kitchen.signals; repair_dish_counts fixes any drift.
+    dish_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Dishes"
+    )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ("name",)
+        indexes = [
+            # The keyset pagination orders of the list.
+            models.Index(fields=["name", "id"],
+                         name="kitchen_dishtype_name_id_idx"),
+            models.Index(fields=["dish_count", "id"],
+                         name="kitchen_dishtype_count_idx"),
+        ]
         verbose_name = "dish type"
         verbose_name_plural = "dish types"
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        dish_type = super().from_db(db, field_names, values)
+        # The dish cards to rename only change with the name.
+        dish_type.loaded_name = dish_type.__dict__.get("name", DEFERRED)
+        return dish_type
+
 
 class Cook(AbstractUser):
     years_of_experience = models.IntegerField(
@@ -36,8 +56,18 @@ class Cook(AbstractUser):
                 message="Experience cannot exceed 40 years.")
         ]
     )
+    # Kept by kitchen.signals; repair_dish_counts fixes any drift.
+    dish_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Dishes"
+    )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
+        ordering = ("username",)
+        indexes = [
+            models.Index(fields=["dish_count", "id"],
+                         name="kitchen_cook_dish_count_idx"),
+        ]
         verbose_name = "cook"
         verbose_name_plural = "cooks"
 
@@ -51,6 +81,13 @@ class Cook(AbstractUser):
         return (f"{self.username} ({self.first_name} {self.last_name}), "
                 f"years of experience: {self.years_of_experience}")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        cook = super().from_db(db, field_names, values)
+        # The dish cards to rename only change with the username.
+        cook.loaded_username = cook.__dict__.get("username", DEFERRED)
+        return cook
+
 
 class Dish(models.Model):
     name = models.CharField(
@@ -78,11 +115,77 @@ class Dish(models.Model):
         DishType,
         on_delete=models.SET_NULL,
         null=True,
+        # Covered by kitchen_dish_type_price_idx.
+        db_index=False,
     )
     cooks = models.ManyToManyField(Cook, related_name="dishes")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ("-price",)
+        indexes = [
+            # The keyset pagination order, overall and within a dish type.
+            models.Index(fields=["-price", "id"],
+                         name="kitchen_dish_price_id_idx"),
+            models.Index(fields=["dish_type", "-price", "id"],
+                         name="kitchen_dish_type_price_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        dish = super().from_db(db, field_names, values)
+        # The type to recount when a save moves the dish to another one.
+        dish.loaded_dish_type_id = dish.__dict__.get("dish_type_id", DEFERRED)
+        return dish
+
+
+class DishCard(models.Model):
+    """
+    A dish as the dish list, the exports and the API show it, with its
+    type's name and its cooks copied in. Kept by kitchen.cards.
+    """
+    # The dish's own id.
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=100)
+    description = models.TextField(max_length=500)
+    price = models.DecimalField(decimal_places=2, max_digits=10)
+    dish_type = models.ForeignKey(
+        DishType,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="+",
+        # Covered by kitchen_card_type_price_idx.
+        db_index=False,
+    )
+    # NULL without a dish type, as dish_type__name reads.
+    dish_type_name = models.CharField(max_length=100, null=True)
+    cook_count = models.PositiveIntegerField(default=0)
+    # Ordered by username.
+    cook_ids = models.JSONField(default=list)
+    cook_names = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ("-price",)
+        indexes = [
+            models.Index(fields=["-price", "id"],
+                         name="kitchen_card_price_id_idx"),
+            models.Index(fields=["dish_type", "-price", "id"],
+                         name="kitchen_card_type_price_idx"),
+        ]
+        verbose_name = "dish card"
+        verbose_name_plural = "dish cards"
 
     def __str__(self):
         return self.name
+
+
+class Counter(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,247 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return "<Keyset page>"
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Seek-method paginator: pages are addressed by an opaque cursor holding
+    the ordering values of the boundary row, so no COUNT(*) or OFFSET is
+    ever issued.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.model = queryset.model
+        self.ordering = self._resolve_ordering(
+            ordering or queryset.query.order_by or self.model._meta.ordering
+        )
+
+    def _resolve_ordering(self, ordering):
+        fields = []
+        for item in ordering:
+            descending = item.startswith("-")
+            fields.append((item.lstrip("-"), descending))
+        names = [name for name, _ in fields]
+        if "pk" not in names and self.model._meta.pk.name not in names:
+            last = self._get_field(names[-1]) if names else None
+            if last is None or not last.unique:
+                fields.append(("pk", False))
+        return tuple(fields)
+
+    def _get_field(self, name):
+        if name == "pk":
+            return self.model._meta.pk
+        if name in self.queryset.query.annotations:
+            return None
+        return self.model._meta.get_field(name)
+
+    def _to_python(self, name, value):
+        field = self._get_field(name)
+        return value if field is None else field.to_python(value)
+
+    def _values(self, obj):
+        if isinstance(obj, dict):
+            # A .values() row, keyed by attname.
+            return [
+                obj[self.model._meta.pk.attname if name == "pk" else name]
+                for name, _ in self.ordering
+            ]
+        return [getattr(obj, name) for name, _ in self.ordering]
+
+    @property
+    def lookups(self):
+        """The fields a .values() queryset needs for the cursors."""
+        return [self.model._meta.pk.attname if name == "pk" else name
+                for name, _ in self.ordering]
+
+    def encode_cursor(self, obj, forward):
+        payload = {
+            "d": "n" if forward else "p",
+            "v": self._values(obj),
+        }
+        raw = json.dumps(payload, cls=DjangoJSONEncoder).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded))
+            values = payload["v"]
+            forward = {"n": True, "p": False}[payload["d"]]
+            if len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self._to_python(name, value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (binascii.Error, ValueError, KeyError, TypeError,
+                ValidationError):
+            raise InvalidPage("That cursor is not valid")
+        return values, forward
+
+    def _seek(self, values, forward):
+        condition = Q()
+        for index, (name, descending) in enumerate(self.ordering):
+            lookup = "lt" if descending == forward else "gt"
+            step = Q(**{f"{name}__{lookup}": values[index]})
+            for prior, value in zip(self.ordering[:index], values):
+                step &= Q(**{prior[0]: value})
+            condition |= step
+        # Implied by the disjunction, but unlike it a range the planner can
+        # walk the ordering's index along instead of merging and sorting.
+        name, descending = self.ordering[0]
+        lookup = "lte" if descending == forward else "gte"
+        return Q(**{f"{name}__{lookup}": values[0]}) & condition
+
+    def _order_by(self, forward):
+        return [
+            f"-{name}" if descending == forward else name
+            for name, descending in self.ordering
+        ]
+
+    def _window(self, cursor):
+        """Return the page's queryset and the direction it was reached in."""
+        queryset = self.queryset.order_by(*self._order_by(True))
+        if not cursor:
+            return queryset[:self.per_page], True
+        values, forward = self.decode_cursor(cursor)
+        if forward:
+            object_list = queryset.filter(self._seek(values, True))
+            return object_list[:self.per_page], True
+        window = (
+            self.queryset.order_by(*self._order_by(False))
+            .filter(self._seek(values, False))
+            .values("pk")[:self.per_page]
+        )
+        return queryset.filter(pk__in=window), False
+
+    def _probe(self, rows, forward):
+        """
+        Return the queryset telling whether rows lie past a full page in
+        the direction of travel, or None when the page is not full.
+        """
+        if len(rows) < self.per_page:
+            return None
+        boundary = rows[-1] if forward else rows[0]
+        return self.queryset.filter(
+            self._seek(self._values(boundary), forward)
+        )
+
+    def _make_page(self, object_list, rows, cursor, forward, more):
+        if not rows:
+            return KeysetPage(object_list, self)
+        first, last = rows[0], rows[-1]
+        next_cursor = previous_cursor = None
+        if forward:
+            if cursor:
+                previous_cursor = self.encode_cursor(first, False)
+            if more:
+                next_cursor = self.encode_cursor(last, True)
+        else:
+            next_cursor = self.encode_cursor(last, True)
+            if more:
+                previous_cursor = self.encode_cursor(first, False)
+        return KeysetPage(
+            object_list,
+            self,
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
+        )
+
+    def page(self, cursor=None):
+        object_list, forward = self._window(cursor)
+        rows = list(object_list)
+        probe = self._probe(rows, forward)
+        more = probe is not None and probe.exists()
+        return self._make_page(object_list, rows, cursor, forward, more)
+
+    async def apage(self, cursor=None):
+        """Like page(), through the async ORM."""
+        object_list, forward = self._window(cursor)
+        rows = [row async for row in object_list]
+        probe = self._probe(rows, forward)
+        more = probe is not None and await probe.aexists()
+        return self._make_page(object_list, rows, cursor, forward, more)
+
+
+class KeysetPaginationMixin:
+    """
+    Replace the default page-number pagination of a ListView with keyset
+    pagination driven by the ``cursor`` query parameter.
+    """
+    keyset_paginator_class = KeysetPaginator
+    keyset_ordering = None
+    cursor_kwarg = "cursor"
+
+    keyset_result = None
+
+    def _paginate(self, queryset, page_size):
+        paginator = self.keyset_paginator_class(
+            queryset, page_size, ordering=self.keyset_ordering
+        )
+        return paginator, self.request.GET.get(self.cursor_kwarg)
+
+    def _result(self, paginator, page):
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.keyset_result is not None:
+            return self.keyset_result
+        paginator, cursor = self._paginate(queryset, page_size)
+        try:
+            page = paginator.page(cursor)
+        except InvalidPage as e:
+            raise Http404(
+                "Invalid cursor: %(message)s" % {"message": str(e)}
+            )
+        return self._result(paginator, page)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """
+        Fetch the page through the async ORM and keep it, so that the sync
+        get_context_data() calling paginate_queryset() runs no query.
+        """
+        paginator, cursor = self._paginate(queryset, page_size)
+        try:
+            page = await paginator.apage(cursor)
+        except InvalidPage as e:
+            raise Http404(
+                "Invalid cursor: %(message)s" % {"message": str(e)}
+            )
+        self.keyset_result = self._result(paginator, page)
+        return self.keyset_result
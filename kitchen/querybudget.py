@@ -0,0 +1,136 @@
+import logging
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of SQL queries per request, including the session and
+# user lookups done by middleware. Keyed by URL name, then HTTP method.
+QUERY_BUDGETS = {
+    "kitchen:index": {"GET": 3},
+    "kitchen:db-pool-stats": {"GET": 2},
+    "kitchen:cache-stats": {"GET": 2},
+    "kitchen:dish-type-list": {"GET": 4},
+    "kitchen:dish-type-create": {"GET": 2, "POST": 4},
+    "kitchen:dish-type-update": {"GET": 3, "POST": 5},
+    "kitchen:dish-type-delete": {"GET": 3, "POST": 9},
+    "kitchen:dish-list": {"GET": 5},
+    "kitchen:dish-detail": {"GET": 6},
+    "kitchen:dish-create": {"GET": 4, "POST": 17},
+    "kitchen:dish-update": {"GET": 6, "POST": 12},
+    "kitchen:dish-delete": {"GET": 3, "POST": 9},
+    "kitchen:toggle-dish-assign": {"POST": 10},
+    "kitchen:dish-bulk-assign": {"GET": 4, "POST": 13},
+    "kitchen:dish-export": {"GET": 3},
+    "kitchen:cook-list": {"GET": 4},
+    "kitchen:cook-detail": {"GET": 5},
+    "kitchen:cook-export": {"GET": 3},
+    "kitchen:cook-create": {"GET": 2, "POST": 6},
+    "kitchen:cook-update": {"GET": 3, "POST": 5},
+    "kitchen:cook-delete": {"GET": 3, "POST": 11},
+    "kitchen:api-dish-types": {"GET": 4},
+    "kitchen:api-dish-type": {"GET": 3},
+    "kitchen:api-dishes": {"GET": 5},
+    "kitchen:api-dish": {"GET": 4},
+    "kitchen:api-cooks": {"GET": 4},
+    "kitchen:api-cook": {"GET": 3},
+}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def get_budget(view_name, method):
+    return QUERY_BUDGETS.get(view_name, {}).get(method)
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the queries of every request and report the ones over budget.
+
+    Meant for development and staging: enabled through the
+    KITCHEN_QUERY_BUDGETS setting, where "strict" raises instead of logging.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as counter:
+            response = self.get_response(request)
+        response["X-Query-Count"] = str(counter.count)
+        match = request.resolver_match
+        if match is None:
+            return response
+        budget = get_budget(match.view_name, request.method)
+        if budget is not None and counter.count > budget:
+            message = (
+                f"{request.method} {match.view_name} ran {counter.count} "
+                f"queries, budget is {budget}"
+            )
+            if settings.KITCHEN_QUERY_BUDGETS == "strict":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class QueryBudgetTestMixin:
+    def assertWithinQueryBudget(self, url_name, method="get", args=None,
+                                data=None):
+        with count_queries() as counter:
+            response = getattr(self.client, method)(
+                reverse(url_name, args=args), data=data
+            )
+            if response.streaming:
+                response.streaming_content = [
+                    b"".join(response.streaming_content)
+                ]
+        budget = get_budget(url_name, method.upper())
+        if budget is None:
+            self.fail(f"No query budget declared for {method.upper()} "
+                      f"{url_name}")
+        if counter.count > budget:
+            self.fail(
+                f"{method.upper()} {url_name} ran {counter.count} queries, "
+                f"budget is {budget}:\n" + "\n".join(counter.queries)
+            )
+        return response, counter.count
+
+    def assertQueryCountStable(self, url_name, grow, args=None, data=None):
+        # Grow once up front so that both measurements see full pages.
+        grow()
+        _, before = self.assertWithinQueryBudget(url_name, args=args,
+                                                 data=data)
+        grow()
+        _, after = self.assertWithinQueryBudget(url_name, args=args,
+                                                data=data)
+        self.assertEqual(
+            before, after,
+            f"{url_name} query count grows with the number of rows",
+        )
@@ -0,0 +1,91 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_pinned = ContextVar("kitchen_pinned_to_primary", default=False)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+@contextmanager
+def pin_to_primary():
+    """Send every read of the enclosed block to the primary."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Write to the primary and spread reads over KITCHEN_DATABASE_REPLICAS.
+
+    Reads stay on the primary while pinned (see ReplicaStickinessMiddleware)
+    and inside a transaction on the primary, which must see its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.KITCHEN_DATABASE_REPLICAS
+        if (
+            not replicas
+            or is_pinned()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        aliases = {DEFAULT_DB_ALIAS, *settings.KITCHEN_DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Pin a client to the primary for KITCHEN_PRIMARY_STICKY_SECONDS after a
+    write, so that it reads its own writes despite replication lag.
+
+    The deadline lives in a cookie rather than the session, since loading
+    the session is itself a read that has to be routed first.
+    """
+    cookie_name = "kitchen_primary_until"
+    safe_methods = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in self.safe_methods
+        if writes or self._pinned_until(request) > time.time():
+            with pin_to_primary():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        if writes:
+            window = settings.KITCHEN_PRIMARY_STICKY_SECONDS
+            response.set_cookie(
+                self.cookie_name,
+                str(int(time.time() + window)),
+                max_age=window,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def _pinned_until(self, request):
+        try:
+            return int(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            return 0
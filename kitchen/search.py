@@ -0,0 +1,144 @@
+import functools
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+SEARCH_FIELDS = (
+    ("kitchen.Dish", "name"),
+    ("kitchen.DishCard", "name"),
+    ("kitchen.DishType", "name"),
+    ("kitchen.Cook", "username"),
+)
+
+DEFAULT_BACKENDS = {
+    "postgresql": "kitchen.search.TrigramSearchBackend",
+    "sqlite": "kitchen.search.SQLiteFTS5SearchBackend",
+}
+
+
+class IContainsSearchBackend:
+    def search(self, queryset, field, term):
+        return queryset.filter(**{f"{field}__icontains": term})
+
+
+class TrigramSearchBackend(IContainsSearchBackend):
+    """
+    Keep the icontains semantics, which the ``UPPER(field) gin_trgm_ops``
+    indexes from migration 0005 can answer, and rank matches by trigram
+    similarity ahead of the model ordering.
+    """
+
+    def search(self, queryset, field, term):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return (
+            super().search(queryset, field, term)
+            .annotate(search_rank=TrigramSimilarity(field, term))
+            .order_by("-search_rank", *ordering)
+        )
+
+
+class SQLiteFTS5SearchBackend(IContainsSearchBackend):
+    """
+    Answer substring searches from an FTS5 trigram table; the trigram
+    tokenizer cannot match terms shorter than three characters, so those
+    fall back to icontains.
+    """
+    min_term_length = 3
+
+    def search(self, queryset, field, term):
+        if len(term) < self.min_term_length:
+            return super().search(queryset, field, term)
+        table = fts_table_name(queryset.model, field)
+        phrase = '"%s"' % term.replace('"', '""')
+        return queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT rowid FROM "{table}" WHERE "{table}" MATCH %s',
+                (phrase,),
+            )
+        )
+
+
+@functools.lru_cache
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_search_backend():
+    path = getattr(settings, "KITCHEN_SEARCH_BACKEND", None)
+    if not path:
+        path = DEFAULT_BACKENDS.get(
+            connection.vendor, "kitchen.search.IContainsSearchBackend"
+        )
+    return _load_backend(path)
+
+
+def search(queryset, field, term):
+    return get_search_backend().search(queryset, field, term)
+
+
+def fts_table_name(model, field):
+    return f"{model._meta.db_table}_{field}_fts"
+
+
+def install_sqlite_fts(using="default"):
+    """
+    Create the FTS5 tables and the triggers that keep them in sync.
+
+    This runs on post_migrate rather than in a migration because SQLite
+    rebuilds a table (dropping its triggers) on most ALTER operations, so
+    the triggers must be checked after every migrate run.
+    """
+    conn = connections[using]
+    if conn.vendor != "sqlite":
+        return
+    with conn.cursor() as cursor:
+        for label, field in SEARCH_FIELDS:
+            model = apps.get_model(label)
+            source = model._meta.db_table
+            column = model._meta.get_field(field).column
+            table = fts_table_name(model, field)
+            triggers = [f"{table}_ai", f"{table}_ad", f"{table}_au"]
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master "
+                "WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                triggers,
+            )
+            if cursor.fetchone()[0] == len(triggers):
+                continue
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}" USING fts5('
+                f'"{column}", content="{source}", content_rowid="id", '
+                f"tokenize='trigram')"
+            )
+            for trigger in triggers:
+                cursor.execute(f'DROP TRIGGER IF EXISTS "{trigger}"')
+            cursor.execute(
+                f'CREATE TRIGGER "{triggers[0]}" AFTER INSERT ON "{source}" '
+                f'BEGIN INSERT INTO "{table}"(rowid, "{column}") '
+                f'VALUES (new.id, new."{column}"); END'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER "{triggers[1]}" AFTER DELETE ON "{source}" '
+                f'BEGIN INSERT INTO "{table}"("{table}", rowid, "{column}") '
+                f"VALUES ('delete', old.id, old.\"{column}\"); END"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER "{triggers[2]}" AFTER UPDATE OF "{column}" '
+                f'ON "{source}" '
+                f'BEGIN INSERT INTO "{table}"("{table}", rowid, "{column}") '
+                f"VALUES ('delete', old.id, old.\"{column}\"); "
+                f'INSERT INTO "{table}"(rowid, "{column}") '
+                f'VALUES (new.id, new."{column}"); END'
+            )
+            cursor.execute(
+                f'INSERT INTO "{table}"("{table}") VALUES (\'rebuild\')'
+            )
+
+
+def install_sqlite_fts_handler(sender, using="default", **kwargs):
+    install_sqlite_fts(using)
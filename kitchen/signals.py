@@ -0,0 +1,280 @@
+from collections import Counter
+
+from django.contrib.auth.signals import user_logged_out
+from django.db.models import DEFERRED, F
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from kitchen import auth, cards, counters, fragments
+from kitchen.cache import get_cache
+from kitchen.conditional import touch
+from kitchen.models import Cook, Dish, DishCard, DishType
+
+COUNTER_NAMES = {
+    model: name for name, model in counters.COUNTED_MODELS.items()
+}
+
+
+@receiver(post_save, sender=Cook)
+@receiver(post_save, sender=Dish)
+@receiver(post_save, sender=DishType)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust(COUNTER_NAMES[sender], 1)
+
+
+@receiver(post_delete, sender=Cook)
+@receiver(post_delete, sender=Dish)
+@receiver(post_delete, sender=DishType)
+def count_deleted(sender, instance, **kwargs):
+    counters.adjust(COUNTER_NAMES[sender], -1)
+
+
+def _locked_assignments(instance, reverse, pk_set=None):
+    """
+    Lock and return the (dish_id, cook_id) rows that a removal or clear is
+    about to delete. A concurrent removal of the same rows waits, then
+    finds them gone, so that each row is only counted down once.
+    """
+    rows = Dish.cooks.through.objects.select_for_update().filter(
+        **{"cook" if reverse else "dish": instance}
+    )
+    if pk_set is not None:
+        rows = rows.filter(
+            **{"dish__in" if reverse else "cook__in": pk_set}
+        )
+    return list(rows.values_list("dish_id", "cook_id"))
+
+
+@receiver(m2m_changed, sender=Dish.cooks.through)
+def count_assignments(sender, instance, action, reverse, pk_set,
+                      counted=False, **kwargs):
+    # ``counted`` is set by kitchen.assignments, which counts in bulk.
+    if counted:
+        return
+    if action in ("pre_remove", "pre_clear"):
+        # pk_set of a removal may name cooks that were not assigned. The
+        # rows are deleted in the same transaction.
+        pairs = _locked_assignments(
+            instance, reverse, pk_set if action == "pre_remove" else None
+        )
+        removed = Counter(cook_id for _, cook_id in pairs)
+        counters.shift_dish_counts(
+            Cook, {cook_id: -count for cook_id, count in removed.items()}
+        )
+    elif action == "post_add" and pk_set:
+        # Django narrows pk_set to the rows it inserted.
+        counters.shift_dish_counts(
+            Cook,
+            {instance.pk: len(pk_set)} if reverse
+            else dict.fromkeys(pk_set, 1),
+        )
+
+
+@receiver(pre_delete, sender=Dish)
+def uncount_deleted_assignments(sender, instance, **kwargs):
+    # The deletion cascades to the assignment rows without m2m_changed;
+    # this also stands for touch_related() below.
+    Cook.objects.filter(dishes=instance).update(
+        dish_count=F("dish_count") - 1, updated_at=timezone.now()
+    )
+
+
+def _saves_dish_type(update_fields):
+    return update_fields is None or not update_fields.isdisjoint(
+        {"dish_type", "dish_type_id"}
+    )
+
+
+@receiver(pre_save, sender=Dish)
+def remember_dish_type(sender, instance, update_fields=None, **kwargs):
+    # A dish built by pk, or loaded without its type, does not know the
+    # type it leaves: read it rather than recount every type afterwards.
+    if (
+        instance.pk is not None
+        and _saves_dish_type(update_fields)
+        and getattr(instance, "loaded_dish_type_id", DEFERRED) is DEFERRED
+    ):
+        instance.loaded_dish_type_id = (
+            Dish.objects.filter(pk=instance.pk)
+            .values_list("dish_type_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Dish)
+def count_dish_types(sender, instance, created, update_fields=None,
+                     **kwargs):
+    if not _saves_dish_type(update_fields):
+        return
+    previous = None if created else instance.loaded_dish_type_id
+    if previous != instance.dish_type_id:
+        deltas = {previous: -1, instance.dish_type_id: 1}
+        deltas.pop(None, None)
+        counters.shift_dish_counts(DishType, deltas)
+    instance.loaded_dish_type_id = instance.dish_type_id
+
+
+@receiver(post_delete, sender=Dish)
+def uncount_deleted_dish(sender, instance, **kwargs):
+    # A deleted dish type needs nothing: SET_NULL leaves no other type's
+    # count changed.
+    if instance.dish_type_id is not None:
+        counters.shift_dish_counts(DishType, {instance.dish_type_id: -1})
+
+
+@receiver(post_save, sender=Dish)
+def refresh_dish_card(sender, instance, created, **kwargs):
+    if created:
+        cards.save_cards([cards.new_card(instance)])
+    else:
+        cards.refresh_cards([instance.pk])
+
+
+@receiver(post_delete, sender=Dish)
+def delete_dish_card(sender, instance, **kwargs):
+    DishCard.objects.filter(pk=instance.pk).delete()
+
+
+@receiver(post_save, sender=DishType)
+def rename_dish_type_cards(sender, instance, created, update_fields=None,
+                           **kwargs):
+    if update_fields is not None and "name" not in update_fields:
+        return
+    previous = getattr(instance, "loaded_name",
+                       instance.name if created else DEFERRED)
+    if previous != instance.name:
+        DishCard.objects.filter(dish_type=instance).update(
+            dish_type_name=instance.name, updated_at=timezone.now()
+        )
+    instance.loaded_name = instance.name
+
+
+@receiver(pre_delete, sender=DishType)
+def unname_dish_type_cards(sender, instance, **kwargs):
+    # SET_NULL then clears dish_type.
+    DishCard.objects.filter(dish_type=instance).update(
+        dish_type_name=None, updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Cook)
+def rename_cook_cards(sender, instance, created, **kwargs):
+    previous = getattr(instance, "loaded_username",
+                       instance.username if created else DEFERRED)
+    if previous != instance.username:
+        cards.refresh_cards(
+            Dish.cooks.through.objects.filter(cook=instance)
+            .values_list("dish_id", flat=True)
+        )
+    instance.loaded_username = instance.username
+
+
+@receiver(pre_delete, sender=Cook)
+def remember_cook_cards(sender, instance, **kwargs):
+    # The assignment rows are gone by post_delete.
+    instance.card_dish_pks = list(
+        Dish.cooks.through.objects.filter(cook=instance)
+        .values_list("dish_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Cook)
+def refresh_deleted_cook_cards(sender, instance, **kwargs):
+    cards.refresh_cards(getattr(instance, "card_dish_pks", ()))
+
+
+@receiver(m2m_changed, sender=Dish.cooks.through)
+def refresh_assigned_cards(sender, instance, action, reverse, pk_set,
+                           carded=False, **kwargs):
+    # ``carded`` is set by kitchen.assignments, which refreshes in bulk.
+    if carded:
+        return
+    if action == "pre_clear" and reverse:
+        instance.card_dish_pks = list(
+            instance.dishes.values_list("pk", flat=True)
+        )
+    elif action in ("post_add", "post_remove") and pk_set:
+        cards.refresh_cards(pk_set if reverse else [instance.pk])
+    elif action == "post_clear":
+        cards.refresh_cards(
+            getattr(instance, "card_dish_pks", ()) if reverse
+            else [instance.pk]
+        )
+
+
+# Names used by {% fragmentcache %} to declare what a fragment shows, and
+# as the tags of the kitchen cache.
+FRAGMENT_MODELS = {
+    Cook: "cook",
+    Dish: "dish",
+    DishType: "dish_type",
+}
+
+
+@receiver(post_save, sender=Cook)
+@receiver(post_save, sender=Dish)
+@receiver(post_save, sender=DishType)
+@receiver(post_delete, sender=Cook)
+@receiver(post_delete, sender=Dish)
+@receiver(post_delete, sender=DishType)
+def invalidate_fragments(sender, **kwargs):
+    fragments.bump_version(FRAGMENT_MODELS[sender])
+    get_cache().invalidate_tags(FRAGMENT_MODELS[sender])
+
+
+@receiver(post_save, sender=Cook)
+@receiver(post_delete, sender=Cook)
+def invalidate_cook_snapshot(sender, instance, **kwargs):
+    auth.invalidate_snapshot(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_snapshot(sender, user, **kwargs):
+    if user is not None:
+        auth.invalidate_snapshot(user.pk)
+
+
+@receiver(m2m_changed, sender=Dish.cooks.through)
+def invalidate_assignment_fragments(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        fragments.bump_version("assignment")
+        get_cache().invalidate_tags("assignment")
+
+
+@receiver(m2m_changed, sender=Dish.cooks.through)
+def touch_assigned(sender, instance, action, reverse, model, pk_set,
+                   touched=False, **kwargs):
+    """
+    Keep updated_at moving on the dishes of an assignment change, since the
+    dish detail lists its cooks; the cooks' side moves with the dish_count
+    that count_assignments() writes. ``touched`` is set by
+    kitchen.assignments, which touches in bulk.
+    """
+    if touched:
+        return
+    if action == "pre_clear" and reverse:
+        touch(instance.dishes.all())
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            touch(Dish.objects.filter(pk=instance.pk))
+        elif pk_set:
+            touch(Dish.objects.filter(pk__in=pk_set))
+
+
+# Rows whose page shows the instance, and are changed by its deletion
+# without save(): SET_NULL on the dish type, cascaded assignment rows. A
+# dish's cooks are touched by uncount_deleted_assignments().
+DELETE_TOUCHES = {
+    DishType: (Dish, "dish_type"),
+    Cook: (Dish, "cooks"),
+}
+
+
+@receiver(pre_delete, sender=Cook)
+@receiver(pre_delete, sender=DishType)
+def touch_related(sender, instance, **kwargs):
+    model, lookup = DELETE_TOUCHES[sender]
+    touch(model.objects.filter(**{lookup: instance}))
@@ -0,0 +1,16 @@
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    collectstatic writes each file under a content-hashed name, plus .gz
+    and .br variants that WhiteNoise serves with an immutable Cache-Control.
+
+    Until a manifest exists, as under ``manage.py test`` or before the
+    first build, URLs keep the plain names instead of failing every page.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
@@ -0,0 +1,60 @@
+from django import template
+
+from kitchen import fragments
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, models, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.models = models
+        self.vary_on = vary_on
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        models = self.models.resolve(context).split(",")
+        versions = context.render_context.setdefault(
+            "kitchen_fragment_versions", {}
+        )
+        missing = [model for model in models if model not in versions]
+        if missing:
+            versions.update(fragments.get_versions(missing))
+        key = fragments.make_key(
+            name,
+            [value.resolve(context) for value in self.vary_on],
+            {model: versions[model] for model in models},
+        )
+        value = fragments.get_fragment(key)
+        fragments.record(name, value is not None)
+        if value is None:
+            value = self.nodelist.render(context)
+            fragments.set_fragment(key, value)
+        return value
+
+
+@register.tag("fragmentcache")
+def do_fragmentcache(parser, token):
+    """
+    Cache the enclosed fragment until one of the listed models changes::
+
+        {% fragmentcache "dish-row" "dish" dish.pk %} ... {% endfragmentcache %}
+
+    The first argument names the fragment, the second is a comma-separated
+    list of the models it shows (see kitchen.signals), and the rest are
+    values the fragment varies on, usually the object pk.
+    """
+    nodelist = parser.parse(("endfragmentcache",))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least 2 arguments."
+        )
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
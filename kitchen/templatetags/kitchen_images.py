@@ -0,0 +1,43 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from kitchen.images import FORMATS, get_variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(name, alt="", sizes="100vw", **attrs):
+    """
+    Render a static image as a <picture> offering its AVIF and WebP
+    variants, falling back to the original::
+
+        {% picture "assets/img/bg.jpg" alt="" class="w-100" loading="lazy" %}
+
+    Other keyword arguments become attributes of the <img>, with
+    underscores turned into hyphens.
+    """
+    entry = get_variants(name)
+    img_attrs = {"src": static(name), "alt": alt}
+    sources = []
+    if entry:
+        img_attrs.update(width=entry["width"], height=entry["height"])
+        for image_format in FORMATS:
+            srcset = ", ".join(
+                f"{static(variant)} {width}w"
+                for width, variant, _ in entry["variants"][image_format]
+            )
+            sources.append((f"image/{image_format}", srcset, sizes))
+    img_attrs.update(
+        (key.replace("_", "-"), value) for key, value in attrs.items()
+    )
+    return format_html(
+        "<picture>{}<img {}></picture>",
+        format_html_join(
+            "", '<source type="{}" srcset="{}" sizes="{}">', sources
+        ),
+        format_html_join(
+            " ", '{}="{}"', img_attrs.items()
+        ),
+    )
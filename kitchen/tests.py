@@ -1,9 +1,82 @@
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
-from django.urls import reverse
-
-from kitchen.forms import DishForm, CookCreationForm, CookUpdateForm, CookSearchForm, DishSearchForm, DishTypeSearchForm
-from kitchen.models import DishType, Cook, Dish
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models import Count, QuerySet
+from django.db.models.functions import Length
+from django.db.models.signals import m2m_changed
+from django.http import HttpResponse, QueryDict
+from django.template import Context, Template, engines
+from django.test import (
+    AsyncClient,
+    Client,
+    LiveServerTestCase,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from kitchen import assignments, cards, conditional, counters, fragments
+from kitchen.auth import SNAPSHOT_KEY, CachedModelBackend
+from kitchen.counters import get_counts
+from kitchen.dbpool import get_pool_stats, pool_options
+from kitchen.facets import DishFacets
+from kitchen.forms import (
+    BulkAssignmentForm,
+    CookCreationForm,
+    CookSearchForm,
+    CookUpdateForm,
+    DishForm,
+    DishSearchForm,
+    DishTypeSearchForm,
+)
+from kitchen.images import FORMATS, variant_widths
+from kitchen.loadtest import parse_mix, percentile
+from kitchen.management.commands import import_kitchen
+from kitchen.models import Cook, Counter, Dish, DishCard, DishType
+from kitchen.pagination import KeysetPaginator
+from kitchen.querybudget import (
+    QUERY_BUDGETS,
+    QueryBudgetExceeded,
+    QueryBudgetTestMixin,
+    QueryCounter,
+)
+from kitchen.routers import (
+    ReplicaRouter,
+    ReplicaStickinessMiddleware,
+    is_pinned,
+    pin_to_primary,
+)
+from kitchen.search import (
+    IContainsSearchBackend,
+    SQLiteFTS5SearchBackend,
+    get_search_backend,
+    search,
+)
+from kitchen.storage import StaticFilesStorage
+from kitchen.views import DishDetailView
+from kitchen.warmup import compile_templates, template_names, warm_up
 
 
 # Create your tests here.
@@ -67,7 +140,10 @@ class PrivateDishTest(TestCase):
         response = self.client.get(dish_url)
         self.assertEqual(response.status_code, 200)
         dishes = Dish.objects.all()
-        self.assertEqual(list(response.context["dish_list"]), list(dishes))
+        self.assertEqual(
+            [dish.pk for dish in response.context["dish_list"]],
+            [dish.pk for dish in dishes],
+        )
         self.assertTemplateUsed(response, "kitchen/dish_list.html")
 
 
@@ -672,3 +748,2141 @@ class DishTypeSearchFormTest(TestCase):
         form = DishTypeSearchForm(data={"name": "Soup"})
         self.assertTrue(form.is_valid())
         self.assertEqual(form.cleaned_data["name"], "Soup")
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.client.force_login(self.user)
+        dish_type = DishType.objects.create(name="Soup")
+        for i in range(12):
+            Dish.objects.create(name=f"Soup {i}",
+                                price=10 + i % 4,
+                                dish_type=dish_type)
+        Dish.objects.create(name="Salad", price=3, dish_type=dish_type)
+
+    def _walk(self, url, data=None):
+        pages = []
+        response = self.client.get(url, data=data)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(list(response.context["dish_list"]))
+            page = response.context["page_obj"]
+            if not page.has_next():
+                return pages, response
+            response = self.client.get(
+                url, data={**(data or {}), "cursor": page.next_cursor}
+            )
+
+    def test_forward_pages_follow_model_ordering(self):
+        pages, _ = self._walk(reverse("kitchen:dish-list"))
+        self.assertEqual([len(page) for page in pages], [5, 5, 3])
+        self.assertEqual(
+            [dish.pk for page in pages for dish in page],
+            list(Dish.objects.order_by("-price", "pk")
+                 .values_list("pk", flat=True)),
+        )
+
+    def test_previous_cursor_returns_previous_page(self):
+        url = reverse("kitchen:dish-list")
+        pages, response = self._walk(url)
+        page = response.context["page_obj"]
+        response = self.client.get(url,
+                                   data={"cursor": page.previous_cursor})
+        self.assertEqual(list(response.context["dish_list"]), pages[1])
+        page = response.context["page_obj"]
+        response = self.client.get(url,
+                                   data={"cursor": page.previous_cursor})
+        self.assertEqual(list(response.context["dish_list"]), pages[0])
+        self.assertFalse(response.context["page_obj"].has_previous())
+
+    def test_cursor_respects_search_filter(self):
+        pages, _ = self._walk(reverse("kitchen:dish-list"),
+                              data={"name": "soup"})
+        names = [dish.name for page in pages for dish in page]
+        self.assertEqual(len(names), 12)
+        self.assertNotIn("Salad", names)
+
+    def test_links_keep_search_and_skip_count(self):
+        url = reverse("kitchen:dish-list")
+        with self.assertNumQueries(5) as queries:
+            response = self.client.get(url, data={"name": "soup"})
+        # The only COUNTs are the grouped ones of the facets.
+        sql = " ".join(query["sql"] for query in queries.captured_queries
+                       if "UNION ALL" not in query["sql"].upper())
+        self.assertNotIn("COUNT(", sql.upper())
+        self.assertNotIn("OFFSET", sql.upper())
+        self.assertContains(response, "?name=soup&amp;cursor=")
+        self.assertNotContains(response, " of ")
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse("kitchen:dish-list"),
+                                   data={"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_annotation_ordering(self):
+        queryset = Dish.objects.annotate(
+            search_rank=Length("name")
+        ).order_by("-search_rank", "-price")
+        paginator = KeysetPaginator(queryset, 5)
+        page = paginator.page()
+        rows = list(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            rows += list(page)
+        self.assertEqual(rows, list(queryset.order_by(
+            "-search_rank", "-price", "pk"
+        )))
+
+    def test_cook_list_pages_by_username(self):
+        for i in range(6):
+            Cook.objects.create(username=f"cook{i}")
+        response = self.client.get(reverse("kitchen:cook-list"))
+        page = response.context["page_obj"]
+        response = self.client.get(reverse("kitchen:cook-list"),
+                                   data={"cursor": page.next_cursor})
+        self.assertEqual(
+            [cook.username for cook in response.context["cook_list"]],
+            ["cook5", "user"],
+        )
+
+
+class SearchBackendTest(TestCase):
+    def setUp(self):
+        dish_type = DishType.objects.create(name="Soup")
+        for name in ("Borsch", "Green borsch", "Tomato soup", "Okroshka"):
+            Dish.objects.create(name=name, price=5, dish_type=dish_type)
+
+    def _names(self, term):
+        return {dish.name for dish in search(Dish.objects.all(), "name", term)}
+
+    def test_matches_icontains(self):
+        for term in ("borsch", "BORSCH", "to", "sh", "oup", "pizza"):
+            expected = {
+                dish.name for dish in IContainsSearchBackend().search(
+                    Dish.objects.all(), "name", term
+                )
+            }
+            self.assertEqual(self._names(term), expected)
+
+    def test_index_follows_updates_and_deletes(self):
+        Dish.objects.filter(name="Okroshka").update(name="Cold borsch")
+        Dish.objects.filter(name="Green borsch").delete()
+        self.assertEqual(self._names("borsch"), {"Borsch", "Cold borsch"})
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite FTS5 backend")
+    def test_sqlite_uses_fts5(self):
+        self.assertIsInstance(get_search_backend(), SQLiteFTS5SearchBackend)
+        queryset = search(Dish.objects.all(), "name", "borsch")
+        self.assertIn("MATCH", str(queryset.query))
+
+    @override_settings(
+        KITCHEN_SEARCH_BACKEND="kitchen.search.IContainsSearchBackend"
+    )
+    def test_backend_from_settings(self):
+        self.assertIsInstance(get_search_backend(), IContainsSearchBackend)
+        queryset = search(Dish.objects.all(), "name", "borsch")
+        self.assertNotIn("MATCH", str(queryset.query))
+
+
+class CounterTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234",
+        )
+        self.client.force_login(self.user)
+
+    def test_signals_keep_counts(self):
+        dish_type = DishType.objects.create(name="Soup")
+        dish = Dish.objects.create(name="Borsch", price=5,
+                                   dish_type=dish_type)
+        Dish.objects.create(name="Kasha", price=3, dish_type=dish_type)
+        self.assertEqual(get_counts(),
+                         {"cooks": 1, "dish_types": 1, "dishes": 2})
+        dish.save()
+        dish.delete()
+        dish_type.delete()
+        self.assertEqual(get_counts(),
+                         {"cooks": 1, "dish_types": 0, "dishes": 1})
+
+    def test_index_reads_counts_in_one_query(self):
+        DishType.objects.create(name="Soup")
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("kitchen:index"))
+        self.assertEqual(response.context["num_dish_types"], 1)
+        self.assertEqual(response.context["num_cooks"], 1)
+
+    def test_missing_counter_is_rebuilt(self):
+        Counter.objects.filter(name="cooks").delete()
+        Cook.objects.create(username="cook")
+        self.assertEqual(get_counts()["cooks"], 2)
+
+    def test_reconcile_command_fixes_drift(self):
+        DishType.objects.bulk_create([DishType(name="Soup"),
+                                      DishType(name="Salad")])
+        with self.assertRaises(CommandError):
+            call_command("reconcile_counters", "--check", stdout=StringIO())
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("dish_types: stored 0, actual 2", out.getvalue())
+        self.assertEqual(get_counts()["dish_types"], 2)
+
+
+class DishDetailViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.client.force_login(self.user)
+        self.dish_type = DishType.objects.create(name="Soup")
+        self.dish = Dish.objects.create(name="Borsch", price=5,
+                                        dish_type=self.dish_type)
+
+    def _get(self):
+        return self.client.get(
+            reverse("kitchen:dish-detail", args=[self.dish.pk])
+        )
+
+    def test_assignment_flag(self):
+        self.assertContains(self._get(), "Assign me to this dish")
+        self.dish.cooks.add(self.user)
+        self.assertContains(self._get(), "Delete me from this dish")
+
+    def test_query_count_does_not_grow_with_assignments(self):
+        self.dish.cooks.add(self.user)
+        with self.assertNumQueries(5):
+            self._get()
+        for i in range(20):
+            dish = Dish.objects.create(name=f"Dish {i}", price=1,
+                                       dish_type=self.dish_type)
+            dish.cooks.add(self.user)
+            self.dish.cooks.add(
+                Cook.objects.create(username=f"cook{i:02}")
+            )
+        with self.assertNumQueries(5):
+            response = self._get()
+        self.assertEqual(response.context["dish"].dish_type.name, "Soup")
+
+    def test_roster_is_paginated(self):
+        DishDetailView.cooks_paginate_by = 3
+        self.addCleanup(setattr, DishDetailView, "cooks_paginate_by", 50)
+        self.dish.cooks.add(
+            *[Cook.objects.create(username=f"cook{i}") for i in range(4)]
+        )
+        response = self._get()
+        self.assertEqual(
+            [cook.username for cook in response.context["cooks"]],
+            ["cook0", "cook1", "cook2"],
+        )
+        response = self.client.get(
+            reverse("kitchen:dish-detail", args=[self.dish.pk]),
+            data={"cursor": response.context["page_obj"].next_cursor},
+        )
+        self.assertEqual(
+            [cook.username for cook in response.context["cooks"]],
+            ["cook3"],
+        )
+
+
+class QueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.client.force_login(self.user)
+        self.dish_type = DishType.objects.create(name="Soup")
+        self.cook = Cook.objects.create(username="cook")
+        self.dish = Dish.objects.create(name="Borsch", price=5,
+                                        dish_type=self.dish_type)
+        self.dish.cooks.add(self.user, self.cook)
+        self.sequence = itertools.count()
+
+    def _grow(self, rows=6):
+        def grow():
+            for _ in range(rows):
+                i = next(self.sequence)
+                cook = Cook.objects.create(username=f"grow{i}")
+                dish_type = DishType.objects.create(name=f"Type {i}")
+                dish = Dish.objects.create(name=f"Dish {i}", price=i + 1,
+                                           dish_type=dish_type)
+                dish.cooks.add(cook, self.user)
+                self.dish.cooks.add(cook)
+        return grow
+
+    def test_every_url_has_a_budget(self):
+        from kitchen.urls import app_name, urlpatterns
+
+        self.assertEqual(
+            {f"{app_name}:{pattern.name}" for pattern in urlpatterns},
+            set(QUERY_BUDGETS),
+        )
+
+    def test_list_views(self):
+        for url_name in ("kitchen:index",
+                         "kitchen:dish-type-list",
+                         "kitchen:dish-list",
+                         "kitchen:cook-list"):
+            with self.subTest(url_name=url_name):
+                self.assertQueryCountStable(url_name, self._grow())
+
+    def test_search(self):
+        self.assertQueryCountStable("kitchen:dish-list", self._grow(),
+                                    data={"name": "dish"})
+
+    def test_detail_views(self):
+        self.assertQueryCountStable("kitchen:dish-detail", self._grow(),
+                                    args=[self.dish.pk])
+        self.assertQueryCountStable("kitchen:cook-detail", self._grow(),
+                                    args=[self.user.pk])
+
+    def test_form_views(self):
+        for url_name, args in (
+            ("kitchen:dish-type-create", None),
+            ("kitchen:dish-type-update", [self.dish_type.pk]),
+            ("kitchen:dish-type-delete", [self.dish_type.pk]),
+            ("kitchen:dish-create", None),
+            ("kitchen:dish-update", [self.dish.pk]),
+            ("kitchen:dish-delete", [self.dish.pk]),
+            ("kitchen:cook-create", None),
+            ("kitchen:cook-update", [self.cook.pk]),
+            ("kitchen:cook-delete", [self.cook.pk]),
+        ):
+            with self.subTest(url_name=url_name):
+                self.assertQueryCountStable(url_name, self._grow(),
+                                            args=args)
+
+    def test_create_and_update_posts(self):
+        self.assertWithinQueryBudget(
+            "kitchen:dish-type-create", "post", data={"name": "Salad"}
+        )
+        self.assertWithinQueryBudget(
+            "kitchen:dish-type-update", "post",
+            args=[self.dish_type.pk], data={"name": "Soups"},
+        )
+        dish_data = {
+            "name": "Kasha",
+            "description": "Buckwheat",
+            "price": 3,
+            "dish_type": self.dish_type.pk,
+            "cooks": [self.user.pk, self.cook.pk],
+        }
+        self.assertWithinQueryBudget("kitchen:dish-create", "post",
+                                     data=dish_data)
+        self.assertWithinQueryBudget("kitchen:dish-update", "post",
+                                     args=[self.dish.pk], data=dish_data)
+        self.assertWithinQueryBudget("kitchen:cook-create", "post", data={
+            "username": "newcook",
+            "password1": "SuperpassWord123",
+            "password2": "SuperpassWord123",
+            "years_of_experience": 2,
+        })
+        self.assertWithinQueryBudget("kitchen:cook-update", "post",
+                                     args=[self.cook.pk], data={
+                                         "username": "cook",
+                                         "years_of_experience": 3,
+                                     })
+
+    def test_bulk_assignment(self):
+        self.assertQueryCountStable("kitchen:dish-bulk-assign",
+                                    self._grow())
+        for action in ("assign", "unassign"):
+            self.assertWithinQueryBudget(
+                "kitchen:dish-bulk-assign", "post", data={
+                    "dishes": list(Dish.objects.values_list("pk", flat=True)),
+                    "cooks": list(Cook.objects.values_list("pk", flat=True)),
+                    "action": action,
+                },
+            )
+
+    def test_exports(self):
+        for url_name in ("kitchen:dish-export", "kitchen:cook-export"):
+            with self.subTest(url_name=url_name):
+                self.assertQueryCountStable(url_name, self._grow())
+
+    def test_toggle_and_delete_posts(self):
+        for _ in range(2):
+            self.assertWithinQueryBudget("kitchen:toggle-dish-assign",
+                                         "post", args=[self.dish.pk])
+        self.assertWithinQueryBudget("kitchen:dish-delete", "post",
+                                     args=[self.dish.pk])
+        self.assertWithinQueryBudget("kitchen:dish-type-delete", "post",
+                                     args=[self.dish_type.pk])
+        self.assertWithinQueryBudget("kitchen:cook-delete", "post",
+                                     args=[self.cook.pk])
+
+    @override_settings(KITCHEN_QUERY_BUDGETS="warn")
+    def test_middleware_reports_count(self):
+        with self.modify_settings(MIDDLEWARE={
+            "prepend": "kitchen.querybudget.QueryBudgetMiddleware",
+        }):
+            response = self.client.get(reverse("kitchen:index"))
+        self.assertEqual(response["X-Query-Count"], "3")
+
+    @override_settings(KITCHEN_QUERY_BUDGETS="strict")
+    def test_middleware_strict_mode(self):
+        budgets = {**QUERY_BUDGETS, "kitchen:index": {"GET": 1}}
+        with mock.patch.dict(QUERY_BUDGETS, budgets), \
+                self.modify_settings(MIDDLEWARE={
+                    "prepend": "kitchen.querybudget.QueryBudgetMiddleware",
+                }), self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse("kitchen:index"))
+
+
+class BulkAssignmentTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.client.force_login(self.user)
+        dish_type = DishType.objects.create(name="Soup")
+        self.dishes = [
+            Dish.objects.create(name=f"Dish {i}", price=1,
+                                dish_type=dish_type)
+            for i in range(3)
+        ]
+        self.cooks = [Cook.objects.create(username=f"cook{i}")
+                      for i in range(2)]
+        self.dishes[0].cooks.add(self.cooks[0])
+
+    def _pairs(self):
+        return set(Dish.cooks.through.objects.values_list("dish_id",
+                                                           "cook_id"))
+
+    def test_assign_skips_existing_pairs(self):
+        dish_ids = [dish.pk for dish in self.dishes]
+        cook_ids = [cook.pk for cook in self.cooks]
+        # Savepoint, INSERT, touching dishes, counting cooks, locking,
+        # reading and writing the dish cards, the dishes for m2m_changed,
+        # release.
+        with self.assertNumQueries(9):
+            created = assignments.assign(dish_ids, cook_ids)
+        self.assertEqual(len(created), 5)
+        self.assertEqual(self._pairs(), {
+            (dish_id, cook_id) for dish_id in dish_ids for cook_id in cook_ids
+        })
+        self.assertEqual(assignments.assign(dish_ids, cook_ids), [])
+
+    def test_unassign(self):
+        removed = assignments.unassign(
+            [self.dishes[0].pk, self.dishes[1].pk],
+            [cook.pk for cook in self.cooks],
+        )
+        self.assertEqual(removed, [(self.dishes[0].pk, self.cooks[0].pk)])
+        self.assertEqual(self._pairs(), set())
+
+    def test_sends_m2m_changed(self):
+        received = []
+
+        def receiver(sender, instance, action, pk_set, **kwargs):
+            received.append((instance, action, pk_set))
+
+        m2m_changed.connect(receiver, sender=Dish.cooks.through)
+        self.addCleanup(m2m_changed.disconnect, receiver,
+                        sender=Dish.cooks.through)
+        assignments.assign([self.dishes[1].pk], [self.cooks[1].pk])
+        self.assertEqual(received, [
+            (self.dishes[1], "post_add", {self.cooks[1].pk}),
+        ])
+
+    def test_view_reports_changed_rows(self):
+        url = reverse("kitchen:dish-bulk-assign")
+        response = self.client.post(url, {
+            "dishes": [dish.pk for dish in self.dishes],
+            "cooks": [self.cooks[0].pk],
+            "action": "assign",
+        })
+        # Redirected after the POST, so that a refresh does not resend it.
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertContains(self.client.get(url), "2 assignments changed.")
+        response = self.client.post(url, {
+            "dishes": str(self.dishes[0].pk),
+            "cooks": str(self.cooks[0].pk),
+            "action": "unassign",
+        }, follow=True)
+        self.assertContains(response, "1 assignment changed.")
+        self.assertEqual(len(self._pairs()), 2)
+
+    def test_form_reads_only_the_submitted_ids(self):
+        form = BulkAssignmentForm({
+            "dishes": f"{self.dishes[1].pk}, {self.dishes[2].pk} "
+                      f"{self.dishes[1].pk}",
+            "cooks": str(self.cooks[1].pk),
+            "action": "assign",
+        })
+        # One query per id list, none building choices.
+        with self.assertNumQueries(2):
+            self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["dishes"],
+                         [self.dishes[1].pk, self.dishes[2].pk])
+        self.assertNotIn(str(self.dishes[0].pk), str(form["dishes"]))
+
+    def test_form_selects_dishes_by_name(self):
+        Dish.objects.create(name="Borsch", price=2)
+        form = BulkAssignmentForm({
+            "dishes": str(self.dishes[0].pk),
+            "dish_search": "Dish 1",
+            "cooks": str(self.cooks[1].pk),
+            "action": "assign",
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["dishes"],
+                         [self.dishes[0].pk, self.dishes[1].pk])
+
+    def test_form_errors(self):
+        missing = self.dishes[-1].pk + 100
+        for data, field, message in (
+            ({"dishes": f"{missing}"}, "dishes", f"Unknown ids: {missing}."),
+            ({"dishes": "1; 2"}, "dishes", "Enter ids separated by commas"),
+            ({}, "__all__", "Select dishes by id or by name."),
+        ):
+            with self.subTest(data=data):
+                form = BulkAssignmentForm({
+                    "cooks": str(self.cooks[0].pk), "action": "assign",
+                    **data,
+                })
+                self.assertFalse(form.is_valid())
+                self.assertIn(message, " ".join(form.errors[field]))
+        with mock.patch.object(BulkAssignmentForm, "MAX_DISHES", 2):
+            form = BulkAssignmentForm({
+                "dish_search": "Dish", "cooks": str(self.cooks[0].pk),
+                "action": "assign",
+            })
+            self.assertFalse(form.is_valid())
+            self.assertIn("dish_search", form.errors)
+
+
+class ImportKitchenCommandTest(TestCase):
+    def _import(self, model, suffix, content, *args):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, "w", encoding="utf-8") as file:
+            file.write(content)
+        out, err = StringIO(), StringIO()
+        call_command("import_kitchen", model, path, "--batch-size", "2",
+                     *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_cooks_jsonl(self):
+        Cook.objects.create(username="alice", years_of_experience=1)
+        out, err = self._import("cooks", ".jsonl", "\n".join([
+            '{"username": "alice", "years_of_experience": 7}',
+            '{"username": "bob", "first_name": "Bob"}',
+            '{"username": "carol", "years_of_experience": 41}',
+            "not json",
+        ]))
+        self.assertIn("Imported 2 cooks", out)
+        self.assertIn("line 3: years_of_experience", err)
+        self.assertIn("line 4: invalid JSON", err)
+        self.assertEqual(Cook.objects.get(username="alice")
+                         .years_of_experience, 7)
+        bob = Cook.objects.get(username="bob")
+        self.assertFalse(bob.has_usable_password())
+        self.assertEqual(get_counts()["cooks"], 2)
+
+    def test_import_dishes_csv(self):
+        soup = DishType.objects.create(name="Soup")
+        existing = Dish.objects.create(name="Old", price=1, dish_type=soup)
+        for username in ("alice", "bob"):
+            Cook.objects.create(username=username)
+        out, err = self._import("dishes", ".csv", "\n".join([
+            "id,name,description,price,dish_type,cooks",
+            f"{existing.pk},Borsch,Beet soup,7.50,Soup,alice;bob",
+            ",Varenyky,Dumplings,5,Dumplings,bob",
+            ",Free,Nothing,0,Soup,",
+            ",Mystery,Unknown,3,Soup,nobody",
+        ]))
+        self.assertIn("Imported 2 dishes", out)
+        self.assertIn("line 4: price: Price must be greater than 0", err)
+        self.assertIn("line 5: unknown cooks: nobody", err)
+        existing.refresh_from_db()
+        self.assertEqual(existing.name, "Borsch")
+        self.assertEqual(
+            set(existing.cooks.values_list("username", flat=True)),
+            {"alice", "bob"},
+        )
+        varenyky = Dish.objects.get(name="Varenyky")
+        self.assertEqual(varenyky.dish_type.name, "Dumplings")
+        self.assertEqual(get_counts()["dishes"], 2)
+
+    def test_import_dish_types_skips_existing_names(self):
+        DishType.objects.create(name="Soup")
+        out, _ = self._import("dish_types", ".csv",
+                              "name\nSoup\nSalad\nSalad\nBread\n")
+        self.assertEqual(
+            sorted(DishType.objects.values_list("name", flat=True)),
+            ["Bread", "Salad", "Soup"],
+        )
+        self.assertIn("4 rows read, 0 rejected", out)
+
+    def test_sequence_reset_after_each_batch_with_ids(self):
+        with mock.patch.object(import_kitchen, "reset_sequence",
+                               wraps=import_kitchen.reset_sequence) as reset:
+            self._import("dish_types", ".jsonl", "\n".join([
+                '{"id": 50, "name": "Soup"}',
+                '{"name": "Salad"}',
+                '{"name": "Bread"}',
+                '{"id": 60, "name": "Pie"}',
+                '{"name": "Stew"}',
+            ]))
+        # Batches of two: the first two hold explicit ids.
+        self.assertEqual(reset.call_args_list,
+                         [mock.call(DishType), mock.call(DishType)])
+        self.assertEqual(DishType.objects.get(name="Soup").pk, 50)
+        self.assertGreater(DishType.objects.get(name="Salad").pk, 50)
+        self.assertGreater(DishType.objects.get(name="Stew").pk, 60)
+
+    def test_import_refreshes_only_its_rows(self):
+        soup = DishType.objects.create(name="Soup")
+        alice = Cook.objects.create(username="alice")
+        bob = Cook.objects.create(username="bob")
+        moved = Dish.objects.create(name="Borsch", price=5,
+                                    description="Red", dish_type=soup)
+        moved.cooks.add(alice)
+        kept = Dish.objects.create(name="Shchi", price=4,
+                                   description="Green", dish_type=soup)
+        with mock.patch.object(cards, "find_card_drift") as drift:
+            self._import("dish_types", ".jsonl",
+                         f'{{"id": {soup.pk}, "name": "Soups"}}')
+            with mock.patch.object(cards, "refresh_cards",
+                                   wraps=cards.refresh_cards) as refresh:
+                self._import("dishes", ".csv", "\n".join([
+                    "id,name,description,price,dish_type,cooks",
+                    f"{moved.pk},Borsch,Red,5,Salad,bob",
+                ]))
+        drift.assert_not_called()
+        self.assertEqual([list(call.args[0]) for call in
+                          refresh.call_args_list], [[moved.pk]])
+        self.assertEqual(DishCard.objects.get(pk=kept.pk).dish_type_name,
+                         "Soups")
+        card = DishCard.objects.get(pk=moved.pk)
+        self.assertEqual((card.dish_type_name, card.cook_names),
+                         ("Salad", ["bob"]))
+        self.assertEqual(
+            [obj.dish_count for obj in (
+                DishType.objects.get(pk=soup.pk),
+                DishType.objects.get(name="Salad"),
+                Cook.objects.get(pk=alice.pk),
+                Cook.objects.get(pk=bob.pk),
+            )],
+            [1, 1, 0, 1],
+        )
+        self.assertEqual(cards.find_card_drift(), [])
+
+    def test_export_round_trip_keeps_assignments(self):
+        user = Cook.objects.create_user(username="user", password="x")
+        soup = DishType.objects.create(name="Soup")
+        for i in range(3):
+            dish = Dish.objects.create(name=f"Dish {i}", price=i + 1,
+                                       description="Hot", dish_type=soup)
+            dish.cooks.add(user)
+        self.client.force_login(user)
+        response = self.client.get(reverse("kitchen:dish-export"))
+        content = b"".join(response.streaming_content).decode()
+        out, _ = self._import("dishes", ".csv", content)
+        self.assertIn("Imported 3 dishes", out)
+        self.assertEqual(Dish.cooks.through.objects.count(), 3)
+        self.assertEqual(Cook.objects.get(pk=user.pk).dish_count, 3)
+
+
+class ExportViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.client.force_login(self.user)
+        soup = DishType.objects.create(name="Soup")
+        Dish.objects.create(name="Borsch", description="Beet, soup",
+                            price=7.5, dish_type=soup)
+        Dish.objects.create(name="Green borsch", description="Sorrel",
+                            price=6, dish_type=soup)
+        Dish.objects.create(name="Kasha", description="Buckwheat", price=3,
+                            dish_type=None)
+
+    def _content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_dish_csv_respects_search(self):
+        response = self.client.get(reverse("kitchen:dish-export"),
+                                   data={"name": "borsch"})
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="dishes.csv"',
+                      response["Content-Disposition"])
+        lines = self._content(response).splitlines()
+        self.assertEqual(lines[0], "id,name,description,price,dish_type")
+        self.assertEqual(
+            [line.split(",")[1] for line in lines[1:]],
+            ["Borsch", "Green borsch"],
+        )
+        self.assertIn('"Beet, soup",7.50,Soup', lines[1])
+
+    def test_dish_csv_respects_facets(self):
+        soup = DishType.objects.get(name="Soup")
+        response = self.client.get(reverse("kitchen:dish-export"), data={
+            "name": "borsch", "type": soup.pk, "price": "5-10",
+            "cursor": "abc", "format": "csv",
+        })
+        lines = self._content(response).splitlines()
+        self.assertEqual([line.split(",")[1] for line in lines[1:]],
+                         ["Borsch", "Green borsch"])
+        response = self.client.get(reverse("kitchen:dish-export"),
+                                   data={"type": soup.pk,
+                                         "price": "under-5"})
+        self.assertEqual(self._content(response).splitlines()[1:], [])
+
+    def test_dish_jsonl(self):
+        response = self.client.get(reverse("kitchen:dish-export"),
+                                   data={"format": "jsonl"})
+        rows = [json.loads(line)
+                for line in self._content(response).splitlines()]
+        self.assertEqual(rows[-1], {
+            "id": Dish.objects.get(name="Kasha").pk,
+            "name": "Kasha",
+            "description": "Buckwheat",
+            "price": "3.00",
+            "dish_type": None,
+        })
+        self.assertEqual(len(rows), 3)
+
+    def test_cook_csv(self):
+        Cook.objects.create(username="alice", years_of_experience=4)
+        response = self.client.get(reverse("kitchen:cook-export"),
+                                   data={"username": "ali"})
+        lines = self._content(response).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith(",alice,,,,4"))
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse("kitchen:dish-export"),
+                                   data={"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    CACHES={
+        **settings.CACHES,
+        "fragments": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "fragment-tests",
+        },
+    },
+    KITCHEN_FRAGMENT_CACHE="fragments",
+)
+class FragmentCacheTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.client.force_login(self.user)
+        self.dish_type = DishType.objects.create(name="Soup")
+        self.dish = Dish.objects.create(name="Borsch", price=5,
+                                        dish_type=self.dish_type)
+        fragments.reset_stats()
+
+    def test_rows_are_served_from_cache(self):
+        url = reverse("kitchen:dish-list")
+        link = reverse("kitchen:dish-detail", args=[self.dish.pk])
+        self.assertContains(self.client.get(url), link)
+        self.assertContains(self.client.get(url), link)
+        self.assertEqual(fragments.get_stats()["dish-row"],
+                         {"hits": 1, "misses": 1})
+        staff = Cook.objects.create_user(username="staff", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse("kitchen:cache-stats"))
+        self.assertEqual(response.json()["fragments"]["dish-row"],
+                         {"hits": 1, "misses": 1})
+
+    def test_model_change_invalidates_rows(self):
+        url = reverse("kitchen:dish-list")
+        self.client.get(url)
+        self.dish.name = "Green borsch"
+        self.dish.save()
+        self.assertContains(self.client.get(url), "Green borsch")
+        self.assertEqual(fragments.get_stats()["dish-row"]["misses"], 2)
+
+    @override_settings(KITCHEN_FRAGMENT_CACHE="shared")
+    def test_versions_are_shared_between_workers(self):
+        versions = fragments.get_versions(["dish"])
+        fragments.bump_version("dish")
+        # A connection of its own, as another worker process would open.
+        other = caches.create_connection(settings.KITCHEN_FRAGMENT_CACHE)
+        self.assertNotIsInstance(other, LocMemCache)
+        self.assertGreater(other.get(fragments.VERSION_KEY % "dish"),
+                           versions["dish"])
+
+    def test_dish_type_change_invalidates_dish_detail(self):
+        url = reverse("kitchen:dish-detail", args=[self.dish.pk])
+        self.assertContains(self.client.get(url), "Dish type: Soup")
+        self.dish_type.name = "Soups"
+        self.dish_type.save()
+        self.assertContains(self.client.get(url), "Dish type: Soups")
+
+    def test_cook_detail_hit_skips_dish_query(self):
+        url = reverse("kitchen:cook-detail", args=[self.user.pk])
+        self.assertContains(self.client.get(url), "No dishes!")
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        self.dish.cooks.add(self.user)
+        self.assertContains(self.client.get(url), "Borsch")
+
+    def test_cook_rows_vary_on_own_row(self):
+        other = Cook.objects.create(username="other")
+        Cook.objects.create(username="third")
+        # Before any row is cached: logging in saves the cook.
+        other_client = Client()
+        other_client.force_login(other)
+        url = reverse("kitchen:cook-list")
+        self.assertContains(self.client.get(url), "(Me)", count=1)
+        response = other_client.get(url)
+        self.assertContains(response, "(Me)", count=1)
+        self.assertContains(response, "other  (Me)")
+        # Only the two viewers' own rows differ; the third is shared.
+        self.assertEqual(fragments.get_stats()["cook-row"],
+                         {"hits": 1, "misses": 5})
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.client.force_login(self.user)
+        self.dish_type = DishType.objects.create(name="Soup")
+        self.dish = Dish.objects.create(name="Borsch", price=5,
+                                        dish_type=self.dish_type)
+
+    def _etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_not_modified_skips_rendering(self):
+        # Session and user; details add their validator query, lists read
+        # versions from the cache alone.
+        for url, queries in (
+            (reverse("kitchen:dish-list"), 2),
+            (reverse("kitchen:dish-type-list"), 2),
+            (reverse("kitchen:cook-list"), 2),
+            (reverse("kitchen:dish-detail", args=[self.dish.pk]), 3),
+            (reverse("kitchen:cook-detail", args=[self.user.pk]), 3),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn("private", response["Cache-Control"])
+                with self.assertNumQueries(queries):
+                    response = self.client.get(
+                        url, headers={"if-none-match": response["ETag"]}
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+                self.assertEqual(response.content, b"")
+
+    def test_if_modified_since_on_detail(self):
+        url = reverse("kitchen:dish-detail", args=[self.dish.pk])
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(
+            url, headers={"if-modified-since": last_modified}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_etag_follows_rows(self):
+        url = reverse("kitchen:dish-list")
+        etag = self._etag(url)
+        other = Dish.objects.create(name="Salad", price=3)
+        self.assertNotEqual(self._etag(url), etag)
+        etag = self._etag(url)
+        other.delete()
+        self.assertNotEqual(self._etag(url), etag)
+
+    def test_list_etag_follows_search(self):
+        url = reverse("kitchen:dish-list")
+        etag = self._etag(url)
+        response = self.client.get(url, data={"name": "Salad"},
+                                   headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_varies_on_user(self):
+        url = reverse("kitchen:cook-list")
+        etag = self._etag(url)
+        self.client.force_login(Cook.objects.create(username="other"))
+        self.assertNotEqual(self._etag(url), etag)
+
+    def test_etag_varies_on_csrf_secret(self):
+        # A cached page would post a token for a secret that is gone.
+        for url in (reverse("kitchen:dish-list"),
+                    reverse("kitchen:dish-detail", args=[self.dish.pk])):
+            with self.subTest(url=url):
+                etag = self._etag(url)
+                self.assertEqual(self._etag(url), etag)
+                self.client.cookies.pop(settings.CSRF_COOKIE_NAME)
+                self.assertNotEqual(self._etag(url), etag)
+
+    def test_etag_varies_on_build(self):
+        url = reverse("kitchen:dish-detail", args=[self.dish.pk])
+        etag = self._etag(url)
+        with mock.patch("kitchen.conditional.build_version",
+                        return_value="next"):
+            response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_build_version(self):
+        conditional.build_version.cache_clear()
+        self.addCleanup(conditional.build_version.cache_clear)
+        version = conditional.build_version()
+        self.assertEqual(conditional.build_version(), version)
+        conditional.build_version.cache_clear()
+        with override_settings(KITCHEN_BUILD_VERSION="abc123"):
+            self.assertEqual(conditional.build_version(), "abc123")
+
+    def test_list_validators_read_no_rows(self):
+        url = reverse("kitchen:dish-type-list")
+        etag = self._etag(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.dish_type.dish_count = 7
+        self.dish_type.save()
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_assignment_touches_both_sides(self):
+        dish_url = reverse("kitchen:dish-detail", args=[self.dish.pk])
+        cook_url = reverse("kitchen:cook-detail", args=[self.user.pk])
+        dish_etag, cook_etag = self._etag(dish_url), self._etag(cook_url)
+        self.client.post(
+            reverse("kitchen:toggle-dish-assign", args=[self.dish.pk])
+        )
+        self.assertNotEqual(self._etag(dish_url), dish_etag)
+        self.assertNotEqual(self._etag(cook_url), cook_etag)
+        cook_etag = self._etag(cook_url)
+        self.dish.cooks.clear()
+        self.assertNotEqual(self._etag(cook_url), cook_etag)
+
+    def test_bulk_assignment_touches_both_sides(self):
+        cook_url = reverse("kitchen:cook-detail", args=[self.user.pk])
+        cook_etag = self._etag(cook_url)
+        assignments.assign([self.dish.pk], [self.user.pk])
+        self.assertNotEqual(self._etag(cook_url), cook_etag)
+
+    def test_related_changes_invalidate_detail(self):
+        cook = Cook.objects.create(username="cook")
+        self.dish.cooks.add(cook)
+        url = reverse("kitchen:dish-detail", args=[self.dish.pk])
+        etag = self._etag(url)
+        cook.first_name = "Ann"
+        cook.save()
+        self.assertNotEqual(self._etag(url), etag)
+        etag = self._etag(url)
+        cook.delete()
+        self.assertNotEqual(self._etag(url), etag)
+        etag = self._etag(url)
+        self.dish_type.delete()
+        self.assertNotEqual(self._etag(url), etag)
+
+    def test_missing_object_is_still_404(self):
+        response = self.client.get(reverse("kitchen:dish-detail",
+                                           args=[self.dish.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(KITCHEN_DATABASE_REPLICAS=["replica1", "replica2"],
+                   KITCHEN_PRIMARY_STICKY_SECONDS=5)
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def _outside_transaction(self):
+        # TestCase wraps every test in a transaction on the primary.
+        return mock.patch.object(connections["default"], "in_atomic_block",
+                                 False)
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Dish), "default")
+
+    def test_reads_go_to_replicas(self):
+        with self._outside_transaction():
+            self.assertIn(self.router.db_for_read(Dish),
+                          ["replica1", "replica2"])
+
+    def test_reads_stay_on_primary_when_pinned_or_in_transaction(self):
+        self.assertEqual(self.router.db_for_read(Dish), "default")
+        with self._outside_transaction(), pin_to_primary():
+            self.assertEqual(self.router.db_for_read(Dish), "default")
+
+    @override_settings(KITCHEN_DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        with self._outside_transaction():
+            self.assertEqual(self.router.db_for_read(Dish), "default")
+
+    def _middleware_call(self, request):
+        seen = []
+
+        def get_response(request):
+            seen.append(is_pinned())
+            return HttpResponse()
+
+        response = ReplicaStickinessMiddleware(get_response)(request)
+        return seen[0], response
+
+    def test_write_pins_client_for_the_window(self):
+        factory = RequestFactory()
+        pinned, response = self._middleware_call(factory.post("/"))
+        self.assertTrue(pinned)
+        cookie = response.cookies[ReplicaStickinessMiddleware.cookie_name]
+        self.assertEqual(cookie["max-age"], 5)
+
+        request = factory.get("/")
+        request.COOKIES[cookie.key] = cookie.value
+        self.assertTrue(self._middleware_call(request)[0])
+        with mock.patch("kitchen.routers.time.time",
+                        return_value=float(cookie.value) + 1):
+            self.assertFalse(self._middleware_call(request)[0])
+        self.assertFalse(is_pinned())
+
+    def test_read_without_cookie_is_not_pinned(self):
+        pinned, response = self._middleware_call(RequestFactory().get("/"))
+        self.assertFalse(pinned)
+        self.assertNotIn(ReplicaStickinessMiddleware.cookie_name,
+                         response.cookies)
+
+
+@skipUnless(settings.KITCHEN_DATABASE_REPLICAS,
+            "Needs a replica alias in DATABASES (POSTGRES_REPLICA_HOSTS).")
+class ReplicaRoutingIntegrationTest(TransactionTestCase):
+    """Run with a second database configured, e.g. two SQLite files."""
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.client.force_login(self.user)
+
+    def _aliases(self, method, url, data=None):
+        counters = {alias: QueryCounter() for alias in connections}
+        with ExitStack() as stack:
+            for alias, counter in counters.items():
+                stack.enter_context(
+                    connections[alias].execute_wrapper(counter)
+                )
+            getattr(self.client, method)(url, data=data)
+        return {alias for alias, counter in counters.items()
+                if counter.count}
+
+    def test_reads_use_replica_until_a_write(self):
+        url = reverse("kitchen:dish-type-list")
+        aliases = self._aliases("get", url)
+        self.assertTrue(aliases)
+        self.assertLessEqual(aliases, set(settings.KITCHEN_DATABASE_REPLICAS))
+        self.assertEqual(
+            self._aliases("post", reverse("kitchen:dish-type-create"),
+                          {"name": "Soup"}),
+            {"default"},
+        )
+        self.assertEqual(self._aliases("get", url), {"default"})
+
+
+class DatabasePoolTest(QueryBudgetTestMixin, TestCase):
+    def test_pool_has_a_connection_per_thread(self):
+        self.assertEqual(pool_options(2, 4),
+                         {"min_size": 2, "max_size": 4, "timeout": 10.0})
+
+    def test_pool_is_capped_by_max_connections(self):
+        self.assertEqual(pool_options(4, 8, max_connections=20)["max_size"],
+                         5)
+        self.assertEqual(pool_options(8, 8, max_connections=4)["max_size"],
+                         1)
+
+    def test_stats_are_renamed(self):
+        pool = mock.Mock()
+        pool.get_stats.return_value = {"requests_num": 7,
+                                       "requests_queued": 2,
+                                       "requests_errors": 1}
+        with mock.patch.object(connections["default"], "pool", pool,
+                               create=True):
+            stats = get_pool_stats()["default"]
+        self.assertEqual(
+            (stats["checkouts"], stats["waits"], stats["timeouts"]),
+            (7, 2, 1),
+        )
+
+    def test_stats_view_is_for_staff(self):
+        user = get_user_model().objects.create_user(username="user",
+                                                    password="test1234")
+        self.client.force_login(user)
+        url = reverse("kitchen:db-pool-stats")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        user.is_staff = True
+        user.save()
+        response, _ = self.assertWithinQueryBudget("kitchen:db-pool-stats")
+        self.assertEqual(response.json()["pools"], {})
+
+
+@override_settings(ROOT_URLCONF="Kitchen_Service.asgi_urls")
+class AsyncViewTest(TestCase):
+    client_class = AsyncClient
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.dish_type = DishType.objects.create(name="Soup")
+        self.dish = Dish.objects.create(name="Borsch", price=5,
+                                        dish_type=self.dish_type)
+        self.dish.cooks.add(self.user)
+
+    def test_read_views_are_async(self):
+        for url in (
+            reverse("kitchen:index"),
+            reverse("kitchen:dish-list"),
+            reverse("kitchen:dish-detail", args=[self.dish.pk]),
+            reverse("kitchen:cook-list"),
+            reverse("kitchen:cook-detail", args=[self.user.pk]),
+        ):
+            with self.subTest(url=url):
+                self.assertTrue(
+                    asyncio.iscoroutinefunction(resolve(url).func)
+                )
+        self.assertFalse(asyncio.iscoroutinefunction(
+            resolve(reverse("kitchen:dish-create")).func
+        ))
+
+    async def test_login_required(self):
+        for url in (reverse("kitchen:index"), reverse("kitchen:dish-list")):
+            response = await self.client.get(url)
+            self.assertRedirects(response, f"/accounts/login/?next={url}",
+                                 fetch_redirect_response=False)
+
+    async def test_index(self):
+        await self.client.aforce_login(self.user)
+        response = await self.client.get(reverse("kitchen:index"))
+        self.assertEqual(response.context["num_dishes"], 1)
+        self.assertEqual(response.context["num_cooks"], 1)
+
+    async def test_list_pagination_and_search(self):
+        await self.client.aforce_login(self.user)
+        dishes = await Dish.objects.abulk_create(
+            Dish(name=f"Soup {i}", price=i, description="")
+            for i in range(6)
+        )
+        # bulk_create() sends no signals.
+        await sync_to_async(cards.refresh_cards)(dish.pk for dish in dishes)
+        url = reverse("kitchen:dish-list")
+        response = await self.client.get(url)
+        page = response.context["page_obj"]
+        self.assertEqual(len(response.context["dish_list"]), 5)
+        response = await self.client.get(url,
+                                         {"cursor": page.next_cursor})
+        self.assertEqual(len(response.context["dish_list"]), 2)
+        self.assertTrue(response.context["page_obj"].has_previous())
+        response = await self.client.get(url, {"name": "Borsch"})
+        self.assertEqual(
+            [dish.name for dish in response.context["dish_list"]],
+            ["Borsch"],
+        )
+        response = await self.client.get(url, {"cursor": "nope"})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_detail_views(self):
+        await self.client.aforce_login(self.user)
+        response = await self.client.get(
+            reverse("kitchen:dish-detail", args=[self.dish.pk])
+        )
+        self.assertTrue(response.context["dish"].is_assigned)
+        self.assertEqual([cook.pk for cook in response.context["cooks"]],
+                         [self.user.pk])
+        response = await self.client.get(
+            reverse("kitchen:cook-detail", args=[self.user.pk])
+        )
+        self.assertContains(response, "Borsch")
+        response = await self.client.get(
+            reverse("kitchen:dish-detail", args=[self.dish.pk + 1])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(CACHES={**settings.CACHES, "fragments": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+    }}, KITCHEN_FRAGMENT_CACHE="fragments")
+    def test_same_queries_as_sync_views(self):
+        sync_client = Client()
+        sync_client.force_login(self.user)
+        self.client.force_login(self.user)
+        for url_name, args in (("kitchen:index", None),
+                               ("kitchen:dish-list", None),
+                               ("kitchen:dish-detail", [self.dish.pk]),
+                               ("kitchen:cook-list", None),
+                               ("kitchen:cook-detail", [self.user.pk])):
+            with self.subTest(url_name=url_name):
+                url = reverse(url_name, args=args)
+                with CaptureQueriesContext(connection) as async_queries:
+                    async_to_sync(self.client.get)(url)
+                with override_settings(ROOT_URLCONF="Kitchen_Service.urls"):
+                    with CaptureQueriesContext(connection) as sync_queries:
+                        sync_client.get(url)
+                self.assertEqual(len(async_queries), len(sync_queries))
+
+    async def test_not_modified(self):
+        await self.client.aforce_login(self.user)
+        url = reverse("kitchen:cook-list")
+        response = await self.client.get(url)
+        response = await self.client.get(
+            url, headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+
+
+class ApiTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user",
+            password="test1234"
+        )
+        self.client.force_login(self.user)
+        self.dish_type = DishType.objects.create(name="Soup")
+        self.dish = Dish.objects.create(name="Borsch", price="5.50",
+                                        description="Red",
+                                        dish_type=self.dish_type)
+        self.dish.cooks.add(self.user)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse("kitchen:api-dishes"))
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("error", response.json())
+
+    def test_dish_list(self):
+        response, _ = self.assertWithinQueryBudget("kitchen:api-dishes")
+        self.assertEqual(response.json(), {
+            "results": [{
+                "id": self.dish.pk,
+                "name": "Borsch",
+                "description": "Red",
+                "price": "5.50",
+                "dish_type": self.dish_type.pk,
+                "dish_type_name": "Soup",
+                "cooks": [self.user.pk],
+                "cook_names": ["user"],
+            }],
+            "next": None,
+            "previous": None,
+        })
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse("kitchen:api-dishes"),
+                                   {"fields": "name,price"})
+        self.assertEqual(response.json()["results"],
+                         [{"id": self.dish.pk, "name": "Borsch",
+                           "price": "5.50"}])
+        response = self.client.get(reverse("kitchen:api-dishes"),
+                                   {"fields": "name,secret"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_sparse_fields_skip_related_query(self):
+        # Session, user and the page: no cooks query.
+        with self.assertNumQueries(3):
+            self.client.get(reverse("kitchen:api-dishes"),
+                            {"fields": "name"})
+
+    def test_rows_are_not_instantiated(self):
+        with mock.patch.object(DishCard, "from_db") as from_db:
+            self.client.get(reverse("kitchen:api-dishes"))
+            self.client.get(reverse("kitchen:api-dish",
+                                    args=[self.dish.pk]))
+        from_db.assert_not_called()
+
+    def test_cursor_pagination(self):
+        dishes = Dish.objects.bulk_create(
+            Dish(name=f"Dish {i}", price=i, description="")
+            for i in range(5)
+        )
+        cards.refresh_cards(dish.pk for dish in dishes)
+        url = reverse("kitchen:api-dishes")
+        names, data = [], {"limit": 2, "fields": "name"}
+        while url:
+            response = self.client.get(url, data)
+            body = response.json()
+            names += [item["name"] for item in body["results"]]
+            url, data = body["next"], None
+        self.assertEqual(names, ["Borsch", "Dish 4", "Dish 3", "Dish 2",
+                                 "Dish 1", "Dish 0"])
+        previous = self.client.get(body["previous"]).json()
+        self.assertEqual([item["name"] for item in previous["results"]],
+                         ["Dish 3", "Dish 2"])
+
+    def test_search_and_invalid_cursor(self):
+        Cook.objects.create(username="ann")
+        response = self.client.get(reverse("kitchen:api-cooks"),
+                                   {"username": "ann"})
+        self.assertEqual([item["username"]
+                          for item in response.json()["results"]], ["ann"])
+        response = self.client.get(reverse("kitchen:api-cooks"),
+                                   {"cursor": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail(self):
+        response, _ = self.assertWithinQueryBudget(
+            "kitchen:api-dish-type", args=[self.dish_type.pk]
+        )
+        self.assertEqual(response.json(),
+                         {"id": self.dish_type.pk, "name": "Soup"})
+        self.assertWithinQueryBudget("kitchen:api-dish",
+                                     args=[self.dish.pk])
+        self.assertWithinQueryBudget("kitchen:api-cook",
+                                     args=[self.user.pk])
+        response = self.client.get(reverse("kitchen:api-cook",
+                                           args=[self.user.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_etags(self):
+        for url in (reverse("kitchen:api-dishes"),
+                    reverse("kitchen:api-dish", args=[self.dish.pk])):
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                response = self.client.get(url,
+                                           headers={"if-none-match": etag})
+                self.assertEqual(response.status_code, 304)
+                self.dish_type.name = f"Soup {etag}"
+                self.dish_type.save()
+                response = self.client.get(url,
+                                           headers={"if-none-match": etag})
+                self.assertEqual(response.status_code, 200)
+
+    def test_list_budgets(self):
+        for url_name in ("kitchen:api-dish-types", "kitchen:api-cooks",
+                         "kitchen:api-dishes"):
+            with self.subTest(url_name=url_name):
+                self.assertWithinQueryBudget(url_name)
+
+
+class WarmUpTest(TestCase):
+    def test_templates_are_compiled_once(self):
+        loader = engines["django"].engine.template_loaders[0]
+        loader.reset()
+        names = list(template_names())
+        self.assertIn("kitchen/dish_list.html", names)
+        self.assertIn("bootstrap5/field.html", names)
+        self.assertGreater(compile_templates(), len(names))
+        self.assertLessEqual(set(names), set(loader.get_template_cache))
+
+    def test_warm_up_reports_each_step(self):
+        # Closing the connection would end the test's transaction.
+        timings = warm_up(skip=("database",))
+        self.assertEqual(list(timings), ["templates", "urls", "caches"])
+        count, _ = timings["urls"]
+        self.assertGreater(count, 20)
+
+    def test_startup_profile(self):
+        out = StringIO()
+        # The profile runs outside the test database, so leave out the
+        # steps that query it.
+        call_command("startup_profile", "--skip", "database",
+                     "--skip", "caches", stdout=out)
+        output = out.getvalue()
+        self.assertRegex(output, r"kitchen\s+\d+\.\d\s+\d+\.\d")
+        self.assertIn("warm-up urls", output)
+        self.assertNotIn("warm-up database", output)
+
+
+class StaticFilesStorageTest(TestCase):
+    def test_urls_use_hashed_names_from_the_manifest(self):
+        storage = StaticFilesStorage()
+        storage.hashed_files = {}
+        name = "assets/css/material-kit.css"
+        self.assertEqual(storage.url(name), f"/static/{name}")
+        storage.hashed_files = {
+            storage.hash_key(name): "assets/css/material-kit.0123abcd.css",
+        }
+        self.assertEqual(storage.url(name),
+                         "/static/assets/css/material-kit.0123abcd.css")
+
+    def test_pages_link_assets_through_static(self):
+        response = self.client.get(reverse("login"))
+        self.assertContains(response,
+                            'href="/static/assets/css/material-kit.css"')
+        self.assertNotContains(response, "?v=")
+
+
+class ImageVariantsTest(TestCase):
+    def test_variant_widths(self):
+        self.assertEqual(variant_widths(1200), [480, 960, 1200])
+        self.assertEqual(variant_widths(4000), [480, 960, 1440, 1920])
+        self.assertEqual(variant_widths(300), [300])
+
+    def test_optimize_images_and_picture(self):
+        from PIL import Image
+
+        static_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(static_dir, "assets", "img"))
+        Image.new("RGB", (600, 300), "orange").save(
+            os.path.join(static_dir, "assets", "img", "hero.jpg")
+        )
+        manifest = os.path.join(static_dir, "assets", "img", "responsive",
+                                "variants.json")
+        template = Template(
+            '{% load kitchen_images %}'
+            '{% picture "assets/img/hero.jpg" alt="Hero" loading="lazy" %}'
+        )
+        with override_settings(KITCHEN_IMAGE_VARIANTS=manifest):
+            self.assertNotIn("<source", template.render(Context()))
+            out = StringIO()
+            call_command("optimize_images", "--static-dir", static_dir,
+                         "--workers", "1", stdout=out)
+            html = template.render(Context())
+
+        self.assertIn("assets/img/hero.jpg", out.getvalue())
+        with open(manifest) as f:
+            entry = json.load(f)["assets/img/hero.jpg"]
+        self.assertEqual(list(entry["variants"]), list(FORMATS))
+        self.assertEqual(
+            [width for width, _, _ in entry["variants"]["webp"]], [480, 600]
+        )
+        self.assertIn(
+            'srcset="/static/assets/img/responsive/hero-480.avif 480w, '
+            '/static/assets/img/responsive/hero-600.avif 600w"', html
+        )
+        self.assertIn('<img src="/static/assets/img/hero.jpg" alt="Hero" '
+                      'width="600" height="300" loading="lazy">', html)
+
+
+TIERED_CACHES = {
+    **settings.CACHES,
+    "shared": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tiered-tests",
+    },
+    "kitchen": {
+        "BACKEND": "kitchen.cache.TieredCache",
+        "LOCATION": "shared",
+        "OPTIONS": {"LOCAL_MAX_ENTRIES": 2, "LOCK_TIMEOUT": 2},
+    },
+}
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches["kitchen"]
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    def test_local_lru_in_front_of_shared(self):
+        for key in "abc":
+            self.cache.set(key, key.upper())
+        self.assertEqual(self.cache.get_stats()["local_entries"], 2)
+        self.assertEqual(self.cache.get("c"), "C")
+        self.assertEqual(self.cache.get("a"), "A")
+        self.assertIsNone(self.cache.get("missing"))
+        stats = self.cache.get_stats()
+        self.assertEqual((stats["local_hits"], stats["shared_hits"],
+                          stats["misses"]), (1, 1, 1))
+        self.assertAlmostEqual(stats["hit_ratio"], 2 / 3)
+
+    def test_tags_invalidate_both_tiers(self):
+        self.cache.set("soups", ["Borsch"], tags=["dish_type"])
+        self.cache.set("cooks", ["alice"], tags=["cook"])
+        self.cache.invalidate_tags("dish_type")
+        self.assertIsNone(self.cache.get("soups"))
+        self.assertEqual(self.cache.get("cooks"), ["alice"])
+        self.cache.delete("cooks")
+        caches["shared"].set("cooks", (["bob"], {"cook": 1}))
+        self.assertIsNone(self.cache.get("cooks"))
+        self.assertEqual(self.cache.get_stats()["stale"], 2)
+
+    def test_ttl_jitter(self):
+        ttls = {self.cache._ttl(100) for _ in range(20)}
+        self.assertTrue(all(90 <= ttl <= 100 for ttl in ttls))
+        self.assertGreater(len(ttls), 1)
+        self.assertIsNone(self.cache._ttl(None))
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.cache.get_or_set("slow", compute)
+            ))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["value"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.get_stats()["waits"], 4)
+
+    def test_waits_for_another_process_holding_the_lock(self):
+        key = self.cache.make_and_validate_key("slow")
+        caches["shared"].add(f"kitchen:lock:{key}", 1)
+        threading.Timer(
+            0.1, lambda: caches["shared"].set("slow", ("theirs", {}))
+        ).start()
+        self.assertEqual(self.cache.get_or_set("slow", lambda: "ours"),
+                         "theirs")
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class CachedLookupsTest(TransactionTestCase):
+    # Reads go to the replicas, when configured, outside transactions.
+    databases = "__all__"
+
+    def setUp(self):
+        caches["kitchen"].clear()
+        caches["kitchen"].reset_stats()
+        # Earlier TransactionTestCases flush the counter rows.
+        counters.reconcile()
+        self.dish_type = DishType.objects.create(name="Soup")
+
+    def test_dashboard_counts(self):
+        self.assertEqual(get_counts()["dish_types"], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_counts()["dish_types"], 1)
+        DishType.objects.create(name="Salad")
+        self.assertEqual(get_counts()["dish_types"], 2)
+
+    def test_dish_type_choices(self):
+        def choices():
+            return list(DishForm().fields["dish_type"].choices)[1:]
+
+        self.assertEqual(choices(), [(self.dish_type.pk, "Soup")])
+        with self.assertNumQueries(0):
+            choices()
+        self.dish_type.name = "Soups"
+        self.dish_type.save()
+        self.assertEqual(choices(), [(self.dish_type.pk, "Soups")])
+
+    def test_stats_view(self):
+        staff = Cook.objects.create_user(username="staff", is_staff=True)
+        self.client.force_login(staff)
+        get_counts()
+        get_counts()
+        response = self.client.get(reverse("kitchen:cache-stats"))
+        self.assertEqual(response.json()["cache"]["hit_ratio"], 0.5)
+
+    def test_facet_counts(self):
+        def cook_counts():
+            return DishFacets(QueryDict()).counts()["cook"]
+
+        cook = Cook.objects.create(username="cook")
+        dish = Dish.objects.create(name="Borsch", price=7,
+                                   dish_type=self.dish_type)
+        self.assertEqual(cook_counts(), {})
+        with self.assertNumQueries(0):
+            cook_counts()
+        dish.cooks.add(cook)
+        self.assertEqual(cook_counts(), {str(cook.pk): ("cook", 1)})
+
+    def test_bypassed_inside_transactions(self):
+        with transaction.atomic():
+            with self.assertNumQueries(1):
+                get_counts()
+            with self.assertNumQueries(1):
+                get_counts()
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class AuthSnapshotTest(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        caches["auth"].clear()
+        self.user = Cook.objects.create_user(username="alice",
+                                             password="test1234",
+                                             email="alice@example.com")
+        self.client.force_login(self.user)
+        self.backend = CachedModelBackend()
+
+    def cached(self):
+        return caches["auth"].get(SNAPSHOT_KEY % self.user.pk)
+
+    def test_user_from_snapshot(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.username, "alice")
+            self.assertEqual(user.get_session_auth_hash(),
+                             self.user.get_session_auth_hash())
+        self.assertIn("email", user.get_deferred_fields())
+        self.assertEqual(user.email, "alice@example.com")
+
+    def test_session_and_user_cached_between_requests(self):
+        request = RequestFactory().get("/")
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = (
+            self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        )
+        handler = SessionMiddleware(AuthenticationMiddleware(
+            lambda request: HttpResponse(request.user.get_username())
+        ))
+        self.assertEqual(handler(request).content, b"alice")
+        with self.assertNumQueries(0):
+            self.assertEqual(handler(request).content, b"alice")
+
+    def test_password_change_invalidates(self):
+        self.backend.get_user(self.user.pk)
+        self.user.set_password("changed1234")
+        self.user.save()
+        self.assertIsNone(self.cached())
+        response = self.client.get(reverse("kitchen:index"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_invalidates(self):
+        self.backend.get_user(self.user.pk)
+        self.assertIsNotNone(self.cached())
+        self.client.logout()
+        self.assertIsNone(self.cached())
+
+    def test_cook_update_view_invalidates(self):
+        self.backend.get_user(self.user.pk)
+        self.client.post(
+            reverse("kitchen:cook-update", args=[self.user.pk]),
+            {"username": "alice", "years_of_experience": 7},
+        )
+        self.assertEqual(
+            self.backend.get_user(self.user.pk).years_of_experience, 7
+        )
+
+    def test_other_cooks_saves_keep_snapshot(self):
+        self.backend.get_user(self.user.pk)
+        other = Cook.objects.create_user(username="bob", password="test1234")
+        Client().force_login(other)
+        other.first_name = "Bob"
+        other.save()
+        # A fresh cache connection, as in another worker, still finds it.
+        cache = caches.create_connection("auth")
+        self.assertIsNotNone(cache.get(SNAPSHOT_KEY % self.user.pk))
+        self.assertEqual(cache.get_stats()["stale"], 0)
+
+    def test_cook_import_invalidates(self):
+        self.backend.get_user(self.user.pk)
+        handle, path = tempfile.mkstemp(suffix=".jsonl")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, "w") as file:
+            file.write('{"username": "alice", "years_of_experience": 9}\n')
+        call_command("import_kitchen", "cooks", path, stdout=StringIO())
+        self.assertIsNone(caches.create_connection("auth").get(
+            SNAPSHOT_KEY % self.user.pk
+        ))
+
+    def test_inactive_cook(self):
+        Cook.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_auth", requests=5, stdout=out)
+        self.assertIn("cached", out.getvalue())
+        self.assertFalse(
+            Cook.objects.filter(username__startswith="benchmark-auth").exists()
+        )
+
+
+class ExplainQueriesCommandTest(TestCase):
+    def test_list_queries_use_indexes(self):
+        out = StringIO()
+        call_command("explain_queries", rows=500, stdout=out)
+        self.assertIn("dish list, next page     ok   "
+                      "kitchen_card_price_id_idx", out.getvalue())
+        self.assertNotIn("FAIL", out.getvalue())
+        self.assertFalse(Dish.objects.exists())
+        self.assertFalse(DishCard.objects.exists())
+
+
+class DishCountTest(TestCase):
+    def setUp(self):
+        self.user = Cook.objects.create_user(username="user",
+                                             password="test1234")
+        self.client.force_login(self.user)
+        self.soup = DishType.objects.create(name="Soup")
+        self.salad = DishType.objects.create(name="Salad")
+        self.dish = Dish.objects.create(name="Borsch", price=5,
+                                        dish_type=self.soup)
+        self.cook = Cook.objects.create(username="cook")
+
+    def counts(self, *objects):
+        return [type(obj).objects.get(pk=obj.pk).dish_count
+                for obj in objects]
+
+    def test_assignments(self):
+        self.dish.cooks.add(self.cook, self.user)
+        self.dish.cooks.add(self.cook)
+        self.assertEqual(self.counts(self.cook, self.user), [1, 1])
+        self.dish.cooks.remove(self.cook)
+        self.dish.cooks.remove(self.cook)
+        self.assertEqual(self.counts(self.cook, self.user), [0, 1])
+        self.user.dishes.clear()
+        self.assertEqual(self.counts(self.user), [0])
+        self.cook.dishes.add(self.dish)
+        self.dish.cooks.clear()
+        self.assertEqual(self.counts(self.cook), [0])
+
+    def test_counts_move_by_deltas(self):
+        # A recount would read the rows; a delta moves whatever is stored,
+        # which is what concurrent writers need.
+        Cook.objects.filter(pk=self.cook.pk).update(dish_count=10)
+        DishType.objects.filter(pk=self.salad.pk).update(dish_count=10)
+        self.dish.cooks.add(self.cook)
+        self.dish.cooks.add(self.cook)
+        self.assertEqual(self.counts(self.cook), [11])
+        self.dish.cooks.remove(self.cook, self.user)
+        self.dish.cooks.remove(self.cook)
+        self.assertEqual(self.counts(self.cook, self.user), [10, 0])
+        Dish.objects.create(name="Olivier", price=3, dish_type=self.salad)
+        self.assertEqual(self.counts(self.salad), [11])
+        assignments.assign([self.dish.pk], [self.cook.pk, self.user.pk])
+        self.assertEqual(self.counts(self.cook, self.user), [11, 1])
+
+    def test_toggle_view(self):
+        url = reverse("kitchen:toggle-dish-assign", args=[self.dish.pk])
+        self.client.post(url)
+        self.assertEqual(self.counts(self.user), [1])
+        self.client.post(url)
+        self.assertEqual(self.counts(self.user), [0])
+
+    def test_bulk_assignments(self):
+        assignments.assign([self.dish.pk], [self.user.pk, self.cook.pk])
+        self.assertEqual(self.counts(self.user, self.cook), [1, 1])
+        assignments.unassign([self.dish.pk], [self.cook.pk])
+        self.assertEqual(self.counts(self.user, self.cook), [1, 0])
+
+    def test_dish_types(self):
+        self.assertEqual(self.counts(self.soup, self.salad), [1, 0])
+        dish = Dish.objects.get(pk=self.dish.pk)
+        dish.dish_type = self.salad
+        dish.save()
+        self.assertEqual(self.counts(self.soup, self.salad), [0, 1])
+        Dish.objects.create(name="Olivier", price=3, dish_type=self.salad)
+        self.assertEqual(self.counts(self.salad), [2])
+
+    def test_dish_types_of_unloaded_dishes(self):
+        other = DishType.objects.create(name="Dessert", dish_count=7)
+        # Built by pk: the previous type is read, not every type recounted.
+        Dish(pk=self.dish.pk, name="Borsch", price=5,
+             dish_type=self.salad).save()
+        self.assertEqual(self.counts(self.soup, self.salad, other),
+                         [0, 1, 7])
+        dish = Dish.objects.only("name").get(pk=self.dish.pk)
+        dish.name = "Red borsch"
+        # The UPDATE and the card; the type is not saved, so not read.
+        with self.assertNumQueries(4):
+            dish.save()
+        dish = Dish.objects.defer("dish_type").get(pk=self.dish.pk)
+        dish.dish_type = self.soup
+        dish.save()
+        self.assertEqual(self.counts(self.soup, self.salad, other),
+                         [1, 0, 7])
+
+    def test_deletes(self):
+        self.dish.cooks.add(self.cook)
+        Dish.objects.create(name="Shchi", price=4, dish_type=self.soup)
+        self.dish.delete()
+        self.assertEqual(self.counts(self.cook, self.soup), [0, 1])
+        # SET_NULL leaves the other types as they are.
+        self.soup.delete()
+        self.assertEqual(self.counts(self.salad), [0])
+        self.assertEqual(Dish.objects.get().dish_type, None)
+
+    def test_sort_by_dish_count(self):
+        self.dish.cooks.add(self.cook)
+        response = self.client.get(reverse("kitchen:cook-list"),
+                                   {"sort": "-dishes"})
+        self.assertEqual(list(response.context["cook_list"]),
+                         [self.cook, self.user])
+        self.assertContains(response, "Dishes &darr;")
+        response = self.client.get(reverse("kitchen:dish-type-list"),
+                                   {"sort": "dishes"})
+        self.assertEqual(list(response.context["dish_types"]),
+                         [self.salad, self.soup])
+
+    def test_repair_command(self):
+        Cook.objects.filter(pk=self.cook.pk).update(dish_count=3)
+        with self.assertRaises(CommandError):
+            call_command("repair_dish_counts", "--check", stdout=StringIO())
+        out = StringIO()
+        call_command("repair_dish_counts", stdout=out)
+        self.assertIn("stored 3, actual 0", out.getvalue())
+        self.assertEqual(self.counts(self.cook), [0])
+
+
+class DishCardTest(TestCase):
+    def setUp(self):
+        self.user = Cook.objects.create_user(username="user",
+                                             password="test1234")
+        self.client.force_login(self.user)
+        self.soup = DishType.objects.create(name="Soup")
+        self.dish = Dish.objects.create(name="Borsch", price=5,
+                                        description="Red",
+                                        dish_type=self.soup)
+        self.cook = Cook.objects.create(username="cook")
+
+    def card(self):
+        return DishCard.objects.get(pk=self.dish.pk)
+
+    def assertCard(self, dish_type_name, cook_names):
+        card = self.card()
+        self.assertEqual(
+            (card.dish_type_name, card.cook_names, card.cook_count),
+            (dish_type_name, cook_names, len(cook_names)),
+        )
+        self.assertEqual(cards.find_card_drift(), [])
+
+    def test_created(self):
+        card = self.card()
+        self.assertEqual((card.name, card.description, card.price),
+                         ("Borsch", "Red", 5))
+        self.assertCard("Soup", [])
+
+    def test_assignments(self):
+        self.dish.cooks.add(self.user, self.cook)
+        self.assertCard("Soup", ["cook", "user"])
+        self.assertEqual(self.card().cook_ids, [self.cook.pk, self.user.pk])
+        self.cook.dishes.remove(self.dish)
+        self.assertCard("Soup", ["user"])
+        self.user.dishes.clear()
+        self.assertCard("Soup", [])
+        self.cook.dishes.add(self.dish)
+        self.dish.cooks.clear()
+        self.assertCard("Soup", [])
+
+    def test_bulk_assignments(self):
+        assignments.assign([self.dish.pk], [self.user.pk, self.cook.pk])
+        self.assertCard("Soup", ["cook", "user"])
+        assignments.unassign([self.dish.pk], [self.cook.pk])
+        self.assertCard("Soup", ["user"])
+
+    def test_renames(self):
+        self.dish.cooks.add(self.cook)
+        self.soup.name = "Soups"
+        self.soup.save()
+        self.assertCard("Soups", ["cook"])
+        self.cook.username = "chef"
+        self.cook.save()
+        self.assertCard("Soups", ["chef"])
+        # Other fields leave the cards alone: the UPDATE is all.
+        cook = Cook.objects.get(pk=self.cook.pk)
+        cook.years_of_experience = 3
+        with self.assertNumQueries(1):
+            cook.save()
+        dish_type = DishType.objects.get(pk=self.soup.pk)
+        with self.assertNumQueries(1):
+            dish_type.save()
+        dish_type.name = "Stews"
+        dish_type.save()
+        self.assertCard("Stews", ["chef"])
+        with self.assertNumQueries(1):
+            dish_type.save()
+
+    def test_deletes(self):
+        self.dish.cooks.add(self.cook, self.user)
+        self.cook.delete()
+        self.assertCard("Soup", ["user"])
+        self.soup.delete()
+        self.assertCard(None, ["user"])
+        self.assertIsNone(self.card().dish_type_id)
+        self.dish.delete()
+        self.assertFalse(DishCard.objects.exists())
+
+    def test_refresh_locks_the_cards_first(self):
+        with mock.patch.object(
+            QuerySet, "select_for_update", autospec=True,
+            side_effect=QuerySet.select_for_update,
+        ) as select_for_update, CaptureQueriesContext(connection) as queries:
+            cards.refresh_cards([self.dish.pk])
+        self.assertEqual(select_for_update.call_args.args[0].model, DishCard)
+        # Built after the lock, from the snapshot of its own statement.
+        self.assertIn('"kitchen_dishcard"', queries[0]["sql"])
+        self.assertIn('"kitchen_dish_cooks"', queries[1]["sql"])
+
+    def test_list_reads_the_cards_alone(self):
+        self.dish.cooks.add(self.cook)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("kitchen:dish-list"))
+        self.assertContains(response, "<td>cook</td>", html=True)
+        page, = [query["sql"] for query in queries
+                 if "kitchen_dishcard" in query["sql"]
+                 and "LIMIT" in query["sql"]]
+        self.assertNotIn("JOIN", page)
+
+    def test_repair_command(self):
+        DishCard.objects.update(dish_type_name="Stew")
+        Dish.objects.bulk_create([Dish(name="Shchi", price=4)])
+        with self.assertRaises(CommandError):
+            call_command("repair_dish_cards", "--check", stdout=StringIO())
+        out = StringIO()
+        call_command("repair_dish_cards", stdout=out)
+        self.assertIn("Repaired 2 dish card(s).", out.getvalue())
+        self.assertCard("Soup", [])
+        self.assertEqual(DishCard.objects.count(), 2)
+
+
+class FacetTest(TestCase):
+    def setUp(self):
+        self.user = Cook.objects.create_user(username="user",
+                                             password="test1234")
+        self.client.force_login(self.user)
+        self.soup = DishType.objects.create(name="Soup")
+        self.salad = DishType.objects.create(name="Salad")
+        self.cook = Cook.objects.create(username="cook")
+        self.borsch = Dish.objects.create(name="Borsch", price=7,
+                                          dish_type=self.soup)
+        self.shchi = Dish.objects.create(name="Shchi", price=3,
+                                         dish_type=self.soup)
+        self.olivier = Dish.objects.create(name="Olivier", price=8,
+                                           dish_type=self.salad)
+        self.borsch.cooks.add(self.user, self.cook)
+        self.olivier.cooks.add(self.cook)
+
+    def facets(self, query=""):
+        return DishFacets(QueryDict(query))
+
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = self.facets().counts()
+        self.assertEqual(counts["type"], {str(self.soup.pk): ("Soup", 2),
+                                          str(self.salad.pk): ("Salad", 1)})
+        self.assertEqual(counts["price"], {"under-5": ("Under 5", 1),
+                                           "5-10": ("5 to 10", 2)})
+        self.assertEqual(counts["cook"], {str(self.user.pk): ("user", 1),
+                                          str(self.cook.pk): ("cook", 2)})
+
+    def test_facet_counts_ignore_their_own_selection(self):
+        counts = self.facets(f"type={self.soup.pk}&price=5-10").counts()
+        self.assertEqual(counts["type"], {str(self.soup.pk): ("Soup", 1),
+                                          str(self.salad.pk): ("Salad", 1)})
+        self.assertEqual(counts["price"], {"under-5": ("Under 5", 1),
+                                           "5-10": ("5 to 10", 1)})
+        self.assertEqual(counts["cook"], {str(self.user.pk): ("user", 1),
+                                          str(self.cook.pk): ("cook", 1)})
+
+    def test_list_filtering(self):
+        url = reverse("kitchen:dish-list")
+        response = self.client.get(
+            url, {"cook": [self.user.pk, self.cook.pk], "price": "5-10"}
+        )
+        self.assertEqual(
+            [dish.pk for dish in response.context["dish_list"]],
+            [self.olivier.pk, self.borsch.pk],
+        )
+        response = self.client.get(url, {"type": self.soup.pk,
+                                         "price": ["under-5", "bogus"],
+                                         "cook": "x"})
+        self.assertEqual(
+            [dish.pk for dish in response.context["dish_list"]],
+            [self.shchi.pk],
+        )
+        self.assertContains(response, "Clear filters")
+        self.assertContains(
+            response, '<input type="hidden" name="price" value="under-5">',
+            html=True,
+        )
+
+    def test_pagination_keeps_the_selection(self):
+        dishes = Dish.objects.bulk_create(
+            Dish(name=f"Soup {i}", price=i + 10, dish_type=self.soup)
+            for i in range(6)
+        )
+        cards.refresh_cards(dish.pk for dish in dishes)
+        url = reverse("kitchen:dish-list")
+        response = self.client.get(url, {"type": self.soup.pk})
+        self.assertContains(response, f"?type={self.soup.pk}&amp;cursor=")
+        page = response.context["page_obj"]
+        response = self.client.get(url, {"type": self.soup.pk,
+                                         "cursor": page.next_cursor})
+        self.assertEqual(
+            [dish.name for dish in response.context["dish_list"]],
+            ["Soup 0", "Borsch", "Shchi"],
+        )
+
+    def test_option_links_toggle_values(self):
+        options = self.facets(f"type={self.soup.pk}&cursor=abc").options()
+        soup, = [option for option in options["type"]
+                 if option.value == str(self.soup.pk)]
+        salad, = [option for option in options["type"]
+                  if option.value == str(self.salad.pk)]
+        self.assertTrue(soup.selected)
+        self.assertEqual(soup.query, "?")
+        self.assertEqual(salad.query,
+                         f"?type={self.soup.pk}&type={self.salad.pk}")
+        self.assertEqual([option.count for option in options["price"]],
+                         [1, 1, 0, 0])
+
+    def test_selected_options_stay_without_matches(self):
+        options = self.facets(
+            f"type={self.salad.pk}&cook={self.user.pk}&cook=999999"
+        ).options()
+        salad, = [option for option in options["type"]
+                  if option.value == str(self.salad.pk)]
+        self.assertEqual((salad.label, salad.count, salad.selected),
+                         ("Salad", 0, True))
+        self.assertEqual(
+            [(option.label, option.count, option.selected)
+             for option in options["cook"]],
+            [("cook", 1, False), ("999999", 0, True), ("user", 0, True)],
+        )
+        self.assertEqual(options["cook"][1].query,
+                         f"?type={self.salad.pk}&cook={self.user.pk}")
+
+
+class LoadTestTest(SimpleTestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("search=3, dashboard"),
+                         {"search": 3, "dashboard": 1})
+        for spec in ("search=x", "unknown=1", "search=0", "search=-1"):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                parse_mix(spec)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(
+            [percentile(values, pct) for pct in (50, 95, 99, 100)],
+            [50, 95, 99, 100],
+        )
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+
+class LoadTestCommandTest(TransactionTestCase):
+    # The requests come from worker threads, which only see committed rows;
+    # reads go to the replicas, when configured.
+    databases = "__all__"
+
+    def run_command(self, **options):
+        handle, path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command("benchmark_traffic", requests=30, warmup=5,
+                     concurrency=1, cooks=2, dishes=5, seed=1,
+                     output=path, stdout=StringIO(), **options)
+        with open(path) as f:
+            return json.load(f)
+
+    def test_test_client(self):
+        results = self.run_command()
+        self.assertEqual(results["requests"], 30)
+        self.assertEqual(results["errors"], 0)
+        self.assertEqual(results["target"], "test client")
+        self.assertIn("kitchen:dish-list", results["urls"])
+        url = results["urls"]["kitchen:dish-list"]
+        self.assertLessEqual(url["p50"], url["p95"])
+        self.assertLessEqual(url["p95"], url["p99"])
+        self.assertFalse(Dish.objects.exists())
+        self.assertFalse(Cook.objects.exists())
+
+    def test_compare(self):
+        results = self.run_command(mix="dashboard=1")
+        handle, path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with open(path, "w") as f:
+            json.dump(results, f)
+        out = StringIO()
+        call_command("benchmark_traffic", requests=5, warmup=0,
+                     concurrency=1, cooks=1, dishes=1, mix="dashboard=1",
+                     compare=path, stdout=out)
+        self.assertIn("p95 ", out.getvalue())
+        self.assertIn("against", out.getvalue())
+
+
+class LoadTestServerTest(LiveServerTestCase):
+    databases = "__all__"
+
+    def test_http(self):
+        out = StringIO()
+        handle, path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command("benchmark_traffic", base_url=self.live_server_url,
+                     mix="dish-detail=1,toggle-assign=1,create=1",
+                     requests=20, warmup=0, concurrency=1, cooks=1,
+                     dishes=3, seed=1, output=path, stdout=out)
+        with open(path) as f:
+            results = json.load(f)
+        self.assertEqual(results["errors"], 0, out.getvalue())
+        self.assertEqual(results["requests"], 20)
+        self.assertEqual(
+            set(results["urls"]),
+            {"kitchen:dish-detail", "kitchen:toggle-dish-assign",
+             "kitchen:dish-create"},
+        )
+
+
+class GenerateKitchenDataTest(TestCase):
+    def _generate(self, *args):
+        out = StringIO()
+        call_command("generate_kitchen_data", "--cooks", "6", "--dishes",
+                     "40", "--assignments-per-dish", "2", "--dish-types",
+                     "4", "--batch-size", "7", *args, stdout=out)
+        return out.getvalue()
+
+    def test_generate(self):
+        Cook.objects.create(username="alice")
+        with mock.patch("kitchen.datagen.make_password",
+                        wraps=make_password) as hash_password:
+            out = self._generate("--password", "secret")
+        hash_password.assert_called_once_with("secret")
+        self.assertIn("Generated 4 dish types, 6 cooks, 40 dishes, "
+                      "80 assignments.", out)
+        cooks = Cook.objects.exclude(username="alice")
+        self.assertEqual(len({cook.password for cook in cooks}), 1)
+        self.assertTrue(cooks[0].check_password("secret"))
+        self.assertTrue(all(
+            count == 2 for count in
+            Dish.objects.annotate(n=Count("cooks")).values_list("n",
+                                                                flat=True)
+        ))
+        # What the signals keep is written too.
+        self.assertEqual(cards.find_card_drift(), [])
+        self.assertEqual(counters.find_dish_count_drift(Cook), {})
+        self.assertEqual(counters.find_dish_count_drift(DishType), {})
+        self.assertEqual(get_counts(),
+                         {"cooks": 7, "dish_types": 4, "dishes": 40})
+        types = list(DishType.objects.order_by("pk"))
+        self.assertGreater(types[0].dish_count, types[-1].dish_count)
+        # The pk sequences moved past the generated ids.
+        Dish.objects.create(name="New", price=1)
+
+    def test_same_seed_same_data(self):
+        def generated(first_pk):
+            return list(
+                Dish.objects.filter(pk__gte=first_pk).order_by("pk")
+                .values_list("name", "description", "price")
+            )
+
+        self._generate("--seed", "3")
+        first = generated(0)
+        last = Dish.objects.order_by("pk").last().pk
+        self._generate("--seed", "3")
+        self.assertEqual(generated(last + 1), first)
+        # Dish type names are not repeated.
+        self.assertEqual(DishType.objects.count(),
+                         DishType.objects.values("name").distinct().count())
+        self._generate("--seed", "4")
+        self.assertNotEqual(generated(last * 2 + 1), first)
+
+    def test_no_cooks(self):
+        out = self._generate("--cooks", "0")
+        self.assertIn("0 cooks, 40 dishes, 0 assignments", out)
+        self.assertEqual(cards.find_card_drift(), [])
+
+    def test_negative(self):
+        with self.assertRaisesMessage(CommandError, "--dishes cannot be"):
+            self._generate("--dishes", "-1")
@@ -1,18 +1,24 @@
 from django.urls import path
 
+from kitchen.api import CookApiView, DishApiView, DishTypeApiView
 from kitchen.views import (index,
+                           db_pool_stats,
+                           cache_stats,
                            DishTypeListView,
                            DishTypeCreateView,
                            DishTypeUpdateView,
                            DishTypeDeleteView, DishListView, DishDetailView, DishCreateView, DishUpdateView,
                            DishDeleteView, CookListView, CookDetailView, CookCreateView,
-                           CookUpdateView, CookDeleteView, ToggleAssignToDishView
+                           CookUpdateView, CookDeleteView, ToggleAssignToDishView,
+                           BulkAssignmentView, DishExportView, CookExportView
                            )
 
 app_name = "kitchen"
 
 urlpatterns = [
     path("", index, name="index"),
+    path("metrics/db-pool/", db_pool_stats, name="db-pool-stats"),
+    path("metrics/cache/", cache_stats, name="cache-stats"),
     path(
         "dish_types/",
         DishTypeListView.as_view(),
@@ -63,11 +69,26 @@ urlpatterns = [
         name="toggle-dish-assign"
 
     ),
+    path(
+        "dishes/assign/",
+        BulkAssignmentView.as_view(),
+        name="dish-bulk-assign"
+    ),
+    path(
+        "dishes/export/",
+        DishExportView.as_view(),
+        name="dish-export"
+    ),
     path(
         "cooks/",
         CookListView.as_view(),
         name="cook-list"
     ),
+    path(
+        "cooks/export/",
+        CookExportView.as_view(),
+        name="cook-export"
+    ),
     path(
         "cooks/<int:pk>/",
         CookDetailView.as_view(),
@@ -87,5 +108,15 @@ urlpatterns = [
         "cooks/<int:pk>/delete/",
         CookDeleteView.as_view(),
         name="cook-delete"
-    )
+    ),
+    path("api/dish_types/", DishTypeApiView.as_view(), name="api-dish-types"),
+    path(
+        "api/dish_types/<int:pk>/",
+        DishTypeApiView.as_view(),
+        name="api-dish-type"
+    ),
+    path("api/dishes/", DishApiView.as_view(), name="api-dishes"),
+    path("api/dishes/<int:pk>/", DishApiView.as_view(), name="api-dish"),
+    path("api/cooks/", CookApiView.as_view(), name="api-cooks"),
+    path("api/cooks/<int:pk>/", CookApiView.as_view(), name="api-cook"),
 ]
@@ -1,33 +1,106 @@
+import csv
+import json
+import os
+
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.db.models import BooleanField, Exists, ExpressionWrapper, Max, OuterRef, Q
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
+from django.utils.functional import cached_property
+from django.utils.translation import ngettext
 from django.views import generic
 
-from kitchen.forms import DishForm, CookCreationForm, CookSearchForm, DishSearchForm, DishTypeSearchForm, CookUpdateForm
-from kitchen.models import Cook, DishType, Dish
+from kitchen import assignments, fragments
+from kitchen.cache import get_cache
+from kitchen.conditional import ConditionalGetMixin, ConditionalListMixin, latest
+from kitchen.counters import get_counts
+from kitchen.dbpool import get_pool_stats
+from kitchen.facets import DishFacets
+from kitchen.forms import DishForm, CookCreationForm, CookSearchForm, DishSearchForm, DishTypeSearchForm, CookUpdateForm, BulkAssignmentForm
+from kitchen.models import Cook, DishType, Dish, DishCard
+from kitchen.pagination import KeysetPaginationMixin
+from kitchen.search import search
 
 
 # Create your views here.
 @login_required
 def index(request: HttpRequest) -> HttpResponse:
-    num_cooks = Cook.objects.all().count()
-    num_dish_types = DishType.objects.all().count()
-    num_dishes = Dish.objects.all().count()
+    counts = get_counts()
 
     context = {
-        "num_cooks": num_cooks,
-        "num_dish_types": num_dish_types,
-        "num_dishes": num_dishes,
+        "num_cooks": counts["cooks"],
+        "num_dish_types": counts["dish_types"],
+        "num_dishes": counts["dishes"],
     }
 
     return render(request, "kitchen/index.html", context=context)
 
-class DishTypeListView(LoginRequiredMixin, generic.ListView):
+
+@staff_member_required
+def db_pool_stats(request: HttpRequest) -> JsonResponse:
+    # Pools are per process: each gunicorn worker reports its own.
+    return JsonResponse({"pid": os.getpid(), "pools": get_pool_stats()})
+
+
+@staff_member_required
+def cache_stats(request: HttpRequest) -> JsonResponse:
+    # As with the pools, each worker counts its own hits and misses.
+    return JsonResponse({
+        "pid": os.getpid(),
+        "cache": get_cache().get_stats(),
+        "fragments": fragments.get_stats(),
+    })
+
+
+class SortableListMixin:
+    """
+    Order the list by one of ``sort_orderings``, picked by the ``sort``
+    query parameter; the keyset cursor follows that ordering.
+    """
+    sort_kwarg = "sort"
+    sort_orderings = {}
+
+    def get_sort(self):
+        sort = self.request.GET.get(self.sort_kwarg)
+        return sort if sort in self.sort_orderings else None
+
+    def get_ordering(self):
+        sort = self.get_sort()
+        if sort is None:
+            return self.model._meta.ordering
+        return self.sort_orderings[sort]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["sort"] = self.get_sort()
+        return context
+
+
+# Served by the (dish_count, id) indexes of both models.
+DISH_COUNT_ORDERINGS = {
+    "dishes": ("dish_count", "pk"),
+    "-dishes": ("-dish_count", "-pk"),
+}
+
+
+class DishTypeListView(
+    LoginRequiredMixin,
+    ConditionalListMixin,
+    KeysetPaginationMixin,
+    SortableListMixin,
+    generic.ListView,
+):
     model = DishType
     context_object_name = "dish_types"
     paginate_by = 5
+    sort_orderings = DISH_COUNT_ORDERINGS
+    # dish_count moves with dishes being added, moved and deleted.
+    validator_models = ("dish_type", "dish")
 
     def get_context_data(
             self, *, object_list=None, **kwargs
@@ -37,10 +110,11 @@ class DishTypeListView(LoginRequiredMixin, generic.ListView):
         return context
 
     def get_queryset(self):
+        queryset = DishType.objects.order_by(*self.get_ordering())
         name = self.request.GET.get("name")
         if name:
-            return DishType.objects.filter(name__icontains=name)
-        return DishType.objects.all()
+            return search(queryset, "name", name)
+        return queryset
 
 
 class DishTypeCreateView(LoginRequiredMixin, generic.CreateView):
@@ -60,28 +134,95 @@ class DishTypeDeleteView(LoginRequiredMixin, generic.DeleteView):
     success_url = reverse_lazy("kitchen:dish-type-list")
 
 
-class DishListView(LoginRequiredMixin, generic.ListView):
-    model = Dish
+class DishListView(
+    LoginRequiredMixin,
+    ConditionalListMixin,
+    KeysetPaginationMixin,
+    generic.ListView,
+):
+    # Rows come from the dish cards, which carry the type and cook names.
+    model = DishCard
+    template_name = "kitchen/dish_list.html"
     paginate_by = 5
     context_object_name = "dish_list"
-    queryset = Dish.objects.select_related("dish_type")
+    queryset = DishCard.objects.all()
+    # A card carries its type's and cooks' names.
+    validator_models = ("dish", "dish_type", "cook", "assignment")
+
+    @cached_property
+    def facets(self):
+        return DishFacets(self.request.GET)
 
     def get_context_data(
         self, *, object_list=None, **kwargs
     ):
         context = super(DishListView, self).get_context_data(**kwargs)
         context["search_form"] = DishSearchForm(self.request.GET)
+        context["facets"] = self.facets
+        context["facet_options"] = self.facets.options()
         return context
 
-    def get_queryset(self):
+    def get_searched_queryset(self):
         name = self.request.GET.get("name")
         if name:
-            return self.queryset.filter(name__icontains=name)
+            return search(self.queryset, "name", name)
         return self.queryset
 
+    def get_queryset(self):
+        return self.facets.filter(self.get_searched_queryset())
+
 
-class DishDetailView(LoginRequiredMixin, generic.DetailView):
+class DishDetailView(
+    LoginRequiredMixin,
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
+    generic.DetailView,
+):
     model = Dish
+    queryset = Dish.objects.select_related("dish_type")
+    cooks_paginate_by = 50
+
+    def get_validators_queryset(self):
+        # Assignment changes touch the dish, so the roster only needs the
+        # cooks' own edits on top.
+        return (
+            Dish.objects.filter(pk=self.kwargs["pk"])
+            .annotate(cooks_updated_at=Max("cooks__updated_at"))
+            .values_list(
+                "updated_at", "dish_type__updated_at", "cooks_updated_at"
+            )
+        )
+
+    def get_validators(self):
+        row = self.get_validators_queryset().first()
+        return row and (latest(*row), *row)
+
+    def get_queryset(self):
+        return self.queryset.annotate(
+            is_assigned=Exists(
+                Dish.cooks.through.objects.filter(
+                    dish_id=OuterRef("pk"),
+                    cook_id=self.request.user.pk,
+                )
+            )
+        )
+
+    def get_cooks_queryset(self):
+        return self.object.cooks.only(
+            "id", "username", "first_name", "last_name"
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super(DishDetailView, self).get_context_data(**kwargs)
+        paginator, page, cooks, is_paginated = self.paginate_queryset(
+            self.get_cooks_queryset(), self.cooks_paginate_by
+        )
+        context.update({
+            "cooks": cooks,
+            "page_obj": page,
+            "is_paginated": is_paginated,
+        })
+        return context
 
 
 class DishCreateView(LoginRequiredMixin, generic.CreateView):
@@ -101,9 +242,18 @@ class DishDeleteView(LoginRequiredMixin, generic.DeleteView):
     success_url = reverse_lazy("kitchen:dish-list")
 
 
-class CookListView(LoginRequiredMixin, generic.ListView):
+class CookListView(
+    LoginRequiredMixin,
+    ConditionalListMixin,
+    KeysetPaginationMixin,
+    SortableListMixin,
+    generic.ListView,
+):
     model = Cook
     paginate_by = 5
+    sort_orderings = DISH_COUNT_ORDERINGS
+    # Deleting a dish drops its assignments without an m2m_changed signal.
+    validator_models = ("cook", "assignment", "dish")
 
     def get_context_data(
         self, *, object_list=None, **kwargs
@@ -113,15 +263,133 @@ class CookListView(LoginRequiredMixin, generic.ListView):
         return context
 
     def get_queryset(self):
+        # The rows' fragments vary on this rather than on the viewer, so
+        # that every viewer but one shares each row.
+        queryset = Cook.objects.annotate(is_viewer=ExpressionWrapper(
+            Q(pk=self.request.user.pk), output_field=BooleanField()
+        )).order_by(*self.get_ordering())
         username = self.request.GET.get("username")
         if username:
-            return Cook.objects.filter(username__icontains=username)
-        return Cook.objects.all()
+            return search(queryset, "username", username)
+        return queryset
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ExportView(LoginRequiredMixin, generic.View):
+    """
+    Stream every row matching the list view's search filter as CSV or JSON
+    Lines, reading through a chunked (server-side on PostgreSQL) cursor.
+    """
+    queryset = None
+    columns = ()
+    search_field = None
+    filename = None
+    chunk_size = 2000
+    content_types = {
+        "csv": "text/csv",
+        "jsonl": "application/x-ndjson",
+    }
 
+    def get_queryset(self):
+        queryset = self.queryset.all()
+        term = self.request.GET.get(self.search_field)
+        if term:
+            queryset = search(queryset, self.search_field, term)
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in self.content_types:
+            return HttpResponse(status=400)
+        rows = self.get_queryset().values_list(
+            *[lookup for _, lookup in self.columns]
+        ).iterator(chunk_size=self.chunk_size)
+        if export_format == "csv":
+            content = self.stream_csv(rows)
+        else:
+            content = self.stream_jsonl(rows)
+        response = StreamingHttpResponse(
+            content, content_type=self.content_types[export_format]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.filename}.{export_format}"'
+        )
+        return response
+
+    def stream_csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow([header for header, _ in self.columns])
+        for row in rows:
+            yield writer.writerow(row)
+
+    def stream_jsonl(self, rows):
+        headers = [header for header, _ in self.columns]
+        for row in rows:
+            yield json.dumps(dict(zip(headers, row)),
+                             cls=DjangoJSONEncoder) + "\n"
+
+
+class DishExportView(ExportView):
+    queryset = DishCard.objects.all()
+    columns = (
+        ("id", "id"),
+        ("name", "name"),
+        ("description", "description"),
+        ("price", "price"),
+        ("dish_type", "dish_type_name"),
+    )
+    search_field = "name"
+    filename = "dishes"
 
-class CookDetailView(LoginRequiredMixin, generic.DetailView):
+    def get_queryset(self):
+        # The list's "Export CSV" link carries its facets too.
+        return DishFacets(self.request.GET).filter(super().get_queryset())
+
+
+class CookExportView(ExportView):
+    queryset = Cook.objects.all()
+    columns = (
+        ("id", "id"),
+        ("username", "username"),
+        ("first_name", "first_name"),
+        ("last_name", "last_name"),
+        ("email", "email"),
+        ("years_of_experience", "years_of_experience"),
+    )
+    search_field = "username"
+    filename = "cooks"
+
+
+class CookDetailView(
+    LoginRequiredMixin, ConditionalGetMixin, generic.DetailView
+):
     model = Cook
-    queryset = Cook.objects.all().prefetch_related("dishes__dish_type")
+
+    def get_validators_queryset(self):
+        return (
+            Cook.objects.filter(pk=self.kwargs["pk"])
+            .annotate(
+                dishes_updated_at=Max("dishes__updated_at"),
+                dish_types_updated_at=Max("dishes__dish_type__updated_at"),
+            )
+            .values_list(
+                "updated_at", "dishes_updated_at", "dish_types_updated_at"
+            )
+        )
+
+    def get_validators(self):
+        row = self.get_validators_queryset().first()
+        return row and (latest(*row), *row)
+
+    def get_context_data(self, **kwargs):
+        context = super(CookDetailView, self).get_context_data(**kwargs)
+        # Left lazy: the query only runs when the cached fragment misses.
+        context["dishes"] = self.object.dishes.select_related("dish_type")
+        return context
 
 
 class CookCreateView(LoginRequiredMixin, generic.CreateView):
@@ -143,11 +411,41 @@ class CookDeleteView(LoginRequiredMixin, generic.DeleteView):
 class ToggleAssignToDishView(LoginRequiredMixin, generic.View):
     def post(self, request, pk):
         cook = request.user
-        dish = get_object_or_404(Dish, pk=pk)
-
-        if cook.dishes.filter(pk=pk).exists():
+        dish = get_object_or_404(
+            Dish.objects.annotate(
+                is_assigned=Exists(
+                    Dish.cooks.through.objects.filter(
+                        dish_id=OuterRef("pk"), cook_id=cook.pk
+                    )
+                )
+            ),
+            pk=pk,
+        )
+
+        if dish.is_assigned:
             cook.dishes.remove(dish)
         else:
             cook.dishes.add(dish)
 
         return redirect("kitchen:dish-detail", pk=pk)
+
+
+class BulkAssignmentView(LoginRequiredMixin, generic.FormView):
+    form_class = BulkAssignmentForm
+    template_name = "kitchen/bulk_assignment_form.html"
+    # Back to the form after the POST, so that a refresh does not resend it.
+    success_url = reverse_lazy("kitchen:dish-bulk-assign")
+
+    def form_valid(self, form):
+        dish_ids = form.cleaned_data["dishes"]
+        cook_ids = form.cleaned_data["cooks"]
+        if form.cleaned_data["action"] == BulkAssignmentForm.ASSIGN:
+            changed = len(assignments.assign(dish_ids, cook_ids))
+        else:
+            changed = len(assignments.unassign(dish_ids, cook_ids))
+        messages.success(self.request, ngettext(
+            "%(count)d assignment changed.",
+            "%(count)d assignments changed.",
+            changed,
+        ) % {"count": changed})
+        return super().form_valid(form)
@@ -0,0 +1,128 @@
+"""
+Pay a worker's first-request costs before it accepts traffic.
+
+gunicorn.conf.py calls ``warm_up()`` from ``post_worker_init``, after the
+application is loaded and before the worker starts listening, so the first
+requests a fresh worker serves don't compile templates, build the URL
+resolver or open database connections.
+"""
+import os
+import time
+from pathlib import Path
+
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.forms.renderers import get_default_renderer
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import URLResolver, get_resolver
+
+from kitchen.search import get_search_backend
+
+
+def _walk(directory, prefix=""):
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            name = os.path.relpath(os.path.join(root, file), directory)
+            yield "/".join(filter(None, [prefix, *name.split(os.sep)]))
+
+
+def template_names():
+    """
+    Yield the names of the project's templates and of the crispy template
+    pack; other apps' templates, such as the admin's, are left to compile
+    on first use.
+    """
+    for directory in engines["django"].engine.dirs:
+        yield from _walk(directory)
+    pack = settings.CRISPY_TEMPLATE_PACK
+    for directory in get_app_template_dirs("templates"):
+        if (directory / pack).is_dir():
+            yield from _walk(directory / pack, pack)
+
+
+def widget_template_names():
+    """Yield the names of the templates Django renders form widgets with."""
+    prefix = "django/forms/widgets"
+    yield from _walk(Path(forms.__file__).parent / "templates" / prefix, prefix)
+
+
+def compile_templates():
+    """
+    Load every template through its engine, whose cached loader keeps the
+    compiled Template for the life of the process.
+    """
+    count = 0
+    for get_template, names in (
+        (engines["django"].get_template, template_names()),
+        (get_default_renderer().get_template, widget_template_names()),
+    ):
+        for name in names:
+            get_template(name)
+            count += 1
+    return count
+
+
+def populate_resolver(resolver=None):
+    """Build the reverse and namespace tables and compile every pattern."""
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict
+    resolver.namespace_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            count += populate_resolver(pattern)
+        else:
+            count += 1
+    return count
+
+
+def fill_caches():
+    """Fill the per-process caches the views and forms read from."""
+    models = apps.get_models()
+    ContentType.objects.get_for_models(*models)
+    get_search_backend()
+    return len(models)
+
+
+def open_connections():
+    """
+    Open each database's pool, or check that it can be reached; the
+    connection then goes back to the pool, or is closed, because requests
+    are served from other threads.
+    """
+    for alias in connections:
+        connection = connections[alias]
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            pool.open(wait=True)
+        connection.ensure_connection()
+        connection.close()
+    return len(connections.settings)
+
+
+STEPS = (
+    ("templates", compile_templates),
+    ("urls", populate_resolver),
+    ("caches", fill_caches),
+    ("database", open_connections),
+)
+
+
+def warm_up(skip=()):
+    """
+    Run the warm-up steps not in ``skip`` and return, for each, how many
+    items it handled and how long it took in milliseconds.
+    """
+    timings = {}
+    for name, step in STEPS:
+        if name in skip:
+            continue
+        started = time.perf_counter()
+        count = step()
+        timings[name] = (count, (time.perf_counter() - started) * 1000)
+    return timings